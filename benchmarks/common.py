@@ -0,0 +1,44 @@
+"""Helpers shared by the benchmark scripts.
+
+Settings are read when the ``database`` package is imported, so scripts call
+:func:`configure` before importing anything from the bot.
+"""
+from __future__ import annotations
+
+import math
+import os
+import tempfile
+
+
+def configure(dsn: str = "") -> str:
+    """Point settings at ``dsn`` (a fresh SQLite file by default) and return it."""
+    if not dsn:
+        dsn = f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/bench.sqlite3"
+    os.environ["DB_DSN"] = dsn
+    os.environ.setdefault("BOT_TOKEN", "0:benchmark")
+    return dsn
+
+
+async def reset_database() -> None:
+    """Recreate all tables; on SQLite also the ``posts_fts`` index the migrations add."""
+    from sqlalchemy import text
+
+    from database import engine
+    from database.models import Base
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        if engine.dialect.name == "sqlite":
+            await conn.execute(text("DROP TABLE IF EXISTS posts_fts"))
+            await conn.execute(text(
+                "CREATE VIRTUAL TABLE posts_fts USING fts5(text, tokenize='unicode61 remove_diacritics 2')"
+            ))
+
+
+def percentile(values: list[float], share: float) -> float:
+    """Nearest-rank percentile, 0 for an empty list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(share * len(ordered)) - 1)]
@@ -0,0 +1,185 @@
+"""Delivery throughput against the fake Bot API: ``tasks.send_post`` and the dispatcher.
+
+Usage::
+
+    python -m benchmarks.delivery
+    python -m benchmarks.delivery --channels 1 10 50 --posts 10 100 --latency 0.03 --retry-after-rate 0.01
+    python -m benchmarks.results benchmarks/results/delivery.jsonl
+
+``send_post`` cases create the posts and channels, run the posts like the
+scheduler would (``--concurrency`` jobs at a time) and report posts per
+second and the latency until a post reached all its channels. The
+``dispatcher`` case pushes ``--updates`` messages through ``getUpdates``
+into a polling dispatcher whose handler answers each one and measures the
+time from queueing an update to the answer arriving. Every case is
+appended to ``--results`` with the git revision.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import configure, percentile, reset_database
+from benchmarks.fake_bot_api import FakeBotAPI, Faults, fake_bot
+from benchmarks.results import save
+
+
+def _summary(latencies: list[float], elapsed: float, done: int) -> dict[str, float]:
+    return {
+        "per_second": done / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "elapsed_s": elapsed,
+    }
+
+
+async def bench_send_post(server: FakeBotAPI, url: str, channels: int, posts: int, concurrency: int) -> dict:
+    from database import repository as repo
+    from database.models import ChannelType, UserRole
+    from tasks import send_post
+
+    await reset_database()
+    user = await repo.create_user(UserRole.ADMIN, tg_id=1, tg_username="bench")
+    channel_ids = [
+        (await repo.create_channel(chat_id=-1000 - i, channel_type=ChannelType.CHANNEL, title=f"bench {i}")).id
+        for i in range(channels)
+    ]
+    created = await repo.bulk_create_posts(
+        user.id,
+        [{"text": f"<b>Пост {i}</b>\n" + "текст " * 50, "channel_ids": channel_ids} for i in range(posts)],
+    )
+
+    bot = fake_bot(url)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    failed = 0
+
+    async def deliver(post_id: int) -> None:
+        nonlocal failed
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await send_post(post_id, bot)
+            except Exception:
+                # the scheduler would only log it
+                failed += 1
+                return
+            latencies.append(time.perf_counter() - started)
+
+    server.calls.clear()
+    started = time.perf_counter()
+    await asyncio.gather(*(deliver(post_id) for post_id, _ in created))
+    elapsed = time.perf_counter() - started
+    await bot.session.close()
+
+    metrics = _summary(latencies, elapsed, len(latencies))
+    metrics["messages_per_second"] = server.count("sendMessage") / elapsed if elapsed else 0.0
+    metrics["failed_posts"] = failed
+    return metrics
+
+
+async def bench_dispatcher(server: FakeBotAPI, url: str, updates: int, users: int) -> dict:
+    from aiogram import Dispatcher, Router
+    from aiogram.types import Message, Update
+
+    from bot.middlewares import HandlerMetricsMiddleware, TracingMiddleware
+
+    done = asyncio.Event()
+    answered: list[float] = []
+    router = Router()
+
+    @router.message()
+    async def answer(message: Message, event_update: Update) -> None:
+        # the answer carries the update id so it can be matched to its update
+        await message.answer(str(event_update.update_id))
+
+    dp = Dispatcher()
+    # the same middleware stack the bot runs with
+    dp.update.outer_middleware(TracingMiddleware())
+    dp.message.middleware(HandlerMetricsMiddleware("message"))
+    dp.include_router(router)
+
+    bot = fake_bot(url)
+    server.calls.clear()
+    started = time.perf_counter()
+    for i in range(updates):
+        server.push_message(chat_id=10_000 + i % users, text=f"сообщение {i}")
+
+    async def watch() -> None:
+        while server.count("sendMessage") < updates:
+            await asyncio.sleep(0.01)
+        done.set()
+
+    polling = asyncio.create_task(dp.start_polling(bot, handle_signals=False, polling_timeout=1))
+    watcher = asyncio.create_task(watch())
+    await done.wait()
+    elapsed = time.perf_counter() - started
+    await dp.stop_polling()
+    await polling
+    watcher.cancel()
+
+    for call in server.calls:
+        if call.method == "sendMessage":
+            answered.append(call.at - server.queued_at(int(call.params["text"])))
+    return _summary(answered, elapsed, len(answered))
+
+
+async def run(args: argparse.Namespace) -> None:
+    from database import engine
+
+    faults = Faults(args.latency, args.jitter, args.retry_after_rate, args.retry_after, args.error_rate)
+    server = FakeBotAPI(faults)
+    url = await server.start()
+    shared = {
+        "db": engine.dialect.name,
+        "latency": args.latency,
+        "retry_after_rate": args.retry_after_rate,
+        "error_rate": args.error_rate,
+    }
+
+    print(f"{'case':<40}{'per s':>10}{'p50 ms':>10}{'p99 ms':>10}{'failed':>8}")
+    try:
+        for channels in args.channels:
+            for posts in args.posts:
+                params = shared | {"channels": channels, "posts": posts, "concurrency": args.concurrency}
+                metrics = await bench_send_post(server, url, channels, posts, args.concurrency)
+                save(args.results, "send_post", params, metrics)
+                case = f"send_post channels={channels} posts={posts}"
+                print(
+                    f"{case:<40}{metrics['per_second']:>10.1f}{metrics['p50_ms']:>10.1f}"
+                    f"{metrics['p99_ms']:>10.1f}{metrics['failed_posts']:>8}"
+                )
+        if args.updates:
+            params = shared | {"updates": args.updates, "users": args.users}
+            metrics = await bench_dispatcher(server, url, args.updates, args.users)
+            save(args.results, "dispatcher", params, metrics)
+            case = f"dispatcher updates={args.updates}"
+            print(f"{case:<40}{metrics['per_second']:>10.1f}{metrics['p50_ms']:>10.1f}{metrics['p99_ms']:>10.1f}")
+    finally:
+        await server.stop()
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dsn", default="")
+    parser.add_argument("--channels", type=int, nargs="+", default=[1, 5, 20])
+    parser.add_argument("--posts", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--concurrency", type=int, default=10, help="send_post jobs running at once")
+    parser.add_argument("--updates", type=int, default=1000, help="0 skips the dispatcher case")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--retry-after-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--results", default="benchmarks/results/delivery.jsonl")
+    args = parser.parse_args()
+
+    configure(args.dsn)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+"""Local stand-in for the Telegram Bot API with injectable latency and failures.
+
+Implements ``getMe``, ``getChat``, ``getChatMember``, ``getUpdates``,
+``sendMessage``, ``sendPhoto``, ``sendMediaGroup``, ``editMessageText`` and
+``editMessageReplyMarkup``; anything else answers ``True``. Every request is recorded with its arrival
+time so benchmarks can measure delivery latency on the server side, and the
+latest inline keyboard per chat is kept so scripted users can press it. The
+bot is an administrator of every chat except those in ``removed``.
+
+Usage::
+
+    python -m benchmarks.fake_bot_api --port 8081 --latency 0.05 --retry-after-rate 0.01
+
+then point a bot at it with ``fake_bot("http://127.0.0.1:8081")``.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import Any
+
+from aiohttp import web
+
+
+@dataclass
+class Call:
+    method: str
+    params: dict[str, str]
+    at: float
+
+
+@dataclass
+class Faults:
+    """What the server injects: ``latency`` ± ``jitter`` seconds per request,
+    a share of flood-wait answers and a share of "chat not found" errors."""
+
+    latency: float = 0.0
+    jitter: float = 0.0
+    retry_after_rate: float = 0.0
+    retry_after: int = 1
+    error_rate: float = 0.0
+
+
+@dataclass
+class FakeBotAPI:
+    faults: Faults = field(default_factory=Faults)
+    calls: list[Call] = field(default_factory=list)
+
+    def __post_init__(self) -> None:
+        self._message_ids = itertools.count(1)
+        self._update_ids = itertools.count(1)
+        self._updates: list[dict] = []
+        self._queued_at: dict[int, float] = {}
+        self._has_updates = asyncio.Event()
+        self._runner: web.AppRunner | None = None
+        # chat id -> (message id, inline keyboard rows)
+        self.keyboards: dict[int, tuple[int, list[list[dict]]]] = {}
+        # chats the bot was kicked from: sends and membership lookups there are forbidden
+        self.removed: set[int] = set()
+
+    # updates
+
+    def push_update(self, update: dict) -> int:
+        """Queue an update for ``getUpdates``; ``update_id`` is assigned here."""
+        update_id = next(self._update_ids)
+        self._updates.append({**update, "update_id": update_id})
+        self._queued_at[update_id] = time.perf_counter()
+        self._has_updates.set()
+        return update_id
+
+    def push_message(self, chat_id: int, text: str, user_id: int | None = None) -> int:
+        user_id = user_id if user_id is not None else chat_id
+        return self.push_update({
+            "message": {
+                "message_id": next(self._message_ids),
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "from": {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"},
+                "text": text,
+            }
+        })
+
+    def queued_at(self, update_id: int) -> float | None:
+        return self._queued_at.get(update_id)
+
+    def count(self, method: str) -> int:
+        return sum(1 for call in self.calls if call.method == method)
+
+    # server
+
+    def build_app(self) -> web.Application:
+        """The served application; subclasses add routes for other fake services."""
+        app = web.Application()
+        app.router.add_route("*", "/bot{token}/{method}", self._handle)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start serving and return the base URL."""
+        app = self.build_app()
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        return f"http://{host}:{port}"
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        params = {key: value for key, value in (await request.post()).items() if isinstance(value, str)}
+        self.calls.append(Call(method, params, time.perf_counter()))
+        if method == "getUpdates":
+            return self._ok(await self._get_updates(params))
+
+        faults = self.faults
+        if faults.latency or faults.jitter:
+            await asyncio.sleep(max(0.0, faults.latency + random.uniform(-faults.jitter, faults.jitter)))
+        if method != "getMe":
+            if random.random() < faults.retry_after_rate:
+                return self._error(
+                    429,
+                    f"Too Many Requests: retry after {faults.retry_after}",
+                    {"retry_after": faults.retry_after},
+                )
+            if random.random() < faults.error_rate:
+                return self._error(400, "Bad Request: chat not found")
+
+        if method == "getMe":
+            return self._ok({"id": 1, "is_bot": True, "first_name": "Fake", "username": "fake_bot"})
+        if method == "getChat":
+            return self._ok(self._chat(params["chat_id"]))
+        if params.get("chat_id", "").lstrip("-").isdigit() and int(params["chat_id"]) in self.removed:
+            return self._error(403, "Forbidden: bot was kicked from the channel chat")
+        if method == "getChatMember":
+            user_id = int(params["user_id"])
+            if str(user_id) == request.match_info["token"].split(":")[0]:
+                return self._ok(self._admin(user_id))
+            user = {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"}
+            return self._ok({"status": "member", "user": user})
+        if method in ("sendMessage", "sendPhoto"):
+            return self._ok(self._message(params))
+        if method in ("editMessageText", "editMessageCaption", "editMessageReplyMarkup"):
+            if "inline_message_id" in params:
+                return self._ok(True)
+            return self._ok(self._message(params, int(params["message_id"])))
+        if method == "sendMediaGroup":
+            media = json.loads(params.get("media", "[]"))
+            return self._ok([self._message(params) for _ in media])
+        return self._ok(True)
+
+    async def _get_updates(self, params: dict[str, str]) -> list[dict]:
+        offset = int(params.get("offset", 0) or 0)
+        limit = int(params.get("limit", 100) or 100)
+        timeout = float(params.get("timeout", 0) or 0)
+        if offset:
+            self._updates = [update for update in self._updates if update["update_id"] >= offset]
+        if not self._updates and timeout:
+            self._has_updates.clear()
+            try:
+                await asyncio.wait_for(self._has_updates.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self._updates[:limit]
+
+    @staticmethod
+    def _chat(chat_id: str) -> dict[str, Any]:
+        from aiogram.types import AcceptedGiftTypes
+
+        # usernames resolve to a stable made-up id
+        numeric = int(chat_id) if chat_id.lstrip("-").isdigit() else -10 ** 12 - zlib.crc32(chat_id.encode())
+        return {
+            "id": numeric,
+            "type": "channel" if numeric < 0 else "private",
+            "title": f"chat {numeric}",
+            "accent_color_id": 0,
+            "max_reaction_count": 11,
+            # the required flags differ between Bot API versions
+            "accepted_gift_types": {
+                name: False for name, field in AcceptedGiftTypes.model_fields.items() if field.is_required()
+            },
+        }
+
+    @staticmethod
+    def _admin(bot_id: int) -> dict[str, Any]:
+        """The bot itself: an administrator allowed to post."""
+        from aiogram.types import ChatMemberAdministrator
+
+        member = {
+            name: True for name, field in ChatMemberAdministrator.model_fields.items()
+            if field.is_required() and field.annotation is bool
+        }
+        member.update(
+            status="administrator",
+            user={"id": bot_id, "is_bot": True, "first_name": "Fake"},
+            can_post_messages=True,
+        )
+        return member
+
+    def _message(self, params: dict[str, str], message_id: int | None = None) -> dict[str, Any]:
+        chat_id = int(params.get("chat_id", 0))
+        message_id = message_id if message_id is not None else next(self._message_ids)
+        message = {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "channel" if chat_id < 0 else "private"},
+        }
+        if "text" in params:
+            message["text"] = params["text"]
+        if "caption" in params:
+            message["caption"] = params["caption"]
+        markup = json.loads(params.get("reply_markup") or "null")
+        if markup and "inline_keyboard" in markup:
+            message["reply_markup"] = markup
+            self.keyboards[chat_id] = (message_id, markup["inline_keyboard"])
+        return message
+
+    @staticmethod
+    def _ok(result: Any) -> web.Response:
+        return web.json_response({"ok": True, "result": result})
+
+    @staticmethod
+    def _error(code: int, description: str, parameters: dict | None = None) -> web.Response:
+        payload: dict[str, Any] = {"ok": False, "error_code": code, "description": description}
+        if parameters:
+            payload["parameters"] = parameters
+        return web.json_response(payload, status=code)
+
+
+def fake_bot(base_url: str, token: str = "0:benchmark", **kwargs):
+    """``Bot`` talking to the fake server at ``base_url``."""
+    from aiogram import Bot
+    from aiogram.client.default import DefaultBotProperties
+    from aiogram.client.session.aiohttp import AiohttpSession
+    from aiogram.client.telegram import TelegramAPIServer
+
+    session = AiohttpSession(api=TelegramAPIServer.from_base(base_url), **kwargs)
+    return Bot(token=token, session=session, default=DefaultBotProperties(parse_mode="HTML"))
+
+
+async def _serve(host: str, port: int, faults: Faults) -> None:
+    server = FakeBotAPI(faults)
+    url = await server.start(host, port)
+    print(f"Fake Bot API on {url}, Ctrl+C to stop")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--retry-after-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    faults = Faults(args.latency, args.jitter, args.retry_after_rate, args.retry_after, args.error_rate)
+    try:
+        asyncio.run(_serve(args.host, args.port, faults))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
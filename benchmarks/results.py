@@ -0,0 +1,84 @@
+"""Benchmark results stored as JSON lines, one run per line, tagged with the git revision.
+
+Usage::
+
+    python -m benchmarks.results benchmarks/results/delivery.jsonl
+    python -m benchmarks.results benchmarks/results/delivery.jsonl --metric p99_ms --revs 3
+
+prints the chosen metric of the latest runs of each case side by side for
+the last revisions found in the file.
+"""
+from __future__ import annotations
+
+import argparse
+import datetime
+import json
+import subprocess
+from pathlib import Path
+from typing import Any
+
+
+def git_revision() -> str:
+    try:
+        rev = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(["git", "diff", "--quiet", "HEAD"], capture_output=True).returncode
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{rev}+dirty" if dirty else rev
+
+
+def save(path: str | Path, benchmark: str, params: dict[str, Any], metrics: dict[str, Any]) -> dict:
+    record = {
+        "benchmark": benchmark,
+        "rev": git_revision(),
+        "time": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "params": params,
+        "metrics": metrics,
+    }
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as file:
+        file.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return record
+
+
+def load(path: str | Path) -> list[dict]:
+    with open(path, encoding="utf-8") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def compare(records: list[dict], metric: str, revs: int) -> str:
+    # the last run of every (case, revision) pair wins
+    latest: dict[tuple[str, str], Any] = {}
+    order: list[str] = []
+    for record in records:
+        if record["rev"] not in order:
+            order.append(record["rev"])
+        case = " ".join(f"{key}={value}" for key, value in sorted(record["params"].items()))
+        latest[(f"{record['benchmark']} {case}", record["rev"])] = record["metrics"].get(metric)
+    shown = order[-revs:]
+    cases = list(dict.fromkeys(case for case, _ in latest))
+    width = max([len(case) for case in cases] + [4])
+    lines = [f"{'case':<{width}}" + "".join(f"{rev:>16}" for rev in shown)]
+    for case in cases:
+        cells = []
+        for rev in shown:
+            value = latest.get((case, rev))
+            cells.append(f"{'-' if value is None else round(value, 2):>16}")
+        lines.append(f"{case:<{width}}" + "".join(cells))
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path")
+    parser.add_argument("--metric", default="p99_ms")
+    parser.add_argument("--revs", type=int, default=2)
+    args = parser.parse_args()
+    print(compare(load(args.path), args.metric, args.revs))
+
+
+if __name__ == "__main__":
+    main()
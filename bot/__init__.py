@@ -1,13 +1,18 @@
 from __future__ import annotations
 
+import asyncio
 import datetime
+import signal
+from contextlib import suppress
 from logging import getLogger
+from typing import Callable
 
 from aiogram import Bot, Dispatcher, F, Router
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
 from aiogram.enums import ChatType
-from aiogram.filters import CommandStart
-from aiogram.types import Message, BotCommand, InlineKeyboardButton, InlineKeyboardMarkup
+from aiogram.filters import Command, CommandObject, CommandStart
+from aiogram.types import ChatMemberUpdated, Message, BotCommand, InlineKeyboardButton, InlineKeyboardMarkup
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.storage.redis import RedisStorage
 from aiogram.fsm.storage.base import DefaultKeyBuilder
@@ -18,29 +23,73 @@ from bot.dialogs.menu import main_menu_dialog
 from bot.dialogs.post import dialog as post_dialog
 from bot.dialogs.templates import templates_dialog
 from bot.dialogs.administration import administration_dialog
+from bot.middlewares import (
+    BotScopeMiddleware,
+    HandlerMetricsMiddleware,
+    RequestMetricsMiddleware,
+    TracingMiddleware,
+)
 from bot.states import MainMenuSG
+from bot.streams import StreamWorker, UpdateReceiver
 from database.models import UserRole
-from database import redis as redis_connection
+from database import bot_scope, engine, redis as redis_connection, set_bot_schema
 from database import repository as repo
-from config import settings
-from tasks import scheduler, start_scheduler
+from config import log as log_config, settings
+from services import compat_service, steam_client, telegram_metadata
+from tasks import (
+    apply_channel_status,
+    drain_deliveries,
+    forward_jobs,
+    member_status,
+    restore_recurring_posts,
+    resume_deliveries,
+    run_forwarded_jobs,
+    scheduler,
+    start_scheduler,
+)
+from utils.metrics import registry, start_metrics_server
+from utils.tracing import tracer
 
 
 logger = getLogger("bot")
 
-bot = Bot(
-    token=settings.BOT_TOKEN,
-    default=DefaultBotProperties(
-        parse_mode='HTML'
-    )
-)
-key_builder = DefaultKeyBuilder(prefix="sdtg", with_destiny=True)
+# one HTTP connection pool for all bots, like the engine and the Redis client
+session = AiohttpSession()
+bots: list[Bot] = []
+for token, schema in (settings.BOTS or {settings.BOT_TOKEN: ""}).items():
+    bots.append(Bot(token=token, session=session, default=DefaultBotProperties(parse_mode='HTML')))
+    set_bot_schema(bots[-1].id, schema)
+bot = bots[0]
+
+# a single bot keeps its existing FSM keys, several get them namespaced by bot id
+key_builder = DefaultKeyBuilder(prefix="sdtg", with_bot_id=len(bots) > 1, with_destiny=True)
 storage = RedisStorage(redis_connection, key_builder)
 dp = Dispatcher(storage=storage)
 
 main_router = Router()
 dialogs_router = Router()
 
+session.middleware(RequestMetricsMiddleware())
+dp.update.outer_middleware(BotScopeMiddleware())
+tracing_middleware = TracingMiddleware()
+dp.update.outer_middleware(tracing_middleware)
+# repository calls become "db" spans; the wrappers cost nothing outside a trace
+tracer.instrument_module(repo, "db")
+for event_name in ("message", "callback_query", "my_chat_member"):
+    dp.observers[event_name].middleware(HandlerMetricsMiddleware(event_name))
+
+if hasattr(engine.pool, "checkedout"):
+    # only queue pools keep connections around
+    registry.gauge("sdtg_db_pool_checked_out", "Database connections in use", engine.pool.checkedout)
+    registry.gauge("sdtg_db_pool_size", "Database connections kept in the pool", engine.pool.size)
+registry.gauge("sdtg_scheduler_jobs", "Jobs waiting in the scheduler", lambda: len(scheduler.get_jobs()))
+registry.gauge(
+    "sdtg_log_records_dropped",
+    "Log records dropped because the log queue was full",
+    lambda: log_config.queue_handler.dropped if log_config.queue_handler else 0,
+)
+metrics_runner = None
+
 
 async def process_code_registration(message: Message, code: str) -> None:
     code_obj = await repo.get_code(code)
@@ -86,8 +135,28 @@ async def cmd_start(message: Message, dialog_manager: DialogManager) -> None:
         return
     await dialog_manager.start(MainMenuSG.menu, mode=StartMode.RESET_STACK)
 
+@main_router.message(Command("profile"), F.chat.type == ChatType.PRIVATE)
+async def cmd_profile(message: Message, command: CommandObject) -> None:
+    user = await repo.get_user_by_tg_id(message.from_user.id)
+    if not user or user.role != UserRole.ADMIN:
+        return
+    try:
+        updates = int(command.args or 20)
+    except ValueError:
+        await message.answer("Использование: /profile [количество апдейтов]")
+        return
+    updates = max(1, min(updates, settings.PROFILE_MAX_UPDATES))
+    if not tracing_middleware.start_profiling(message.chat.id, updates, settings.PROFILE_INTERVAL):
+        await message.answer("Профилирование уже идёт")
+        return
+    await message.answer(
+        f"Профилирую следующие {updates} апдейтов. "
+        f"Трассы запишутся в {settings.TRACE_FILE}, отчёт придёт сюда."
+    )
+
+
 @main_router.message(F.is_automatic_forward)
-async def process_auto_forward(message: Message, state: FSMContext):
+async def process_auto_forward(message: Message, state: FSMContext, bot: Bot):
     if message.reply_markup is None:
         return
     
@@ -107,20 +176,60 @@ async def process_auto_forward(message: Message, state: FSMContext):
     )
 
 
+@main_router.my_chat_member()
+async def on_my_chat_member(update: ChatMemberUpdated, bot: Bot) -> None:
+    # added, promoted, restricted or removed: what is cached about the chat is stale
+    await telegram_metadata.invalidate_chat(bot.id, update.chat.id, bot.id)
+    status = member_status(update.new_chat_member, update.chat.type == ChatType.CHANNEL)
+    await apply_channel_status(bot, update.chat.id, status)
+
+
+@main_router.message(F.new_chat_title | F.new_chat_photo | F.delete_chat_photo | F.migrate_to_chat_id)
+async def on_chat_changed(message: Message, bot: Bot) -> None:
+    await telegram_metadata.invalidate_chat(bot.id, message.chat.id)
+
+
 @dp.startup()
-async def setup_scheduler(bot: Bot, *_args, **_kwargs):
+async def setup_scheduler(bots: list[Bot], *_args, **_kwargs):
     logger.info("Starting scheduler")
-    start_scheduler()
+    start_scheduler(bots)
+    for bot in bots:
+        with bot_scope(bot.id):
+            restored = await restore_recurring_posts(bot)
+            resumed = await resume_deliveries(bot)
+        logger.info("Restored %s recurring posts of bot %s, resumed %s sends", restored, bot.id, resumed)
+    await start_metrics()
+
+
+async def start_metrics() -> None:
+    global metrics_runner
+    if settings.METRICS_PORT and metrics_runner is None:
+        metrics_runner = await start_metrics_server(settings.METRICS_HOST, settings.METRICS_PORT)
 
 
 @dp.shutdown()
-async def shutdown_scheduler(bot: Bot, *_args, **_kwargs):
+async def shutdown_scheduler(*_args, **_kwargs):
+    """Runs once no more updates come in: no new jobs start, posts being
+    sent get ``SHUTDOWN_DRAIN_SECONDS`` to finish, then the pools close."""
     logger.info("Shutting down scheduler")
     if scheduler.running:
-        scheduler.shutdown()
+        # coroutine jobs are not waited for here, drain_deliveries does that
+        scheduler.shutdown(wait=False)
+    interrupted = await drain_deliveries(settings.SHUTDOWN_DRAIN_SECONDS)
+    if interrupted:
+        logger.warning("Stopped sending %s posts, they are resumed by the next resume_deliveries run", interrupted)
+    await steam_client.close()
+    await compat_service.close()
+    if metrics_runner is not None:
+        await metrics_runner.cleanup()
+    await redis_connection.aclose()
+    await engine.dispose()
 
 
-async def start_bot(commands: dict[str, str] | None = None) -> None:
+def setup_dispatcher() -> Dispatcher:
+    """Include the routers and dialogs into ``dp``; later calls return it as is."""
+    if main_router.parent_router is not None:
+        return dp
     dialogs_router.include_routers(
         main_menu_dialog,
         post_dialog,
@@ -130,13 +239,88 @@ async def start_bot(commands: dict[str, str] | None = None) -> None:
     main_router.include_router(dialogs_router)
 
     dp.include_router(main_router)
-  
+
     setup_dialogs(dp)
+    return dp
 
+
+async def set_commands(commands: dict[str, str] | None) -> None:
     if commands:
-        await bot.set_my_commands(
-            [BotCommand(command=cmd, description=desc) for cmd, desc in commands.items()]
-        )
+        for bot in bots:
+            await bot.set_my_commands(
+                [BotCommand(command=cmd, description=desc) for cmd, desc in commands.items()]
+            )
+
+
+def _on_signals(callback: Callable[[], None]) -> None:
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        # not available on Windows
+        with suppress(NotImplementedError):
+            loop.add_signal_handler(sig, callback)
 
-    await dp.start_polling(bot)
 
+async def start_bot(commands: dict[str, str] | None = None) -> None:
+    setup_dispatcher()
+    await set_commands(commands)
+    await dp.start_polling(*bots)
+
+
+async def start_receiver(commands: dict[str, str] | None = None) -> None:
+    """Put updates into the update streams for ``start_worker`` processes.
+
+    The scheduler runs here, so periodic and recurring jobs run once however
+    many workers there are; the jobs workers schedule are forwarded to it.
+    """
+    setup_dispatcher()
+    await set_commands(commands)
+    receiver = UpdateReceiver(
+        redis_connection,
+        bots,
+        prefix=settings.UPDATE_STREAM_PREFIX,
+        group=settings.UPDATE_STREAM_GROUP,
+        partitions=settings.UPDATE_STREAM_PARTITIONS,
+        maxlen=settings.UPDATE_STREAM_MAXLEN,
+        webhook_url=settings.WEBHOOK_URL,
+        webhook_secret=settings.WEBHOOK_SECRET,
+    )
+    _on_signals(receiver.stop)
+    await setup_scheduler(bots)
+    forwarded = asyncio.create_task(run_forwarded_jobs(bots, settings.JOB_STREAM))
+    try:
+        await receiver.run(dp.resolve_used_update_types(), settings.WEBHOOK_HOST, settings.WEBHOOK_PORT)
+    finally:
+        forwarded.cancel()
+        with suppress(asyncio.CancelledError):
+            await forwarded
+        await shutdown_scheduler()
+        await session.close()
+
+
+async def start_worker() -> None:
+    """Handle updates from the update streams; start as many as needed.
+
+    Jobs scheduled by handlers are forwarded to the receiver's scheduler,
+    so rescheduling or removing them works from any worker.
+    """
+    setup_dispatcher()
+    worker = StreamWorker(
+        dp,
+        bots,
+        redis_connection,
+        prefix=settings.UPDATE_STREAM_PREFIX,
+        group=settings.UPDATE_STREAM_GROUP,
+        partitions=settings.UPDATE_STREAM_PARTITIONS,
+        batch=settings.UPDATE_STREAM_BATCH,
+        block_ms=settings.UPDATE_STREAM_BLOCK_MS,
+        lease_ms=settings.UPDATE_STREAM_LEASE_MS,
+        claim_idle_ms=settings.UPDATE_STREAM_CLAIM_IDLE_MS,
+    )
+    _on_signals(worker.stop)
+    forward_jobs(settings.JOB_STREAM)
+    await start_metrics()
+    try:
+        await worker.run()
+    finally:
+        await shutdown_scheduler()
+        await session.close()
@@ -20,11 +20,20 @@ from aiogram_dialog.widgets.kbd import (
 from aiogram_dialog.widgets.input import MessageInput
 from aiogram.enums import ChatType
 
+from config import settings
 from database import repository as repo
 from database import models
+from services import telegram_metadata
 from ..states import AdminSG
 
 
+CHANNEL_STATUSES = {
+    models.ChannelStatus.OK: "бот может публиковать",
+    models.ChannelStatus.NO_RIGHTS: "у бота нет прав на публикацию",
+    models.ChannelStatus.REMOVED: "бот удалён из канала",
+}
+
+
 async def generate_code(
     callback: types.CallbackQuery,
     button: Button,
@@ -54,7 +63,7 @@ async def on_code_select(
 
 async def code_getter(dialog_manager: DialogManager, **_kwargs):
     bot: Bot = dialog_manager.middleware_data.get("bot")
-    bot_data = await bot.get_me()
+    bot_data = await telegram_metadata.get_me(bot)
     code_id = dialog_manager.dialog_data.get("selected_code")
     code_obj = await repo.get_code(int(code_id))
     if (
@@ -122,7 +131,22 @@ async def on_channel_select(
 async def channel_info_getter(dialog_manager: DialogManager, **_kwargs):
     channel_id = dialog_manager.dialog_data.get("selected_channel")
     channel = await repo.get_channel_by_chat_id(channel_id)
-    return {"channel": channel}
+    return {
+        "channel": channel,
+        "status": CHANNEL_STATUSES[channel.status],
+        "state": "включён" if channel.is_active else "отключён",
+        "toggle": "Отключить" if channel.is_active else "Включить",
+    }
+
+
+async def toggle_channel(
+    callback: types.CallbackQuery,
+    button: Button,
+    dialog_manager: DialogManager,
+):
+    channel_id = dialog_manager.dialog_data.get("selected_channel")
+    channel = await repo.get_channel_by_chat_id(channel_id)
+    await repo.set_channel_active(channel_id, not channel.is_active)
 
 
 async def delete_channel(
@@ -138,7 +162,7 @@ async def delete_channel(
 async def on_channel_id(message: types.Message, message_input: MessageInput, dialog_manager: DialogManager):
     bot: Bot = dialog_manager.middleware_data.get("bot")
     try:
-        chat = await bot.get_chat(message.text)
+        chat = await telegram_metadata.get_chat(bot, message.text)
     except Exception:
         await message.answer("Не удалось получить информацию о чате")
         return
@@ -163,6 +187,38 @@ async def on_role_select(
     await dialog_manager.switch_to(AdminSG.user_info)
 
 
+async def watchlist_getter(**_kwargs):
+    games = await repo.get_watched_games()
+    return {"games": games, "default_discount": settings.PRICE_WATCH_DEFAULT_DISCOUNT}
+
+
+async def on_watch_input(message: types.Message, message_input: MessageInput, dialog_manager: DialogManager):
+    try:
+        values = [int(value) for value in message.text.split()]
+        steam_id = values[0]
+    except (ValueError, IndexError):
+        await message.answer("Формат: app_id [скидка %] [id шаблона]")
+        return
+    min_discount = values[1] if len(values) > 1 else settings.PRICE_WATCH_DEFAULT_DISCOUNT
+    template_id = values[2] if len(values) > 2 else None
+    if template_id is not None and not await repo.get_template(template_id):
+        await message.answer("Шаблон не найден")
+        return
+    user = await repo.get_user_by_tg_id(message.from_user.id)
+    await repo.add_watched_game(steam_id, user.id, min_discount, template_id)
+    await message.answer(f"{steam_id} отслеживается, порог скидки {min_discount}%")
+
+
+async def on_watched_select(
+    callback: types.CallbackQuery,
+    button: Button,
+    dialog_manager: DialogManager,
+    selected_item: str,
+):
+    await repo.delete_watched_game(int(selected_item))
+    await callback.answer("Удалено из отслеживания")
+
+
 administration_dialog = Dialog(
     Window(
         Const("Администрирование:"),
@@ -171,9 +227,32 @@ administration_dialog = Dialog(
             SwitchTo(Const("Пользователи"), id="users", state=AdminSG.users),
             SwitchTo(Const("Коды регистрации"), id="rcodes", state=AdminSG.register_codes),
         ),
+        SwitchTo(Const("Отслеживание скидок"), id="watchlist", state=AdminSG.watchlist),
         Cancel(Const("Назад")),
         state=AdminSG.menu,
     ),
+    Window(
+        Const("Отслеживаемые игры, нажмите чтобы удалить."),
+        Format(
+            "Добавить: app_id [скидка %, по умолчанию {default_discount}] [id шаблона]"
+        ),
+        ScrollingGroup(
+            Select(
+                Format("{item.steam_id}: -{item.discount_percent}% (порог {item.min_discount}%)"),
+                id="s_watched",
+                items="games",
+                on_click=on_watched_select,
+                item_id_getter=lambda g: g.id,
+            ),
+            width=1,
+            height=6,
+            id="watched_scroll",
+        ),
+        MessageInput(on_watch_input),
+        SwitchTo(Const("Назад"), id="back_to_admin", state=AdminSG.menu),
+        state=AdminSG.watchlist,
+        getter=watchlist_getter,
+    ),
     Window(
         Const("Каналы:"),
         Column(
@@ -193,8 +272,11 @@ administration_dialog = Dialog(
         getter=channels_getter,
     ),
     Window(
-        Format("Канал: {channel.title} ({channel.channel_id})"),
-        Button(Const("Удалить"), id="delete", on_click=delete_channel),
+        Format("Канал: {channel.title} ({channel.channel_id})\nСтатус: {status}, {state}"),
+        Row(
+            Button(Format("{toggle}"), id="toggle_active", on_click=toggle_channel),
+            Button(Const("Удалить"), id="delete", on_click=delete_channel),
+        ),
         Row(
             SwitchTo(Const("Назад"), id="back_to_channels", state=AdminSG.channels),
             Cancel(Const("Меню")),
@@ -1,8 +1,9 @@
 from __future__ import annotations
 
 import datetime
+from html import escape
 
-from aiogram import types, F
+from aiogram import Bot, types, F
 from aiogram_dialog import Dialog, Window, DialogManager, ShowMode, ChatEvent
 from aiogram_dialog.widgets.media import DynamicMedia
 from aiogram_dialog.widgets.media.dynamic import MediaAttachment
@@ -12,6 +13,8 @@ from aiogram.enums import ParseMode
 from aiogram_dialog.widgets.input import MessageInput, TextInput
 from aiogram_dialog.widgets.kbd import (
     Calendar,
+    CalendarScope,
+    ManagedCalendar,
     Row,
     SwitchTo,
     Cancel,
@@ -21,13 +24,21 @@ from aiogram_dialog.widgets.kbd import (
     Back,
     Checkbox,
     ManagedCheckbox,
+    ManagedMultiselect,
+    Column,
 )
-from aiogram_dialog.widgets.text import Const, Format
+from aiogram_dialog.widgets.kbd.calendar_kbd import CalendarDaysView, CalendarScopeView
+from aiogram_dialog.widgets.text import Const, Format, Text
 from config import settings
 
 from database import repository as repo
+from services import SteamError, app_index, compat_service, steam_client
+from utils.post_import import ImportReport, iter_import_rows
+from utils.schedule import parse_shift
+from utils.text import check_post, snippet
 from ..states import PostSG
-from tasks import send_post, schedule_post
+from tasks import reschedule_posts, send_post, schedule_post, schedule_posts
+from tasks.propagation import delete_post_copies, edit_post_copies, format_results, refresh_post_markup
 
 # MARK: creation
 
@@ -64,23 +75,64 @@ async def skip_image(
         await dialog_manager.switch_to(PostSG.app_id)
 
 
+async def select_app(message: types.Message, dialog_manager: DialogManager, app_id: int) -> None:
+    try:
+        app = await steam_client.get_app(app_id)
+    except SteamError:
+        app = None
+        await message.answer("Steam недоступен, app id не проверен")
+    else:
+        if app is None:
+            await message.answer("Игра с таким app id не найдена в Steam")
+            return
+    # compatibility data for the buttons is ready long before the post goes out
+    compat_service.refresh_later([app_id])
+    dialog_manager.dialog_data.pop("app_matches", None)
+    dialog_manager.dialog_data["app_id"] = app_id
+    dialog_manager.dialog_data["app_name"] = app.name if app else None
+    dialog_manager.dialog_data["app_price"] = app.price if app else None
+    if dialog_manager.dialog_data.pop("editing", False):
+        await dialog_manager.switch_to(PostSG.confirm)
+    else:
+        await dialog_manager.switch_to(PostSG.channels)
+
+
 async def on_app_id_success(
     message: types.Message,
     widget: TextInput,
     dialog_manager: DialogManager,
     app_id: int,
 ) -> None:
-    dialog_manager.dialog_data["app_id"] = app_id
-    if dialog_manager.dialog_data.pop("editing", False):
-        await dialog_manager.switch_to(PostSG.confirm)
-    else:
-        await dialog_manager.switch_to(PostSG.channels)
+    await select_app(message, dialog_manager, app_id)
 
 
 async def on_app_id_error(
-    message: types.Message, widget: TextInput, dialog_manager: DialogManager
+    message: types.Message,
+    widget: TextInput,
+    dialog_manager: DialogManager,
+    error: ValueError | None = None,
+) -> None:
+    # not a number: treat the input as a part of the game title
+    matches = app_index.search(message.text or "", limit=settings.APP_SEARCH_LIMIT)
+    if not matches:
+        await message.answer("Ничего не найдено. Введите app id или часть названия игры")
+        return
+    dialog_manager.dialog_data["app_matches"] = [
+        {"id": app_id, "name": name} for app_id, name in matches
+    ]
+
+
+async def on_app_selected(
+    callback: types.CallbackQuery,
+    widget: Select,
+    dialog_manager: DialogManager,
+    item_id: int,
 ) -> None:
-    await message.answer("Введите число")
+    await select_app(callback.message, dialog_manager, item_id)
+
+
+async def app_matches_getter(dialog_manager: DialogManager, **_kwargs):
+    return {"app_matches": dialog_manager.dialog_data.get("app_matches", [])}
 
 
 async def channels_getter(dialog_manager: DialogManager, **_kwargs):
@@ -88,6 +140,12 @@ async def channels_getter(dialog_manager: DialogManager, **_kwargs):
     return {"channels": channels}
 
 
+async def active_channels_getter(dialog_manager: DialogManager, **_kwargs):
+    # deactivated channels are skipped when sending anyway
+    channels = await repo.get_channels()
+    return {"channels": [channel for channel in channels if channel.is_active]}
+
+
 async def on_channels_next(
     callback: types.CallbackQuery, button: Button, dialog_manager: DialogManager
 ) -> None:
@@ -147,8 +205,59 @@ async def on_datetime_input(
     await dialog_manager.switch_to(PostSG.confirm)
 
 
-async def time_options_getter(**_kwargs):
-    return {"times": settings.POST_TIME_OPTIONS}
+SUPERSCRIPT = str.maketrans("0123456789", "⁰¹²³⁴⁵⁶⁷⁸⁹")
+
+
+class DayOccupancy(Text):
+    """Calendar day label with the number of posts scheduled on that day."""
+
+    def __init__(self, today: bool = False) -> None:
+        super().__init__()
+        self.today = today
+
+    async def _render_text(self, data: dict, manager: DialogManager) -> str:
+        day: datetime.date = data["date"]
+        label = f"[{day.day}]" if self.today else str(day.day)
+        count = data["data"].get("occupancy", {}).get(day)
+        return f"{label}{str(count).translate(SUPERSCRIPT)}" if count else label
+
+
+class OccupancyCalendar(Calendar):
+    """Calendar whose day buttons show how many posts each day already has."""
+
+    def _init_views(self) -> dict[CalendarScope, CalendarScopeView]:
+        views = super()._init_views()
+        views[CalendarScope.DAYS] = CalendarDaysView(
+            self._item_callback_data,
+            date_text=DayOccupancy(),
+            today_text=DayOccupancy(today=True),
+        )
+        return views
+
+
+async def calendar_getter(dialog_manager: DialogManager, **_kwargs):
+    calendar: ManagedCalendar = dialog_manager.find("cal")
+    month = calendar.get_offset() or datetime.date.today()
+    occupancy: dict[datetime.date, int] = {}
+    for scheduled_at, count in (await repo.get_month_schedule(month.year, month.month)).items():
+        occupancy[scheduled_at.date()] = occupancy.get(scheduled_at.date(), 0) + count
+    return {"occupancy": occupancy}
+
+
+async def time_options_getter(dialog_manager: DialogManager, **_kwargs):
+    date = dialog_manager.dialog_data.get("date")
+    schedule = {}
+    if date:
+        day = datetime.date.fromisoformat(date)
+        schedule = await repo.get_month_schedule(day.year, day.month)
+    times = []
+    for value in settings.POST_TIME_OPTIONS:
+        count = 0
+        if date:
+            at = datetime.datetime.combine(day, datetime.datetime.strptime(value, "%H:%M").time())
+            count = schedule.get(at, 0)
+        times.append({"time": value, "label": f"{value} · постов: {count}" if count else value})
+    return {"times": times}
 
 
 async def on_time_select(
@@ -191,14 +300,23 @@ async def confirm_getter(dialog_manager: DialogManager, **_kwargs):
     caption_val = dialog_manager.dialog_data.get("caption_above", False)
     buttons_val = dialog_manager.dialog_data.setdefault("use_default_buttons", True)
 
+    app_name = dialog_manager.dialog_data.get("app_name")
+    check = check_post(dialog_manager.dialog_data.get("text", ""), with_media=bool(image_id))
+
     cap_checkbox: ManagedCheckbox = dialog_manager.find("cb_caption")
     await cap_checkbox.set_checked(caption_val)
     def_checkbox: ManagedCheckbox = dialog_manager.find("cb_def_buttons")
     await def_checkbox.set_checked(buttons_val)
     return {
         "text": dialog_manager.dialog_data.get("text"),
-        "text_len": len(dialog_manager.dialog_data.get("text", "")),
+        "text_len": check.length,
+        "text_limit": check.limit,
+        "entities": check.entities,
+        "parts": len(check.parts) if len(check.parts) > 1 else None,
+        "text_error": check.error,
         "app_id": dialog_manager.dialog_data.get("app_id"),
+        "app_name": escape(app_name) if app_name else None,
+        "app_price": dialog_manager.dialog_data.get("app_price"),
         "channels": dialog_manager.dialog_data.get("channels", []),
         "scheduled_at": dialog_manager.dialog_data.get("scheduled_at"),
         "image_id": image_id,
@@ -281,16 +399,21 @@ async def on_buttons_input(
 async def create_post(
     callback: types.CallbackQuery, button: Button, dialog_manager: DialogManager
 ) -> None:
-    user = await repo.get_user_by_tg_id(callback.from_user.id)
     data = dialog_manager.dialog_data
+    # the post must fit Telegram limits before it gets scheduled
+    check = check_post(data.get("text", ""), with_media=bool(data.get("image_id")))
+    if check.error:
+        await callback.answer(check.error, show_alert=True)
+        return
+
+    user = await repo.get_user_by_tg_id(callback.from_user.id)
     scheduled = data.get("scheduled_at")
     scheduled_dt = (
         datetime.datetime.fromisoformat(scheduled)
         if scheduled
         else None
     )
-    post = await repo.create_post(
-        user_id=user.id,
+    values = dict(
         text=data.get("text"),
         steam_id=data.get("app_id"),
         scheduled_at=scheduled_dt,
@@ -298,15 +421,20 @@ async def create_post(
         caption_above=data.get("caption_above", False),
         use_default_buttons=data.get("use_default_buttons", True),
         buttons=data.get("buttons"),
+        chat_ids=data.get("channels", []),
     )
-
-    for cid in data.get("channels", []):
-        channel = await repo.get_channel_by_chat_id(cid)
-        await repo.link_post_channel(post.id, channel.id)
+    if data.get("draft_id"):
+        post = await repo.publish_draft(data["draft_id"], **values)
+        if post is None:
+            await callback.answer("Черновик уже опубликован", show_alert=True)
+            await dialog_manager.done()
+            return
+    else:
+        post = await repo.create_post(user_id=user.id, **values)
 
     bot = dialog_manager.middleware_data['bot']
     if post.scheduled_at:
-        schedule_post(post.scheduled_at, post.id, bot)
+        await schedule_post(post.scheduled_at, post.id, bot)
     else:
         await send_post(post.id, bot)
 
@@ -314,6 +442,305 @@ async def create_post(
     await dialog_manager.done()
 
 
+# MARK: drafts
+
+DRAFTS_LIMIT = 10
+
+
+async def start_create(
+    callback: types.CallbackQuery, button: Button, dialog_manager: DialogManager
+) -> None:
+    # a new post must not publish a draft opened earlier
+    dialog_manager.dialog_data.pop("draft_id", None)
+
+
+async def drafts_getter(dialog_manager: DialogManager, **_kwargs):
+    drafts = await repo.get_drafts(DRAFTS_LIMIT)
+    return {
+        "drafts": [
+            {"id": post.id, "snippet": snippet(post.text, 40)}
+            for post in drafts
+        ],
+        "no_drafts": not drafts,
+    }
+
+
+async def on_draft_select(
+    callback: types.CallbackQuery, widget: Select, dialog_manager: DialogManager, item_id: str
+) -> None:
+    post = await repo.get_post(int(item_id))
+    if post is None or not post.is_draft or post.is_sent:
+        await callback.answer("Черновик уже опубликован", show_alert=True)
+        return
+    app = None
+    if post.steam_id:
+        try:
+            app = await steam_client.get_app(post.steam_id)
+        except SteamError:
+            pass
+    # the draft goes through the usual channels -> schedule -> confirm steps
+    dialog_manager.dialog_data.update(
+        draft_id=post.id,
+        text=post.text,
+        image_id=post.tg_image_id,
+        app_id=post.steam_id,
+        app_name=app.name if app else None,
+        app_price=app.price if app else None,
+        buttons=post.buttons,
+        caption_above=post.caption_above,
+        use_default_buttons=post.use_default_buttons,
+        channels=[],
+        scheduled_at=None,
+    )
+    dialog_manager.dialog_data.pop("editing", None)
+    await dialog_manager.switch_to(PostSG.channels)
+
+
+# MARK: import
+
+IMPORT_MAX_SIZE = 20 * 1024 * 1024
+
+
+async def on_import_file(
+    message: types.Message, widget: MessageInput, dialog_manager: DialogManager
+) -> None:
+    document = message.document
+    if not document:
+        await message.answer("Пришлите файл .csv, .json или .jsonl")
+        return
+    if document.file_size and document.file_size > IMPORT_MAX_SIZE:
+        await message.answer("Файл слишком большой, максимум 20 МБ")
+        return
+
+    bot: Bot = dialog_manager.middleware_data["bot"]
+    user = await repo.get_user_by_tg_id(message.from_user.id)
+    channel_ids = {c.channel_id: c.id for c in await repo.get_channels()}
+    stream = await bot.download(document)
+
+    report = ImportReport()
+    created: list[tuple[int, datetime.datetime]] = []
+    chunk: list[dict] = []
+    for line, row, error in iter_import_rows(stream, document.file_name or "", set(channel_ids)):
+        if error:
+            report.errors.append((line, error))
+            continue
+        chunk.append({
+            "text": row.text,
+            "steam_id": row.steam_id,
+            "scheduled_at": row.scheduled_at,
+            "tg_image_id": row.tg_image_id,
+            "caption_above": row.caption_above,
+            "use_default_buttons": row.use_default_buttons,
+            "buttons": row.buttons,
+            "channel_ids": [channel_ids[cid] for cid in row.channels],
+        })
+        if len(chunk) >= settings.IMPORT_CHUNK_SIZE:
+            created.extend(await repo.bulk_create_posts(user.id, chunk, settings.IMPORT_CHUNK_SIZE))
+            chunk = []
+    if chunk:
+        created.extend(await repo.bulk_create_posts(user.id, chunk, settings.IMPORT_CHUNK_SIZE))
+
+    report.created = await schedule_posts(created, bot)
+    await message.answer(
+        f"Импортировано постов: {report.created}\nОшибок: {len(report.errors)}"
+    )
+    if report.errors:
+        await message.answer_document(
+            types.BufferedInputFile(report.errors_csv(), filename="import_errors.csv")
+        )
+
+
+# MARK: review
+
+SEARCH_PAGE_SIZE = 8
+
+
+async def on_search_query(
+    message: types.Message, widget: MessageInput, dialog_manager: DialogManager
+) -> None:
+    dialog_manager.dialog_data["search_query"] = message.text
+    dialog_manager.dialog_data["search_page"] = 0
+
+
+async def on_search_page(
+    callback: types.CallbackQuery, button: Button, dialog_manager: DialogManager
+) -> None:
+    page = dialog_manager.dialog_data.get("search_page", 0)
+    page += 1 if button.widget_id == "search_next" else -1
+    dialog_manager.dialog_data["search_page"] = max(page, 0)
+
+
+async def search_getter(dialog_manager: DialogManager, **_kwargs):
+    query = dialog_manager.dialog_data.get("search_query")
+    page = dialog_manager.dialog_data.get("search_page", 0)
+    posts = []
+    if query:
+        # one extra row tells whether there is a next page
+        posts = await repo.search_posts(
+            query,
+            limit=SEARCH_PAGE_SIZE + 1,
+            offset=page * SEARCH_PAGE_SIZE,
+            include_archive=True,
+        )
+    results = [
+        {
+            "id": post.id,
+            "date": f"{post.scheduled_at:%d.%m.%Y}" if post.scheduled_at else "—",
+            "snippet": snippet(post.text, 40),
+        }
+        for post in posts[:SEARCH_PAGE_SIZE]
+    ]
+    return {
+        "query": escape(query) if query else None,
+        "results": results,
+        "not_found": bool(query) and not results,
+        "has_prev": page > 0,
+        "has_next": len(posts) > SEARCH_PAGE_SIZE,
+        "page": page + 1,
+    }
+
+
+# MARK: edit
+
+SENT_POSTS_LIMIT = 10
+
+
+async def on_post_select(
+    callback: types.CallbackQuery, widget: Select, dialog_manager: DialogManager, item_id: str
+) -> None:
+    dialog_manager.dialog_data["edit_post_id"] = int(item_id)
+    await dialog_manager.switch_to(PostSG.edit_post)
+
+
+async def on_edit_post_id(
+    message: types.Message, widget: TextInput, dialog_manager: DialogManager, post_id: int
+) -> None:
+    if not await repo.get_post(post_id):
+        await message.answer("Пост с таким номером не найден")
+        return
+    dialog_manager.dialog_data["edit_post_id"] = post_id
+    await dialog_manager.switch_to(PostSG.edit_post)
+
+
+async def sent_posts_getter(dialog_manager: DialogManager, **_kwargs):
+    posts = await repo.get_sent_posts(SENT_POSTS_LIMIT)
+    return {
+        "posts": [
+            {
+                "id": post.id,
+                "date": f"{post.sent_at:%d.%m.%Y}" if post.sent_at else "—",
+                "snippet": snippet(post.text, 40),
+            }
+            for post in posts
+        ],
+    }
+
+
+async def edit_post_getter(dialog_manager: DialogManager, **_kwargs):
+    post_id = dialog_manager.dialog_data["edit_post_id"]
+    post = await repo.get_post(post_id)
+    deliveries = await repo.get_post_deliveries(post_id)
+    return {
+        "post_id": post_id,
+        "text": post.text if post else "Пост в архиве или удалён",
+        "copies": len(deliveries),
+        "has_copies": bool(deliveries),
+    }
+
+
+async def on_edit_text(
+    message: types.Message, widget: MessageInput, dialog_manager: DialogManager
+) -> None:
+    post = await repo.get_post(dialog_manager.dialog_data["edit_post_id"])
+    if not post:
+        await message.answer("Пост не найден")
+        return
+    text = message.html_text or message.text
+    check = check_post(text, with_media=bool(post.tg_image_id))
+    if check.error:
+        await message.answer(check.error)
+        return
+    # existing copies can only be edited, not extended with new messages
+    deliveries = await repo.get_post_deliveries(post.id)
+    capacity = min((len(message_ids) for _, message_ids in deliveries), default=1)
+    if len(check.parts) > capacity:
+        await message.answer(
+            f"Новый текст не помещается в отправленные сообщения: нужно {len(check.parts)}, есть {capacity}"
+        )
+        return
+
+    bot: Bot = dialog_manager.middleware_data["bot"]
+    results = await edit_post_copies(bot, post, text)
+    report = format_results(results)
+    done = sum(result.ok for result in results)
+    if results and not done:
+        report += "\n\nТекст поста не изменён: ни одна копия не обновилась"
+    elif done < len(results):
+        report += "\n\nВ каналах с ошибкой остался старый текст"
+    dialog_manager.dialog_data["edit_report"] = report
+    await dialog_manager.switch_to(PostSG.edit_result)
+
+
+async def on_refresh_markup(
+    callback: types.CallbackQuery, button: Button, dialog_manager: DialogManager
+) -> None:
+    post = await repo.get_post(dialog_manager.dialog_data["edit_post_id"])
+    bot: Bot = dialog_manager.middleware_data["bot"]
+    results = await refresh_post_markup(bot, post)
+    dialog_manager.dialog_data["edit_report"] = format_results(results)
+    await dialog_manager.switch_to(PostSG.edit_result)
+
+
+async def on_delete_copies(
+    callback: types.CallbackQuery, button: Button, dialog_manager: DialogManager
+) -> None:
+    post = await repo.get_post(dialog_manager.dialog_data["edit_post_id"])
+    bot: Bot = dialog_manager.middleware_data["bot"]
+    results = await delete_post_copies(bot, post)
+    dialog_manager.dialog_data["edit_report"] = format_results(results)
+    await dialog_manager.switch_to(PostSG.edit_result)
+
+
+async def edit_result_getter(dialog_manager: DialogManager, **_kwargs):
+    return {"report": dialog_manager.dialog_data.get("edit_report", "")}
+
+
+# MARK: reschedule
+
+RESCHEDULE_REPORT_LIMIT = 20
+
+
+async def on_reschedule_input(
+    message: types.Message, widget: MessageInput, dialog_manager: DialogManager
+) -> None:
+    try:
+        first, last, target = (message.text or "").split()
+        start = datetime.datetime.strptime(first, "%d-%m-%Y")
+        end = datetime.datetime.strptime(last, "%d-%m-%Y") + datetime.timedelta(days=1)
+        if target[0] in "+-":
+            shift, spread_from = parse_shift(target), None
+        else:
+            shift, spread_from = None, datetime.datetime.strptime(target, "%d-%m-%Y")
+    except ValueError:
+        await message.answer("Неверный формат. Пример: 21-06-2025 23-06-2025 +2d")
+        return
+    if end <= start:
+        await message.answer("Конец периода раньше начала")
+        return
+
+    selected: ManagedMultiselect = dialog_manager.find("m_res_channels")
+    channel_ids = [int(i) for i in selected.get_checked()]
+    bot: Bot = dialog_manager.middleware_data["bot"]
+    planned = await reschedule_posts(bot, start, end, shift, spread_from, channel_ids or None)
+    if not planned:
+        await message.answer("В этом периоде нет запланированных постов")
+        return
+    lines = [f"#{post_id} → {at:%d.%m.%Y %H:%M}" for post_id, at in planned[:RESCHEDULE_REPORT_LIMIT]]
+    if len(planned) > RESCHEDULE_REPORT_LIMIT:
+        lines.append("…")
+    await message.answer(f"Перенесено постов: {len(planned)}\n" + "\n".join(lines))
+
+
 # MARK: windows
 
 creation_windows = [
@@ -331,15 +758,26 @@ creation_windows = [
         state=PostSG.image,
     ),
     Window(
-        Const("Введите app id:"),
+        Const("Введите app id или часть названия игры:"),
         TextInput(
             id="app_id",
             type_factory=int,
             on_success=on_app_id_success,
             on_error=on_app_id_error,
         ),
+        Column(
+            Select(
+                Format("{item[name]} ({item[id]})"),
+                id="s_app",
+                items="app_matches",
+                item_id_getter=lambda a: a["id"],
+                type_factory=int,
+                on_click=on_app_selected,
+            ),
+        ),
         Back(Const("Назад")),
         state=PostSG.app_id,
+        getter=app_matches_getter,
     ),
     Window(
         Const("Куда отправлять пост?"),
@@ -354,7 +792,7 @@ creation_windows = [
         Button(Const("Далее"), id="ch_next", on_click=on_channels_next),
         Back(Const("Назад")),
         state=PostSG.channels,
-        getter=channels_getter,
+        getter=active_channels_getter,
     ),
 ]
 
@@ -371,19 +809,21 @@ schedule_windows = [
     Window(
         Const("Выберите дату."),
         Const("Дату можно отправить собщением в формате: 21-06-2025"),
-        Calendar(id="cal", on_click=on_date_selected),
+        Const("Цифра у даты — сколько постов уже запланировано на этот день."),
+        OccupancyCalendar(id="cal", on_click=on_date_selected),
         MessageInput(on_datetime_input),
         SwitchTo(Const("Отмена"), id="cal_cancel", state=PostSG.menu),
         state=PostSG.calendar,
+        getter=calendar_getter,
     ),
     Window(
         Const("Выберите время."),
         Const("Время можно отправить собщением в формате: 17:30"),
         Select(
-            Format("{item}"),
+            Format("{item[label]}"),
             id="sel_time",
             items="times",
-            item_id_getter=lambda x: x,
+            item_id_getter=lambda x: x["time"],
             on_click=on_time_select,
         ),
         MessageInput(on_datetime_input),
@@ -394,9 +834,13 @@ schedule_windows = [
     Window(
         Format("Текст:\n{text}"),
         Format("\nApp ID: <code>{app_id}</code>"),
+        Format("Игра: {app_name}", when=F["app_name"]),
+        Format("Цена: {app_price}", when=F["app_price"]),
         Format("Каналы: {channels}"),
         Format("Отправка: {scheduled_at}", when=F["scheduled_at"]),
-        Format("Колличество символов: {text_len}"),
+        Format("Колличество символов: {text_len}/{text_limit}, форматирование: {entities}"),
+        Format("⚠️ Пост будет разбит на {parts} сообщения", when=F["parts"]),
+        Format("⛔ {text_error}", when=F["text_error"]),
         DynamicMedia("media", when=F["image_id"]),
         Format("\nДополнительные кнопки:\n{buttons}", when=F["buttons"]),
         Row(
@@ -436,6 +880,41 @@ schedule_windows = [
     ),
 ]
 
+drafts_windows = [
+    Window(
+        Const("Выберите черновик, чтобы выбрать каналы и время отправки:"),
+        Const("Черновиков нет", when=F["no_drafts"]),
+        Column(
+            Select(
+                Format("#{item[id]} {item[snippet]}"),
+                id="s_drafts",
+                items="drafts",
+                item_id_getter=lambda p: p["id"],
+                on_click=on_draft_select,
+            ),
+        ),
+        SwitchTo(Const("Назад"), id="drafts_cancel", state=PostSG.menu),
+        state=PostSG.drafts,
+        getter=drafts_getter,
+    ),
+]
+
+import_windows = [
+    Window(
+        Const("Отправьте файл .csv, .json или .jsonl с постами."),
+        Const(
+            "Поля: <code>text</code>, <code>scheduled_at</code> (21-06-2025 17:30), "
+            "<code>channels</code> (id через пробел), <code>app_id</code>, <code>image</code>, "
+            "<code>caption_above</code>, <code>default_buttons</code>, "
+            "<code>buttons</code> (Text - URL через |)."
+        ),
+        MessageInput(on_import_file, content_types=[ContentType.DOCUMENT]),
+        SwitchTo(Const("Назад"), id="imp_cancel", state=PostSG.menu),
+        parse_mode=ParseMode.HTML,
+        state=PostSG.import_posts,
+    ),
+]
+
 buttons_windows = [
     Window(
         Const("Введите дополнительные кнопки в формате 'Text - URL' каждая с новой строки:"),
@@ -447,22 +926,106 @@ buttons_windows = [
 
 review_windows = [
     Window(
-        Const("Тут будет просмотр постов."),
+        Const("Отправьте слово или фразу для поиска по постам."),
+        Format("\nЗапрос: <b>{query}</b>, страница {page}", when=F["query"]),
+        Const("Ничего не найдено", when=F["not_found"]),
+        Column(
+            Select(
+                Format("#{item[id]} {item[date]} {item[snippet]}"),
+                id="s_search",
+                items="results",
+                item_id_getter=lambda r: r["id"],
+                on_click=on_post_select,
+            ),
+        ),
+        Row(
+            Button(Const("<"), id="search_prev", on_click=on_search_page, when=F["has_prev"]),
+            Button(Const(">"), id="search_next", on_click=on_search_page, when=F["has_next"]),
+        ),
+        MessageInput(on_search_query),
         SwitchTo(Const("Назад"), id="rev_cancel", state=PostSG.menu),
+        parse_mode=ParseMode.HTML,
         state=PostSG.review,
+        getter=search_getter,
     ),
 ]
 
 edit_windows = [
     Window(
-        Const("Тут будет редактирование поста."),
+        Const("Выберите отправленный пост или пришлите его номер:"),
+        Column(
+            Select(
+                Format("#{item[id]} {item[date]} {item[snippet]}"),
+                id="s_sent",
+                items="posts",
+                item_id_getter=lambda p: p["id"],
+                on_click=on_post_select,
+            ),
+        ),
+        TextInput(id="edit_post_id", type_factory=int, on_success=on_edit_post_id),
         SwitchTo(Const("Назад"), id="edit_cancel", state=PostSG.menu),
         state=PostSG.edit,
+        getter=sent_posts_getter,
     ),
     Window(
-        Const("Тут будет перенос поста."),
+        Format("<b>Пост #{post_id}</b>, отправленных копий: {copies}\n"),
+        Format("{text}"),
+        Row(
+            SwitchTo(Const("Изменить текст"), id="edit_sent_text", state=PostSG.edit_text),
+            Button(Const("Обновить кнопки"), id="edit_markup", on_click=on_refresh_markup),
+            when=F["has_copies"],
+        ),
+        SwitchTo(Const("Удалить из каналов"), id="edit_delete", state=PostSG.edit_delete, when=F["has_copies"]),
+        SwitchTo(Const("Назад"), id="edit_post_back", state=PostSG.edit),
+        parse_mode=ParseMode.HTML,
+        state=PostSG.edit_post,
+        getter=edit_post_getter,
+    ),
+    Window(
+        Const("Пришлите исправленный текст, он заменит текст во всех каналах."),
+        MessageInput(on_edit_text),
+        SwitchTo(Const("Назад"), id="edit_text_back", state=PostSG.edit_post),
+        state=PostSG.edit_text,
+    ),
+    Window(
+        Format("Удалить пост #{post_id} из всех каналов ({copies})?"),
+        Row(
+            Button(Const("Удалить"), id="edit_delete_yes", on_click=on_delete_copies),
+            SwitchTo(Const("Отмена"), id="edit_delete_no", state=PostSG.edit_post),
+        ),
+        state=PostSG.edit_delete,
+        getter=edit_post_getter,
+    ),
+    Window(
+        Format("{report}"),
+        SwitchTo(Const("К постам"), id="edit_result_back", state=PostSG.edit),
+        parse_mode=ParseMode.HTML,
+        state=PostSG.edit_result,
+        getter=edit_result_getter,
+    ),
+    Window(
+        Const("Отправьте период и сдвиг для переноса неотправленных постов:"),
+        Const(
+            "<code>21-06-2025 23-06-2025 +2d</code> — сдвинуть на 2 дня (h — часы, m — минуты)\n"
+            "<code>21-06-2025 23-06-2025 25-06-2025</code> — распределить по слотам с 25-06-2025\n"
+            "Посты встают в ближайшие свободные слоты из расписания."
+        ),
+        Const("Без выбранных каналов переносятся посты всех каналов."),
+        Column(
+            Multiselect(
+                checked_text=Format("✔️ {item.title} ({item.channel_id})"),
+                unchecked_text=Format("{item.title} ({item.channel_id})"),
+                id="m_res_channels",
+                items="channels",
+                item_id_getter=lambda c: c.id,
+                type_factory=int,
+            ),
+        ),
+        MessageInput(on_reschedule_input),
         SwitchTo(Const("Назад"), id="res_cancel", state=PostSG.menu),
+        parse_mode=ParseMode.HTML,
         state=PostSG.reschedule,
+        getter=channels_getter,
     ),
 ]
 
@@ -472,12 +1035,16 @@ dialog = Dialog(
     Window(
         Const("Управление постами:"),
         Row(
-            SwitchTo(Const("Создать"), id="create", state=PostSG.create),
-            SwitchTo(Const("Просмотр"), id="review", state=PostSG.review),
+            SwitchTo(Const("Создать"), id="create", state=PostSG.create, on_click=start_create),
+            SwitchTo(Const("Черновики"), id="drafts", state=PostSG.drafts),
         ),
         Row(
+            SwitchTo(Const("Просмотр"), id="review", state=PostSG.review),
             SwitchTo(Const("Редактировать"), id="edit", state=PostSG.edit),
+        ),
+        Row(
             SwitchTo(Const("Перенести"), id="reschedule", state=PostSG.reschedule),
+            SwitchTo(Const("Импорт из файла"), id="import", state=PostSG.import_posts),
         ),
         Cancel(Const("Назад")),
         state=PostSG.menu,
@@ -485,6 +1052,8 @@ dialog = Dialog(
     *creation_windows,
     *schedule_windows,
     *buttons_windows,
+    *import_windows,
+    *drafts_windows,
     *review_windows,
     *edit_windows,
 )
@@ -1,8 +1,172 @@
-from aiogram_dialog import Dialog, Window
-from aiogram_dialog.widgets.text import Const
-from aiogram_dialog.widgets.kbd import Row, SwitchTo, Cancel
+from html import escape
 
-from ..states import TemplateSG
+from aiogram import Bot, types
+from aiogram_dialog import Dialog, Window, DialogManager
+from aiogram_dialog.widgets.input import MessageInput
+from aiogram_dialog.widgets.text import Const, Format
+from aiogram_dialog.widgets.kbd import (
+    Button,
+    Cancel,
+    Column,
+    NextPage,
+    PrevPage,
+    Row,
+    ScrollingGroup,
+    Select,
+    SwitchTo,
+)
+from aiogram.enums import ParseMode
+
+from database import repository as repo
+from services import compat_service, steam_client
+from services.templating import collect_values
+from tasks import bot_jobstore, schedule_recurring, scheduler, unschedule_recurring
+from tasks.recurring import describe_schedule, parse_schedule, recurring_job_id
+from utils.templates import PLACEHOLDERS, TemplateError, compile_template, template_cache
+from ..states import PostSG, TemplateSG
+
+
+PLACEHOLDERS_HELP = "\n".join(
+    f"<code>{{{name}}}</code> — {description}" for name, description in PLACEHOLDERS.items()
+)
+
+
+async def on_template_name(message: types.Message, widget: MessageInput, dialog_manager: DialogManager):
+    dialog_manager.dialog_data["name"] = message.text.strip()
+    await dialog_manager.switch_to(TemplateSG.text)
+
+
+async def on_template_text(message: types.Message, widget: MessageInput, dialog_manager: DialogManager):
+    text = message.html_text or message.text
+    try:
+        compile_template(text)
+    except TemplateError as err:
+        await message.answer(str(err))
+        return
+
+    template_id = dialog_manager.dialog_data.get("template_id")
+    if dialog_manager.current_context().state == TemplateSG.edit:
+        await repo.update_template(template_id, text=text)
+    else:
+        user = await repo.get_user_by_tg_id(message.from_user.id)
+        template = await repo.create_template(
+            user_id=user.id,
+            name=dialog_manager.dialog_data.get("name"),
+            text=text,
+        )
+        dialog_manager.dialog_data["template_id"] = template.id
+    await dialog_manager.switch_to(TemplateSG.view)
+
+
+async def templates_getter(**_kwargs):
+    templates = await repo.get_templates()
+    return {"templates": templates}
+
+
+async def on_template_select(
+    callback: types.CallbackQuery,
+    widget: Select,
+    dialog_manager: DialogManager,
+    item_id: str,
+):
+    dialog_manager.dialog_data["template_id"] = int(item_id)
+    await dialog_manager.switch_to(TemplateSG.view)
+
+
+async def template_getter(dialog_manager: DialogManager, **_kwargs):
+    template = await repo.get_template(dialog_manager.dialog_data["template_id"])
+    return {"name": escape(template.name), "text": template.text}
+
+
+async def delete_template(callback: types.CallbackQuery, button: Button, dialog_manager: DialogManager):
+    await repo.delete_template(dialog_manager.dialog_data.pop("template_id"))
+    await dialog_manager.switch_to(TemplateSG.manage)
+
+
+async def on_batch_app_ids(message: types.Message, widget: MessageInput, dialog_manager: DialogManager):
+    try:
+        app_ids = [int(value) for value in message.text.replace(",", " ").split()]
+    except ValueError:
+        await message.answer("Введите app id через пробел")
+        return
+    if not app_ids:
+        return
+
+    template = await repo.get_template(dialog_manager.dialog_data["template_id"])
+    user = await repo.get_user_by_tg_id(message.from_user.id)
+    values = await collect_values(app_ids, steam_client, compat_service)
+    texts = template_cache.render_many(template.id, template.text, values.values())
+    created = await repo.bulk_create_posts(
+        user.id,
+        [
+            {
+                "text": text,
+                "steam_id": app_id,
+                "template_id": template.id,
+                "buttons": template.buttons,
+                "is_draft": True,
+            }
+            for app_id, text in zip(values, texts)
+        ],
+    )
+    ids = ", ".join(f"#{post_id}" for post_id, _ in created)
+    await message.answer(f"Создано черновиков: {len(created)}\n{ids}")
+    # drafts get their channels and send time in the post dialog
+    await dialog_manager.start(PostSG.drafts)
+
+
+async def recurring_getter(dialog_manager: DialogManager, **_kwargs):
+    recurring_posts = await repo.get_recurring_posts(dialog_manager.dialog_data["template_id"])
+    jobstore = bot_jobstore(dialog_manager.middleware_data["bot"])
+    items = []
+    for recurring in recurring_posts:
+        job = scheduler.get_job(recurring_job_id(recurring.id), jobstore)
+        next_run = f"{job.next_run_time:%d.%m.%Y %H:%M}" if job and job.next_run_time else "—"
+        items.append({
+            "id": recurring.id,
+            "label": f"{describe_schedule(recurring)}, каналов: {len(recurring.chat_ids)}, далее {next_run}",
+        })
+    return {"recurring": items}
+
+
+async def on_recurring_input(message: types.Message, widget: MessageInput, dialog_manager: DialogManager):
+    parts = [part.strip() for part in message.text.split("|")]
+    try:
+        cron, interval = parse_schedule(parts[0])
+        chat_ids = [int(value) for value in parts[1].split()]
+        steam_id = int(parts[2]) if len(parts) > 2 and parts[2] else None
+    except (ValueError, IndexError):
+        await message.answer("Формат: расписание | id каналов через пробел [| app_id]")
+        return
+    known = {channel.channel_id for channel in await repo.get_channels()}
+    unknown = [chat_id for chat_id in chat_ids if chat_id not in known]
+    if not chat_ids or unknown:
+        await message.answer(f"Неизвестные каналы: {' '.join(map(str, unknown))}" if unknown else "Укажите каналы")
+        return
+
+    user = await repo.get_user_by_tg_id(message.from_user.id)
+    recurring = await repo.add_recurring_post(
+        template_id=dialog_manager.dialog_data["template_id"],
+        user_id=user.id,
+        chat_ids=chat_ids,
+        cron=cron,
+        interval_minutes=interval,
+        steam_id=steam_id,
+    )
+    bot: Bot = dialog_manager.middleware_data["bot"]
+    await schedule_recurring(recurring, bot)
+    await message.answer(f"Повторение добавлено: {describe_schedule(recurring)}")
+
+
+async def on_recurring_select(
+    callback: types.CallbackQuery,
+    widget: Select,
+    dialog_manager: DialogManager,
+    item_id: str,
+):
+    await unschedule_recurring(int(item_id), dialog_manager.middleware_data["bot"])
+    await repo.delete_recurring_post(int(item_id))
+    await callback.answer("Повторение удалено")
 
 
 templates_dialog = Dialog(
@@ -16,18 +180,89 @@ templates_dialog = Dialog(
         state=TemplateSG.menu,
     ),
     Window(
-        Const("Тут будет создание шаблона."),
-        Cancel(Const("Назад")),
+        Const("Введите название шаблона:"),
+        MessageInput(on_template_name),
+        SwitchTo(Const("Назад"), id="create_back", state=TemplateSG.menu),
         state=TemplateSG.create,
     ),
     Window(
-        Const("Тут будет управление шаблонами."),
-        Cancel(Const("Назад")),
+        Const("Введите текст шаблона. Доступные подстановки:"),
+        Const(PLACEHOLDERS_HELP),
+        MessageInput(on_template_text),
+        SwitchTo(Const("Назад"), id="text_back", state=TemplateSG.create),
+        parse_mode=ParseMode.HTML,
+        state=TemplateSG.text,
+    ),
+    Window(
+        Const("Шаблоны:"),
+        ScrollingGroup(
+            Select(
+                Format("{item.name}"),
+                id="s_template",
+                items="templates",
+                on_click=on_template_select,
+                item_id_getter=lambda t: t.id,
+            ),
+            width=1,
+            height=6,
+            id="templates_scroll",
+        ),
+        Row(
+            PrevPage(scroll="templates_scroll"),
+            NextPage(scroll="templates_scroll"),
+        ),
+        SwitchTo(Const("Назад"), id="manage_back", state=TemplateSG.menu),
         state=TemplateSG.manage,
+        getter=templates_getter,
     ),
     Window(
-        Const("Тут будет редактирование шаблона."),
-        Cancel(Const("Назад")),
+        Format("<b>{name}</b>\n"),
+        Format("{text}"),
+        Row(
+            SwitchTo(Const("Изменить текст"), id="edit", state=TemplateSG.edit),
+            Button(Const("Удалить"), id="delete", on_click=delete_template),
+        ),
+        SwitchTo(Const("Черновики для игр"), id="batch", state=TemplateSG.batch),
+        SwitchTo(Const("Повторение"), id="recurring", state=TemplateSG.recurring),
+        SwitchTo(Const("Назад"), id="view_back", state=TemplateSG.manage),
+        parse_mode=ParseMode.HTML,
+        state=TemplateSG.view,
+        getter=template_getter,
+    ),
+    Window(
+        Const("Введите новый текст шаблона. Доступные подстановки:"),
+        Const(PLACEHOLDERS_HELP),
+        MessageInput(on_template_text),
+        SwitchTo(Const("Назад"), id="edit_back", state=TemplateSG.view),
+        parse_mode=ParseMode.HTML,
         state=TemplateSG.edit,
     ),
+    Window(
+        Const("Введите app id игр через пробел, для каждой будет создан черновик поста."),
+        Const("Черновики откроются в Посты → Черновики, там выбираются каналы и время."),
+        MessageInput(on_batch_app_ids),
+        SwitchTo(Const("Назад"), id="batch_back", state=TemplateSG.view),
+        state=TemplateSG.batch,
+    ),
+    Window(
+        Const("Повторяющиеся посты по шаблону, нажмите чтобы удалить."),
+        Const(
+            "Добавить: <code>расписание | id каналов [| app_id]</code>\n"
+            "Расписание — cron (<code>0 10 * * 1</code>) или интервал (<code>30m</code>, <code>12h</code>, <code>1d</code>)."
+        ),
+        Column(
+            Select(
+                Format("{item[label]}"),
+                id="s_recurring",
+                items="recurring",
+                item_id_getter=lambda r: r["id"],
+                on_click=on_recurring_select,
+            ),
+        ),
+        MessageInput(on_recurring_input),
+        SwitchTo(Const("Назад"), id="recurring_back", state=TemplateSG.view),
+        parse_mode=ParseMode.HTML,
+        state=TemplateSG.recurring,
+        getter=recurring_getter,
+    ),
 )
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import time
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramAPIError, TelegramRetryAfter
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import BufferedInputFile, TelegramObject, Update
+
+from database import bot_scope
+from utils.metrics import (
+    bot_api_errors_total,
+    bot_api_seconds,
+    handler_errors_total,
+    handler_seconds,
+    retry_after_total,
+    updates_total,
+)
+from utils.profiling import SamplingProfiler
+from utils.tracing import tracer
+
+
+class BotScopeMiddleware(BaseMiddleware):
+    """Outer update middleware pointing the database at the receiving bot's schema."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        with bot_scope(data["bot"].id):
+            return await handler(event, data)
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Inner middleware counting and timing handlers per dialog state.
+
+    Dialog windows are all served by aiogram_dialog's own handlers, so the
+    dialog state is what tells them apart.
+    """
+
+    def __init__(self, event: str) -> None:
+        self.event = event
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        handler_object = data.get("handler")
+        context = data.get("aiogd_context")
+        labels = {
+            "event": self.event,
+            "handler": getattr(getattr(handler_object, "callback", None), "__qualname__", "unknown"),
+            "state": context.state.state if context is not None else "",
+        }
+        started = time.perf_counter()
+        try:
+            with tracer.span(labels["handler"], "handler", state=labels["state"]):
+                return await handler(event, data)
+        except Exception:
+            handler_errors_total.inc(**labels)
+            raise
+        finally:
+            handler_seconds.observe(time.perf_counter() - started, **labels)
+            updates_total.inc(**labels)
+
+
+class RequestMetricsMiddleware(BaseRequestMiddleware):
+    """Session middleware timing Bot API calls and counting flood waits."""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        name = method.__api_method__
+        started = time.perf_counter()
+        try:
+            with tracer.span(name, "bot_api"):
+                return await make_request(bot, method)
+        except TelegramRetryAfter:
+            retry_after_total.inc(method=name)
+            raise
+        except TelegramAPIError as err:
+            bot_api_errors_total.inc(method=name, error=type(err).__name__)
+            raise
+        finally:
+            bot_api_seconds.observe(time.perf_counter() - started, method=name)
+
+
+class TracingMiddleware(BaseMiddleware):
+    """Outer update middleware opening the root span of sampled updates.
+
+    It also runs admin profiling sessions: while one is active every update
+    is traced and the sampling profiler watches the event loop thread; after
+    the requested number of updates the collapsed stacks are sent to the
+    admin as a document.
+    """
+
+    def __init__(self) -> None:
+        self._profiler: SamplingProfiler | None = None
+        self._remaining = 0
+        self._chat_id: int | None = None
+
+    def start_profiling(self, chat_id: int, updates: int, interval: float) -> bool:
+        if self._profiler is not None:
+            return False
+        self._profiler = SamplingProfiler(interval=interval)
+        self._remaining = updates
+        self._chat_id = chat_id
+        self._profiler.start()
+        return True
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: dict[str, Any],
+    ) -> Any:
+        profiling = self._profiler is not None
+        token = tracer.start(event.update_id, force=profiling)
+        try:
+            with tracer.span("update", "update", type=event.event_type):
+                return await handler(event, data)
+        finally:
+            tracer.finish(token)
+            if profiling and self._profiler is not None:
+                self._remaining -= 1
+                if self._remaining <= 0:
+                    await self._send_report(data["bot"])
+
+    async def _send_report(self, bot: Bot) -> None:
+        profiler, chat_id = self._profiler, self._chat_id
+        self._profiler = self._chat_id = None
+        profiler.stop()
+        await bot.send_document(
+            chat_id,
+            BufferedInputFile(profiler.collapsed().encode(), filename="profile.collapsed.txt"),
+            caption=f"Сэмплов: {profiler.samples}. Формат collapsed stacks для flamegraph или speedscope.",
+        )
@@ -22,11 +22,17 @@ class PostSG(StatesGroup):
     time = State()
     buttons = State()
     confirm = State()
+    import_posts = State()
+    drafts = State()
 
     # management
     review = State()
     reschedule = State()
     edit = State()
+    edit_post = State()
+    edit_text = State()
+    edit_delete = State()
+    edit_result = State()
 
 
 class TemplateSG(StatesGroup):
@@ -34,8 +40,12 @@ class TemplateSG(StatesGroup):
 
     menu = State()
     create = State()
+    text = State()
     manage = State()
+    view = State()
     edit = State()
+    batch = State()
+    recurring = State()
 
 
 class AdminSG(StatesGroup):
@@ -51,3 +61,4 @@ class AdminSG(StatesGroup):
     register_codes = State()
     show_codes = State()
     show_code = State()
+    watchlist = State()
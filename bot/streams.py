@@ -0,0 +1,358 @@
+"""Update processing spread over processes through Redis Streams.
+
+The receiver takes updates from Telegram (long polling or a webhook) and
+appends them as they came to ``partitions`` streams per bot. The partition
+is picked by chat id, so the updates of a chat always land in the same
+stream, in order.
+
+Workers read the streams through one consumer group. A partition is held
+by one worker at a time through a lease key, so the updates of a chat are
+never handled by two workers at once; live workers split the partitions
+evenly and hand extra ones back when another worker joins; a partition
+keeps its lease until the entries already read from it are handled. Entries
+are acknowledged once handled. Entries a dead worker left unacknowledged are
+claimed by the partition's next holder before it reads anything new.
+"""
+from __future__ import annotations
+
+import asyncio
+import math
+import os
+import socket
+import time
+import zlib
+from logging import getLogger
+from typing import Iterable
+
+from aiogram import Bot, Dispatcher
+from aiogram.methods import TelegramMethod
+from aiogram.types import Update
+from aiohttp import web
+from redis.asyncio import Redis
+from redis.exceptions import ResponseError
+
+from utils.metrics import stream_updates_total
+
+
+logger = getLogger("bot.streams")
+
+# both only touch the lease while it is still held by the caller
+_RENEW = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_RELEASE = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def stream_name(prefix: str, bot_id: int, partition: int) -> str:
+    return f"{prefix}:{bot_id}:{partition}"
+
+
+def chat_key(update: Update) -> int:
+    """Id whose updates must stay in order: the chat, or the user for events without one."""
+    try:
+        event = update.event
+    except Exception:
+        return 0
+    chat = getattr(event, "chat", None) or getattr(getattr(event, "message", None), "chat", None)
+    if chat is not None:
+        return chat.id
+    user = getattr(event, "from_user", None) or getattr(event, "user", None)
+    return user.id if user is not None else 0
+
+
+async def ensure_group(redis: Redis, stream: str, group: str) -> None:
+    try:
+        await redis.xgroup_create(stream, group, id="0", mkstream=True)
+    except ResponseError as err:
+        if "BUSYGROUP" not in str(err):
+            raise
+
+
+class UpdateReceiver:
+    """Appends the updates of ``bots`` to their partition streams.
+
+    Updates come by long polling, or by webhook when ``webhook_url`` is set;
+    either way nothing is handled here.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        bots: Iterable[Bot],
+        *,
+        prefix: str,
+        group: str,
+        partitions: int,
+        maxlen: int,
+        webhook_url: str = "",
+        webhook_secret: str = "",
+    ) -> None:
+        self.redis = redis
+        self.bots = {bot.id: bot for bot in bots}
+        self.prefix = prefix
+        self.group = group
+        self.partitions = partitions
+        self.maxlen = maxlen
+        self.webhook_url = webhook_url.rstrip("/")
+        self.webhook_secret = webhook_secret
+        self._stop = asyncio.Event()
+
+    async def publish(self, bot_id: int, updates: list[tuple[int, str]]) -> None:
+        """Append ``(chat key, update JSON)`` pairs in one round trip."""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key, raw in updates:
+                stream = stream_name(self.prefix, bot_id, key % self.partitions)
+                pipe.xadd(stream, {"update": raw}, maxlen=self.maxlen, approximate=True)
+            await pipe.execute()
+        stream_updates_total.inc(len(updates), stage="published")
+
+    async def run(self, allowed_updates: list[str], host: str = "0.0.0.0", port: int = 8080) -> None:
+        """Receive until :meth:`stop` is called."""
+        # groups exist before the first entry, so workers starting later miss nothing
+        for bot_id in self.bots:
+            for partition in range(self.partitions):
+                await ensure_group(self.redis, stream_name(self.prefix, bot_id, partition), self.group)
+
+        if self.webhook_url:
+            runner = await self._serve_webhook(allowed_updates, host, port)
+            try:
+                await self._stop.wait()
+            finally:
+                await runner.cleanup()
+            return
+
+        tasks = [asyncio.create_task(self._poll(bot, allowed_updates)) for bot in self.bots.values()]
+        try:
+            await self._stop.wait()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    async def _poll(self, bot: Bot, allowed_updates: list[str], timeout: int = 30) -> None:
+        offset: int | None = None
+        failures = 0
+        while True:
+            try:
+                updates = await bot.get_updates(offset=offset, timeout=timeout, allowed_updates=allowed_updates)
+                if updates:
+                    await self.publish(
+                        bot.id,
+                        [(chat_key(update), update.model_dump_json(by_alias=True, exclude_none=True)) for update in updates],
+                    )
+                    # confirmed to Telegram with the next request, only once they are in Redis
+                    offset = updates[-1].update_id + 1
+                failures = 0
+            except Exception as err:
+                failures += 1
+                delay = min(2 ** failures, 30)
+                logger.warning("Receiving updates of bot %s failed, retry in %ss: %s", bot.id, delay, err)
+                await asyncio.sleep(delay)
+
+    async def _serve_webhook(self, allowed_updates: list[str], host: str, port: int) -> web.AppRunner:
+        app = web.Application()
+        app.router.add_post("/webhook/{bot_id}", self._handle_webhook)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        for bot in self.bots.values():
+            await bot.set_webhook(
+                f"{self.webhook_url}/webhook/{bot.id}",
+                secret_token=self.webhook_secret or None,
+                allowed_updates=allowed_updates,
+            )
+        logger.info("Webhook served on http://%s:%s", host, port)
+        return runner
+
+    async def _handle_webhook(self, request: web.Request) -> web.Response:
+        if self.webhook_secret and request.headers.get("X-Telegram-Bot-Api-Secret-Token") != self.webhook_secret:
+            return web.Response(status=401)
+        bot_id = int(request.match_info["bot_id"]) if request.match_info["bot_id"].isdigit() else 0
+        if bot_id not in self.bots:
+            return web.Response(status=404)
+        raw = await request.text()
+        update = Update.model_validate_json(raw)
+        # an error answer makes Telegram deliver the update again
+        await self.publish(bot_id, [(chat_key(update), raw)])
+        return web.Response()
+
+
+class StreamWorker:
+    """Handles updates from the partition streams of ``bots`` with ``dp``."""
+
+    def __init__(
+        self,
+        dp: Dispatcher,
+        bots: Iterable[Bot],
+        redis: Redis,
+        *,
+        prefix: str,
+        group: str,
+        partitions: int,
+        batch: int,
+        block_ms: int,
+        lease_ms: int,
+        claim_idle_ms: int,
+        consumer: str | None = None,
+    ) -> None:
+        self.dp = dp
+        self.redis = redis
+        self.group = group
+        self.batch = batch
+        self.block_ms = block_ms
+        self.lease_ms = lease_ms
+        self.claim_idle_ms = claim_idle_ms
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self._bots = {
+            stream_name(prefix, bot.id, partition): bot for bot in bots for partition in range(partitions)
+        }
+        # start at a different partition per worker, so workers rarely race for the same lease
+        streams = list(self._bots)
+        start = zlib.crc32(self.consumer.encode()) % len(streams)
+        self._candidates = streams[start:] + streams[:start]
+        self._workers_key = f"{prefix}:workers:{group}"
+        self._renew = redis.register_script(_RENEW)
+        self._release = redis.register_script(_RELEASE)
+        # held partitions and the tasks consuming them
+        self._tasks: dict[str, asyncio.Task] = {}
+        # partitions handed back once the entries already read are handled
+        self._leaving: set[str] = set()
+        self._stop = asyncio.Event()
+
+    @property
+    def held(self) -> list[str]:
+        return [stream for stream in self._tasks if stream not in self._leaving]
+
+    async def run(self) -> None:
+        """Hold and consume partitions until :meth:`stop` is called."""
+        logger.info("Worker %s consuming %s partitions", self.consumer, len(self._bots))
+        try:
+            while not self._stop.is_set():
+                try:
+                    await self._rebalance()
+                except Exception as err:
+                    logger.warning("Rebalancing failed: %s", err)
+                try:
+                    await asyncio.wait_for(self._stop.wait(), self.lease_ms / 3000)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._leaving.update(self._tasks)
+            while self._tasks:
+                await asyncio.wait(set(self._tasks.values()), timeout=self.lease_ms / 3000)
+                try:
+                    await self._renew_leases()
+                except Exception as err:
+                    logger.warning("Renewing leases failed: %s", err)
+            await self.redis.zrem(self._workers_key, self.consumer)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    async def _rebalance(self) -> None:
+        now = time.time()
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zadd(self._workers_key, {self.consumer: now})
+            pipe.zremrangebyscore(self._workers_key, "-inf", now - self.lease_ms / 1000)
+            pipe.zcard(self._workers_key)
+            *_, alive = await pipe.execute()
+
+        await self._renew_leases()
+
+        fair = math.ceil(len(self._bots) / max(alive, 1))
+        held = self.held
+        for stream in held[fair:]:
+            self._leaving.add(stream)
+        for stream in self._candidates:
+            if len(held) >= fair:
+                break
+            if stream in self._tasks:
+                continue
+            if await self.redis.set(f"{stream}:lease", self.consumer, nx=True, px=self.lease_ms):
+                self._tasks[stream] = asyncio.create_task(self._consume(stream))
+                held.append(stream)
+
+    async def _renew_leases(self) -> None:
+        """Renew the lease of every partition being consumed, leaving ones included:
+        a partition is only free for others once its last batch is acknowledged."""
+        for stream in list(self._tasks):
+            if not await self._renew(keys=[f"{stream}:lease"], args=[self.consumer, self.lease_ms]):
+                if stream not in self._leaving:
+                    logger.warning("Lost the lease of %s", stream)
+                self._leaving.add(stream)
+
+    async def _consume(self, stream: str) -> None:
+        bot = self._bots[stream]
+        try:
+            await ensure_group(self.redis, stream, self.group)
+            # whatever earlier holders read and never acknowledged is older than
+            # anything new; the lease is exclusive, so it is claimed however
+            # briefly it has been idle
+            cursor = "0-0"
+            while stream not in self._leaving:
+                cursor, entries, *_ = await self.redis.xautoclaim(
+                    stream, self.group, self.consumer, 0, start_id=cursor, count=self.batch
+                )
+                if entries:
+                    stream_updates_total.inc(len(entries), stage="reclaimed")
+                await self._handle_batch(bot, stream, entries)
+                if cursor == "0-0":
+                    break
+            next_claim = time.monotonic() + self.claim_idle_ms / 2000
+            while stream not in self._leaving:
+                entries = []
+                if time.monotonic() >= next_claim:
+                    # left by a holder that hung past its lease
+                    _, entries, *_ = await self.redis.xautoclaim(
+                        stream, self.group, self.consumer, self.claim_idle_ms, count=self.batch
+                    )
+                    if entries:
+                        stream_updates_total.inc(len(entries), stage="reclaimed")
+                    else:
+                        next_claim = time.monotonic() + self.claim_idle_ms / 2000
+                if not entries:
+                    response = await self.redis.xreadgroup(
+                        self.group, self.consumer, {stream: ">"}, count=self.batch, block=self.block_ms
+                    )
+                    entries = response[0][1] if response else []
+                await self._handle_batch(bot, stream, entries)
+        except Exception as err:
+            logger.exception("Consuming %s failed: %s", stream, err)
+        finally:
+            self._tasks.pop(stream, None)
+            self._leaving.discard(stream)
+            try:
+                await self._release(keys=[f"{stream}:lease"], args=[self.consumer])
+            except Exception as err:
+                logger.warning("Releasing %s failed, it expires on its own: %s", stream, err)
+
+    async def _handle_batch(self, bot: Bot, stream: str, entries: list[tuple[str, dict[str, str]]]) -> None:
+        # the whole batch is handled even when leaving: the next holder
+        # would only reclaim it after reading newer entries
+        for entry_id, fields in entries:
+            await self._handle(bot, entry_id, fields)
+            await self.redis.xack(stream, self.group, entry_id)
+
+    async def _handle(self, bot: Bot, entry_id: str, fields: dict[str, str]) -> None:
+        try:
+            update = Update.model_validate_json(fields["update"], context={"bot": bot})
+            response = await self.dp.feed_update(bot, update)
+            if isinstance(response, TelegramMethod):
+                await self.dp.silent_call_request(bot, response)
+        except Exception as err:
+            # like polling: a failing update is logged and does not hold up the chat
+            logger.exception("Update %s of bot %s failed: %s", entry_id, bot.id, err)
+            stream_updates_total.inc(stage="failed")
+        else:
+            stream_updates_total.inc(stage="handled")
@@ -1,6 +1,14 @@
+import atexit
+import copy
+import json
 import logging
-import logging.config
 import os
+import queue
+import random
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
 
 from config import settings
@@ -8,65 +16,197 @@ from config import settings
 LOG_FORMAT = "[%(name)s][%(asctime)s] (%(levelname)s) %(filename)s.%(funcName)s.(%(lineno)s) - %(message)s"
 
 
-def configure_logging(log_dir: str | None = None, loggers: dict[str, str] | None = None) -> None:
-    """Configure application logging using ``dictConfig``."""
-
-    if logging.getLogger().handlers:
-        return
-
-    loggers = loggers or getattr(settings, "LOGGERS", {})
-    log_dir = log_dir or os.getenv("LOG_DIR") or getattr(settings, "LOG_DIR", "logs")
-    log_path = Path(log_dir)
-    log_path.mkdir(parents=True, exist_ok=True)
-
-    handlers: dict[str, dict] = {
-        "console": {
-            "class": "logging.StreamHandler",
-            "level": "INFO",
-            "formatter": "default",
-            "stream": "ext://sys.stdout",
-        },
-        "app_file": {
-            "class": "logging.handlers.RotatingFileHandler",
-            "level": "DEBUG",
-            "formatter": "default",
-            "filename": str(log_path / "app.log"),
-            "maxBytes": 10 ** 6,
-            "backupCount": 3,
-        },
-    }
-
-    logger_configs: dict[str, dict] = {}
-    for logger_name, file_name in loggers.items():
-        handler_name = f"{logger_name.replace('.', '_')}_file"
-        handlers[handler_name] = {
-            "class": "logging.handlers.RotatingFileHandler",
-            "level": "DEBUG",
-            "formatter": "default",
-            "filename": str(log_path / file_name),
-            "maxBytes": 10 ** 6,
-            "backupCount": 3,
-        }
-        logger_configs[logger_name] = {
-            "level": "DEBUG",
-            "handlers": ["console", handler_name],
-            "propagate": False,
-        }
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line."""
 
-    logging.config.dictConfig(
-        {
-            "version": 1,
-            "disable_existing_loggers": False,
-            "formatters": {
-                "default": {
-                    "format": LOG_FORMAT,
-                }
-            },
-            "handlers": handlers,
-            "root": {
-                "level": "DEBUG",
-                "handlers": ["console", "app_file"],
-            },
-            "loggers": logger_configs,
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "module": record.module,
+            "func": record.funcName,
+            "line": record.lineno,
         }
-    )
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload["exc"] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+def _lookup(table: dict, name: str, cache: dict) -> tuple[str, object]:
+    """``(prefix, value)`` of the most specific logger prefix of ``name`` in ``table``."""
+    found = cache.get(name)
+    if found is None:
+        found = ("", None)
+        prefix = name
+        while prefix:
+            if prefix in table:
+                found = (prefix, table[prefix])
+                break
+            prefix = prefix.rpartition(".")[0]
+        cache[name] = found
+    return found
+
+
+class ThrottleFilter(logging.Filter):
+    """Sample and rate-limit records of noisy loggers before they are queued.
+
+    ``sampling`` keeps the given share of records, ``rate_limits`` caps
+    records per second; both are keyed by logger prefix. Warnings and errors
+    always pass.
+    """
+
+    def __init__(self, sampling: dict[str, float], rate_limits: dict[str, int]) -> None:
+        super().__init__()
+        self.sampling = sampling
+        self.rate_limits = rate_limits
+        self._sampling_cache: dict[str, tuple[str, float | None]] = {}
+        self._limit_cache: dict[str, tuple[str, int | None]] = {}
+        # per configured prefix: (window start, records in window)
+        self._windows: dict[str, tuple[float, int]] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        _, share = _lookup(self.sampling, record.name, self._sampling_cache)
+        if share is not None and random.random() >= share:
+            return False
+        prefix, limit = _lookup(self.rate_limits, record.name, self._limit_cache)
+        if limit is None:
+            return True
+        now = time.monotonic()
+        started, count = self._windows.get(prefix, (now, 0))
+        if now - started >= 1:
+            started, count = now, 0
+        self._windows[prefix] = (started, count + 1)
+        return count < limit
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Queue handler that never blocks: records are dropped when the queue is full.
+
+    Only the message is rendered here; timestamps, tracebacks and file
+    writes happen in the listener thread.
+    """
+
+    def __init__(self, log_queue: queue.Queue) -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class RoutingQueueListener(QueueListener):
+    """Queue listener sending each record to the handlers of its logger prefix."""
+
+    def __init__(
+        self,
+        log_queue: queue.Queue,
+        routes: dict[str, list[logging.Handler]],
+        default: list[logging.Handler],
+    ) -> None:
+        handlers = list(dict.fromkeys(handler for group in [default, *routes.values()] for handler in group))
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.routes = routes
+        self.default = default
+        self._route_cache: dict[str, tuple[str, list[logging.Handler] | None]] = {}
+
+    def handle(self, record: logging.LogRecord) -> None:
+        _, handlers = _lookup(self.routes, record.name, self._route_cache)
+        handlers = handlers or self.default
+        for handler in handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+    def enqueue_sentinel(self) -> None:
+        # at shutdown it is fine to wait for room in a full queue
+        self.queue.put(self._sentinel)
+
+
+queue_handler: DroppingQueueHandler | None = None
+_listener: RoutingQueueListener | None = None
+_lock = threading.Lock()
+
+
+def _file_handler(path: Path, formatter: logging.Formatter) -> logging.Handler:
+    handler = RotatingFileHandler(path, maxBytes=10 ** 6, backupCount=3, encoding="utf-8")
+    handler.setLevel(logging.DEBUG)
+    handler.setFormatter(formatter)
+    return handler
+
+
+def configure_logging(log_dir: str | None = None, loggers: dict[str, str] | None = None) -> None:
+    """Route application logging through a bounded queue to a listener thread.
+
+    Loggers only put records on the queue; console and rotating file
+    handlers run in the listener thread, so the event loop never waits for
+    the disk. Each logger in ``LOGGERS`` still gets its own file.
+    """
+    global queue_handler, _listener
+
+    with _lock:
+        if logging.getLogger().handlers:
+            return
+
+        loggers = loggers or getattr(settings, "LOGGERS", {})
+        log_dir = log_dir or os.getenv("LOG_DIR") or getattr(settings, "LOG_DIR", "logs")
+        log_path = Path(log_dir)
+        log_path.mkdir(parents=True, exist_ok=True)
+
+        text_formatter = logging.Formatter(LOG_FORMAT)
+        file_formatter = JsonFormatter() if settings.LOG_JSON else text_formatter
+
+        console = logging.StreamHandler(sys.stdout)
+        console.setLevel(logging.INFO)
+        console.setFormatter(text_formatter)
+
+        files: dict[str, logging.Handler] = {}
+
+        def file_handler(file_name: str) -> logging.Handler:
+            # loggers sharing a file share the handler, so rotation stays consistent
+            if file_name not in files:
+                files[file_name] = _file_handler(log_path / file_name, file_formatter)
+            return files[file_name]
+
+        default = [console, file_handler("app.log")]
+        routes = {name: [console, file_handler(file_name)] for name, file_name in loggers.items()}
+
+        log_queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+        queue_handler = DroppingQueueHandler(log_queue)
+        queue_handler.addFilter(ThrottleFilter(settings.LOG_SAMPLING, settings.LOG_RATE_LIMITS))
+
+        root = logging.getLogger()
+        root.setLevel(logging.DEBUG)
+        root.addHandler(queue_handler)
+        for name in loggers:
+            logger = logging.getLogger(name)
+            logger.setLevel(logging.DEBUG)
+            logger.handlers = [queue_handler]
+            logger.propagate = False
+
+        _listener = RoutingQueueListener(log_queue, routes, default)
+        _listener.start()
+        atexit.register(stop_logging)
+
+
+def stop_logging() -> None:
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
@@ -5,20 +5,140 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
     DB_DSN: str = "sqlite+aiosqlite:///db.sqlite3"
-    BOT_TOKEN: str
+    DB_QUERY_CACHE_SIZE: int = 500
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 256
+    BOT_TOKEN: str = ""
+    # several bots in one process: token -> Postgres schema holding the bot's data,
+    # "" keeps the default schema; BOT_TOKEN is used when this is empty
+    BOTS: dict[str, str] = {}
 
     REDIS_URL: str = "redis://redis:6379"
     REDIS_DB: int = 1
 
     POST_TIME_OPTIONS: list[str] = ["10:00", "14:00", "18:00"]
+    # seconds a month of calendar post counts stays cached
+    CALENDAR_CACHE_TTL: int = 300
+    # labels may use {protondb_tier}, {protondb_badge}, {deck_status} and {deck_badge}
     POST_BUTTONS: dict[str, str] = {
-        "Steam": "https://store.steampowered.com/app/{app_id}/",
-        "ProtonDB": "https://www.protondb.com/app/{app_id}/",
+        "Steam {deck_badge}": "https://store.steampowered.com/app/{app_id}/",
+        "ProtonDB {protondb_badge}": "https://www.protondb.com/app/{app_id}/",
         "SteamDB": "https://steamdb.info/app/{app_id}/charts/",
     }
 
+    IMPORT_CHUNK_SIZE: int = 200
+
+    STEAM_STORE_URL: str = "https://store.steampowered.com"
+    STEAM_COUNTRY: str = "ru"
+    STEAM_LANGUAGE: str = "russian"
+    STEAM_TIMEOUT: int = 10
+    STEAM_POOL_SIZE: int = 20
+    STEAM_CACHE_TTL: int = 6 * 60 * 60
+    STEAM_NOT_FOUND_TTL: int = 60 * 60
+    STEAM_MEMORY_CACHE_SIZE: int = 2048
+    STEAM_REDIS_PREFIX: str = "sdtg:steam"
+
+    STEAM_API_URL: str = "https://api.steampowered.com"
+    # enables incremental app list refreshes through IStoreService
+    STEAM_API_KEY: str | None = None
+    STEAM_APP_INDEX_PATH: str = "data/steam_apps.idx"
+    STEAM_APP_INDEX_REFRESH_HOURS: int = 24
+    STEAM_APP_INDEX_TIMEOUT: int = 120
+    # names a title search looks at per source, which bounds its time on a common query
+    STEAM_APP_INDEX_MAX_CANDIDATES: int = 2000
+    APP_SEARCH_LIMIT: int = 8
+
+    PROTONDB_URL: str = "https://www.protondb.com"
+    COMPAT_CACHE_TTL: int = 12 * 60 * 60
+    COMPAT_STALE_TTL: int = 7 * 24 * 60 * 60
+    COMPAT_MEMORY_CACHE_SIZE: int = 4096
+    COMPAT_CONCURRENCY: int = 8
+    COMPAT_BATCH_SIZE: int = 50
+    COMPAT_TIMEOUT: int = 10
+    COMPAT_REDIS_PREFIX: str = "sdtg:compat"
+    # posts scheduled within this window get their compatibility data prefetched
+    COMPAT_WARMUP_HOURS: int = 24
+    COMPAT_WARMUP_INTERVAL_MINUTES: int = 30
+
+    # getMe/getChat answers and chat memberships kept in Redis; the in-memory copy
+    # is kept shorter, as invalidations from other processes do not reach it
+    TELEGRAM_CACHE_TTL: int = 60 * 60
+    TELEGRAM_MEMBER_CACHE_TTL: int = 10 * 60
+    TELEGRAM_MEMORY_CACHE_TTL: int = 60
+    TELEGRAM_MEMORY_CACHE_SIZE: int = 1024
+    TELEGRAM_REDIS_PREFIX: str = "sdtg:tg"
+
+    # price watcher: apps per appdetails request and requests per run
+    PRICE_WATCH_BATCH_SIZE: int = 100
+    PRICE_WATCH_REQUESTS_PER_RUN: int = 10
+    PRICE_WATCH_RUN_MINUTES: int = 5
+    # poll interval in seconds: reset to the minimum on a change, doubled while nothing changes
+    PRICE_WATCH_MIN_INTERVAL: int = 60 * 60
+    PRICE_WATCH_MAX_INTERVAL: int = 24 * 60 * 60
+    PRICE_WATCH_DEFAULT_DISCOUNT: int = 50
+
+    # sent posts older than this are moved to ``posts_archive``; 0 disables archiving
+    ARCHIVE_AFTER_DAYS: int = 180
+    ARCHIVE_BATCH_SIZE: int = 500
+    ARCHIVE_MAX_BATCHES: int = 20
+    ARCHIVE_INTERVAL_MINUTES: int = 60
+
+    # minutes between checks of the bot's rights in every channel, 0 disables them;
+    # channels checked at once
+    CHANNEL_CHECK_INTERVAL_MINUTES: int = 60
+    CHANNEL_CHECK_BATCH_SIZE: int = 20
+
+    # edits and deletions of delivered copies: parallel requests, requests per second, retries on flood wait
+    PROPAGATION_CONCURRENCY: int = 5
+    PROPAGATION_RATE: float = 20
+    PROPAGATION_RETRIES: int = 3
+    # flood waits sat out per message when sending a post, then the post is left for the next start
+    DELIVERY_RETRIES: int = 3
+    # minutes between resumptions of posts whose sending was cut short
+    DELIVERY_RESUME_MINUTES: int = 5
+
+    # seconds a shutdown waits for posts being sent before it stops them, to be resumed on the next start
+    SHUTDOWN_DRAIN_SECONDS: int = 30
+
+    # Prometheus text endpoint at http://METRICS_HOST:METRICS_PORT/metrics, 0 disables it
+    METRICS_HOST: str = "127.0.0.1"
+    METRICS_PORT: int = 0
+
+    # share of updates traced into TRACE_FILE (Chrome trace format), 0 disables tracing
+    TRACE_SAMPLE_RATE: float = 0.0
+    TRACE_FILE: str = "logs/trace.json"
+    # /profile: seconds between stack samples and the most updates per session
+    PROFILE_INTERVAL: float = 0.005
+    PROFILE_MAX_UPDATES: int = 100
+
+    # main.py --mode receiver/worker: updates go through UPDATE_STREAM_PARTITIONS
+    # Redis streams per bot, a chat always lands in the same one
+    UPDATE_STREAM_PREFIX: str = "sdtg:updates"
+    UPDATE_STREAM_PARTITIONS: int = 16
+    UPDATE_STREAM_GROUP: str = "workers"
+    # entries kept per stream, trimmed approximately
+    UPDATE_STREAM_MAXLEN: int = 10000
+    # worker: entries per read, milliseconds a read blocks, milliseconds a partition
+    # lease lasts without renewal and an entry stays unacknowledged before it is reclaimed
+    UPDATE_STREAM_BATCH: int = 10
+    UPDATE_STREAM_BLOCK_MS: int = 2000
+    UPDATE_STREAM_LEASE_MS: int = 15000
+    UPDATE_STREAM_CLAIM_IDLE_MS: int = 60000
+    # workers hand the jobs they schedule to the receiver's scheduler through this stream
+    JOB_STREAM: str = "sdtg:jobs"
+    # receiver takes updates by webhook at WEBHOOK_URL/webhook/<bot id> instead of polling
+    WEBHOOK_URL: str = ""
+    WEBHOOK_HOST: str = "0.0.0.0"
+    WEBHOOK_PORT: int = 8080
+    WEBHOOK_SECRET: str = ""
 
     LOG_DIR: str = "logs"
+    # log files as JSON lines instead of LOG_FORMAT text
+    LOG_JSON: bool = False
+    # records waiting for the writer thread; more are dropped instead of blocking
+    LOG_QUEUE_SIZE: int = 10000
+    # per logger prefix, below WARNING only: share of records kept and records per second
+    LOG_SAMPLING: dict[str, float] = {}
+    LOG_RATE_LIMITS: dict[str, int] = {}
 
     LOGGERS: dict[str, str] = {
         "bot": "bot.log",
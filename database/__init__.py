@@ -1,34 +1,99 @@
 from __future__ import annotations
 
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
 from config import settings
 
 from sqlalchemy import MetaData
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
+from sqlalchemy.orm import Session
 
 from .models import Base
 
 from redis.asyncio import Redis
+from utils.metrics import InstrumentedRedis
 
-__all__ = ["engine", "async_session_factory", "AsyncSession", "Base", "redis"]
+__all__ = [
+    "engine",
+    "async_session_factory",
+    "AsyncSession",
+    "Base",
+    "redis",
+    "bot_scope",
+    "current_schema",
+    "set_bot_schema",
+]
 
 metadata = MetaData()
 
 DB_DSN = settings.DB_DSN
 
+connect_args: dict = {}
+if make_url(DB_DSN).get_driver_name() == "asyncpg":
+    # asyncpg keeps server-side prepared statements per connection
+    connect_args["prepared_statement_cache_size"] = settings.DB_PREPARED_STATEMENT_CACHE_SIZE
+
 engine: AsyncEngine = create_async_engine(
     DB_DSN,
     echo=False,
     pool_size=5,
     max_overflow=10,
+    query_cache_size=settings.DB_QUERY_CACHE_SIZE,
+    connect_args=connect_args,
 )
 
-async_session_factory = async_sessionmaker(engine, expire_on_commit=False)
+# schema of the bot whose update or job is being handled, None is the default one
+_schema: ContextVar[str | None] = ContextVar("db_schema", default=None)
+_bot_schemas: dict[int, str] = {}
+# one engine per schema sharing ``engine``'s pool, only the statements are rewritten
+_schema_engines: dict[str, Engine] = {}
+
+
+def set_bot_schema(bot_id: int, schema: str) -> None:
+    """Keep the data of bot ``bot_id`` in ``schema``; "" means the default schema."""
+    if schema:
+        _bot_schemas[bot_id] = schema
+    else:
+        _bot_schemas.pop(bot_id, None)
+
+
+def current_schema() -> str | None:
+    return _schema.get()
+
+
+@contextmanager
+def bot_scope(bot_id: int) -> Iterator[None]:
+    """Sessions opened inside work on the schema of bot ``bot_id``."""
+    token = _schema.set(_bot_schemas.get(bot_id))
+    try:
+        yield
+    finally:
+        _schema.reset(token)
+
+
+class _SchemaSession(Session):
+    def get_bind(self, mapper=None, **kwargs):
+        schema = _schema.get()
+        if schema is None:
+            return super().get_bind(mapper, **kwargs)
+        bind = _schema_engines.get(schema)
+        if bind is None:
+            bind = _schema_engines[schema] = engine.sync_engine.execution_options(
+                schema_translate_map={None: schema}
+            )
+        return bind
+
+
+async_session_factory = async_sessionmaker(engine, expire_on_commit=False, sync_session_class=_SchemaSession)
 
-redis: Redis = Redis.from_url(
+redis: Redis = InstrumentedRedis.from_url(
     f"{settings.REDIS_URL}/{settings.REDIS_DB}", decode_responses=True
 )
@@ -25,6 +25,10 @@ if config.config_file_name is not None:
 # target_metadata = mymodel.Base.metadata
 target_metadata = Base.metadata
 
+# ``alembic -x schema=name upgrade head`` migrates the tables of a bot whose
+# data lives in its own Postgres schema (see ``settings.BOTS``)
+schema = context.get_x_argument(as_dictionary=True).get("schema")
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -56,6 +60,12 @@ def run_migrations_offline() -> None:
 
 
 def do_run_migrations(connection: Connection) -> None:
+    if schema:
+        connection.exec_driver_sql(f'CREATE SCHEMA IF NOT EXISTS "{schema}"')
+        connection.exec_driver_sql(f'SET search_path TO "{schema}"')
+        connection.commit()
+        # unqualified names, including alembic_version, now resolve to the schema
+        connection.dialect.default_schema_name = schema
     context.configure(connection=connection, target_metadata=target_metadata)
 
     with context.begin_transaction():
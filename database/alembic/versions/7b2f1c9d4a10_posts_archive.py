@@ -0,0 +1,53 @@
+"""posts archive
+
+Revision ID: 7b2f1c9d4a10
+Revises: 3ffb4ebad57b
+Create Date: 2026-10-19 10:12:41.208113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b2f1c9d4a10'
+down_revision: Union[str, Sequence[str], None] = '3ffb4ebad57b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('posts', sa.Column('sent_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_index('ix_posts_is_sent_scheduled_at', 'posts', ['is_sent', 'scheduled_at'])
+
+    op.create_table('posts_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('steam_id', sa.BigInteger(), nullable=True),
+    sa.Column('text', sa.Text(), nullable=False),
+    sa.Column('tg_message_id', sa.BigInteger(), nullable=True),
+    sa.Column('tg_image_id', sa.String(length=255), nullable=True),
+    sa.Column('caption_above', sa.Boolean(), nullable=False),
+    sa.Column('use_default_buttons', sa.Boolean(), nullable=False),
+    sa.Column('buttons', sa.JSON(), nullable=True),
+    sa.Column('scheduled_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('sent_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('template_id', sa.Integer(), nullable=True),
+    sa.Column('channel_ids', sa.JSON(), nullable=False),
+    sa.Column('archived_at', sa.DateTime(timezone=True), server_default=sa.func.current_timestamp(), nullable=False),
+    sa.ForeignKeyConstraint(['template_id'], ['templates.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_posts_archive_scheduled_at', 'posts_archive', ['scheduled_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_posts_archive_scheduled_at', table_name='posts_archive')
+    op.drop_table('posts_archive')
+    op.drop_index('ix_posts_is_sent_scheduled_at', table_name='posts')
+    op.drop_column('posts', 'sent_at')
@@ -0,0 +1,54 @@
+"""price watcher
+
+Revision ID: 9d5e27b8c3f1
+Revises: c4e8a61f0b37
+Create Date: 2026-10-19 15:02:17.904216
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d5e27b8c3f1'
+down_revision: Union[str, Sequence[str], None] = 'c4e8a61f0b37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('posts', sa.Column('is_draft', sa.Boolean(), nullable=False, server_default=sa.false()))
+    op.alter_column('posts', 'is_draft', server_default=None)
+
+    op.create_table('watched_games',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('steam_id', sa.BigInteger(), nullable=False),
+    sa.Column('min_discount', sa.Integer(), nullable=False),
+    sa.Column('template_id', sa.Integer(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('price_initial', sa.Integer(), nullable=True),
+    sa.Column('price_final', sa.Integer(), nullable=True),
+    sa.Column('discount_percent', sa.Integer(), nullable=False),
+    sa.Column('currency', sa.String(length=8), nullable=True),
+    sa.Column('drafted_discount', sa.Integer(), nullable=False),
+    sa.Column('poll_interval', sa.Integer(), nullable=False),
+    sa.Column('next_check_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('last_checked_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('last_modified', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['template_id'], ['templates.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('steam_id')
+    )
+    op.create_index('ix_watched_games_next_check_at', 'watched_games', ['next_check_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_watched_games_next_check_at', table_name='watched_games')
+    op.drop_table('watched_games')
+    op.drop_column('posts', 'is_draft')
@@ -0,0 +1,41 @@
+"""recurring posts
+
+Revision ID: a8c2e5d71b93
+Revises: e3f7a9b15d24
+Create Date: 2026-10-19 19:12:44.208731
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8c2e5d71b93'
+down_revision: Union[str, Sequence[str], None] = 'e3f7a9b15d24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('recurring_posts',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('template_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('cron', sa.String(length=100), nullable=True),
+    sa.Column('interval_minutes', sa.Integer(), nullable=True),
+    sa.Column('chat_ids', sa.JSON(), nullable=False),
+    sa.Column('steam_id', sa.BigInteger(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('last_run_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['template_id'], ['templates.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('recurring_posts')
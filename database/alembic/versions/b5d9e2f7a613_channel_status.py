@@ -0,0 +1,36 @@
+"""channel status
+
+Revision ID: b5d9e2f7a613
+Revises: f2b6d8e41c57
+Create Date: 2026-10-19 19:48:12.604381
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5d9e2f7a613'
+down_revision: Union[str, Sequence[str], None] = 'f2b6d8e41c57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+channel_status = sa.Enum('OK', 'NO_RIGHTS', 'REMOVED', name='channelstatus')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    channel_status.create(op.get_bind(), checkfirst=True)
+    op.add_column('channels', sa.Column('status', channel_status, nullable=False, server_default='OK'))
+    op.add_column('channels', sa.Column('is_active', sa.Boolean(), nullable=False, server_default=sa.true()))
+    op.alter_column('channels', 'status', server_default=None)
+    op.alter_column('channels', 'is_active', server_default=None)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('channels', 'is_active')
+    op.drop_column('channels', 'status')
+    channel_status.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,52 @@
+"""posts full text search
+
+Revision ID: c4e8a61f0b37
+Revises: 7b2f1c9d4a10
+Create Date: 2026-10-19 12:40:03.551927
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from utils.text import strip_html
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e8a61f0b37'
+down_revision: Union[str, Sequence[str], None] = '7b2f1c9d4a10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# must match ``database.repository._pg_document``
+PG_DOCUMENT = "to_tsvector('simple', regexp_replace(text, '<[^>]+>', ' ', 'g'))"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.execute(f"CREATE INDEX ix_posts_text_fts ON posts USING gin ({PG_DOCUMENT})")
+        op.execute(f"CREATE INDEX ix_posts_archive_text_fts ON posts_archive USING gin ({PG_DOCUMENT})")
+    elif bind.dialect.name == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE posts_fts USING fts5(text, tokenize='unicode61 remove_diacritics 2')"
+        )
+        for table in ('posts', 'posts_archive'):
+            rows = bind.execute(sa.text(f"SELECT id, text FROM {table}")).all()
+            if rows:
+                bind.execute(
+                    sa.text("INSERT INTO posts_fts(rowid, text) VALUES (:id, :text)"),
+                    [{"id": row.id, "text": strip_html(row.text)} for row in rows],
+                )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.drop_index('ix_posts_archive_text_fts', table_name='posts_archive')
+        op.drop_index('ix_posts_text_fts', table_name='posts')
+    elif bind.dialect.name == 'sqlite':
+        op.execute("DROP TABLE posts_fts")
@@ -0,0 +1,28 @@
+"""post channel messages
+
+Revision ID: e3f7a9b15d24
+Revises: 9d5e27b8c3f1
+Create Date: 2026-10-19 17:41:08.512390
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3f7a9b15d24'
+down_revision: Union[str, Sequence[str], None] = '9d5e27b8c3f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('posts_channels', sa.Column('message_ids', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('posts_channels', 'message_ids')
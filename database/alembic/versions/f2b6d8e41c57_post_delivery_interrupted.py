@@ -0,0 +1,29 @@
+"""post delivery interrupted
+
+Revision ID: f2b6d8e41c57
+Revises: a8c2e5d71b93
+Create Date: 2026-10-19 19:05:43.217904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b6d8e41c57'
+down_revision: Union[str, Sequence[str], None] = 'a8c2e5d71b93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('posts', sa.Column('delivery_interrupted', sa.Boolean(), nullable=False, server_default=sa.false()))
+    op.alter_column('posts', 'delivery_interrupted', server_default=None)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('posts', 'delivery_interrupted')
@@ -3,7 +3,7 @@ from __future__ import annotations
 import enum
 from datetime import datetime
 
-from sqlalchemy import BigInteger, Boolean, Enum, ForeignKey, Integer, String, Text, DateTime, JSON, func
+from sqlalchemy import BigInteger, Boolean, Enum, ForeignKey, Index, Integer, String, Text, DateTime, JSON, func
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 
@@ -16,6 +16,14 @@ class ChannelType(enum.Enum):
     CHANNEL = "channel"
 
 
+class ChannelStatus(enum.Enum):
+    OK = "ok"
+    # still a member, but cannot post
+    NO_RIGHTS = "no_rights"
+    # left, kicked or the chat is gone
+    REMOVED = "removed"
+
+
 class UserRole(enum.Enum):
     ADMIN = "admin"
     MANAGER = "manager"
@@ -27,6 +35,8 @@ class PostChannel(Base):
 
     post_id: Mapped[int] = mapped_column(ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True)
     channel_id: Mapped[int] = mapped_column(ForeignKey("channels.id", ondelete="CASCADE"), primary_key=True)
+    # ids of the delivered messages in the channel, the first one carries the keyboard
+    message_ids: Mapped[list[int] | None] = mapped_column(JSON, nullable=True)
 
 
 class User(Base):
@@ -48,6 +58,9 @@ class Channel(Base):
     channel_id: Mapped[int] = mapped_column(BigInteger, unique=True, nullable=False)
     channel_type: Mapped[ChannelType] = mapped_column(Enum(ChannelType), nullable=False)
     title: Mapped[str | None] = mapped_column(String(length=255))
+    # what the bot last learned about its membership; inactive channels get no posts
+    status: Mapped[ChannelStatus] = mapped_column(Enum(ChannelStatus), default=ChannelStatus.OK, nullable=False)
+    is_active: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
 
     posts: Mapped[list["Post"]] = relationship(
         secondary="posts_channels",
@@ -80,10 +93,18 @@ class Post(Base):
     use_default_buttons: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
     buttons: Mapped[list[dict] | None] = mapped_column(JSON, nullable=True)
     scheduled_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    sent_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
     is_sent: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+    is_draft: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+    # a shutdown stopped sending before all channels got the post
+    delivery_interrupted: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
     template_id: Mapped[int | None] = mapped_column(ForeignKey("templates.id", ondelete="SET NULL"))
 
+    __table_args__ = (
+        Index("ix_posts_is_sent_scheduled_at", "is_sent", "scheduled_at"),
+    )
+
     author: Mapped["User"] = relationship(back_populates="posts")
     template: Mapped[Template | None] = relationship(back_populates="posts")
     channels: Mapped[list["Channel"]] = relationship(
@@ -92,6 +113,81 @@ class Post(Base):
     )
 
 
+class ArchivedPost(Base):
+    """Sent post moved out of ``posts`` by the archive mover.
+
+    Channel links are kept inline in ``channel_ids`` so the hot
+    ``posts_channels`` table only holds rows for live posts.
+    """
+
+    __tablename__ = "posts_archive"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    steam_id: Mapped[int | None] = mapped_column(BigInteger)
+    text: Mapped[str] = mapped_column(Text, nullable=False)
+    tg_message_id: Mapped[int | None] = mapped_column(BigInteger)
+    tg_image_id: Mapped[str | None] = mapped_column(String(length=255))
+    caption_above: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+    use_default_buttons: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
+    buttons: Mapped[list[dict] | None] = mapped_column(JSON, nullable=True)
+    scheduled_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), index=True)
+    sent_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    user_id: Mapped[int | None] = mapped_column(ForeignKey("users.id", ondelete="SET NULL"))
+    template_id: Mapped[int | None] = mapped_column(ForeignKey("templates.id", ondelete="SET NULL"))
+    channel_ids: Mapped[list[int]] = mapped_column(JSON, nullable=False, default=list)
+    archived_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.current_timestamp())
+
+
+class WatchedGame(Base):
+    """Steam app polled by the price watcher, with the last seen price state."""
+
+    __tablename__ = "watched_games"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    steam_id: Mapped[int] = mapped_column(BigInteger, unique=True, nullable=False)
+    min_discount: Mapped[int] = mapped_column(Integer, nullable=False)
+    template_id: Mapped[int | None] = mapped_column(ForeignKey("templates.id", ondelete="SET NULL"))
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
+    is_active: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
+
+    price_initial: Mapped[int | None] = mapped_column(Integer)
+    price_final: Mapped[int | None] = mapped_column(Integer)
+    discount_percent: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    currency: Mapped[str | None] = mapped_column(String(length=8))
+    drafted_discount: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+    poll_interval: Mapped[int] = mapped_column(Integer, nullable=False)
+    next_check_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
+    last_checked_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    last_modified: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+
+    user: Mapped["User"] = relationship()
+    template: Mapped[Template | None] = relationship()
+
+
+class RecurringPost(Base):
+    """Template posted on a cron or fixed-interval schedule.
+
+    Only the definition is stored; each occurrence becomes a post when the
+    scheduler fires it.
+    """
+
+    __tablename__ = "recurring_posts"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    template_id: Mapped[int] = mapped_column(ForeignKey("templates.id", ondelete="CASCADE"))
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
+    cron: Mapped[str | None] = mapped_column(String(length=100))
+    interval_minutes: Mapped[int | None] = mapped_column(Integer)
+    chat_ids: Mapped[list[int]] = mapped_column(JSON, nullable=False, default=list)
+    steam_id: Mapped[int | None] = mapped_column(BigInteger)
+    is_active: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
+    last_run_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+
+    user: Mapped["User"] = relationship()
+    template: Mapped[Template] = relationship()
+
+
 class RegistrationCode(Base):
     __tablename__ = "registration_codes"
 
@@ -1,34 +1,74 @@
 from __future__ import annotations
 
+from collections import defaultdict
 from datetime import datetime
 
-from sqlalchemy import select
-
-from . import async_session_factory
+from sqlalchemy import ColumnElement, case, bindparam, delete, func, insert, literal, literal_column, select, union_all, update
+from sqlalchemy import text as sql_text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from config import settings
+from utils.cache import TTLCache
+from utils.schedule import as_local
+from utils.templates import template_cache
+from utils.text import strip_html
+from . import async_session_factory, current_schema, engine
 from .models import (
+    ArchivedPost,
     Base,
     Channel,
+    ChannelStatus,
     ChannelType,
     Post,
     PostChannel,
+    RecurringPost,
     RegistrationCode,
     Template,
     User,
     UserRole,
+    WatchedGame,
+)
+
+
+# Hot-path lookups execute statements built once at import with bound
+# parameters: SQLAlchemy memoizes the cache key on the statement object, so a
+# call skips both building the statement and walking it for the compiled cache.
+_user_by_tg_id = select(User).where(User.tg_id == bindparam("tg_id"))
+_user_by_id = select(User).where(User.id == bindparam("user_id"))
+_channel_by_chat_id = select(Channel).where(Channel.channel_id == bindparam("chat_id"))
+_template_by_id = select(Template).where(Template.id == bindparam("template_id"))
+_post_by_id = select(Post).where(Post.id == bindparam("post_id"))
+_post_channels = (
+    select(Channel)
+    .join(PostChannel, Channel.id == PostChannel.channel_id)
+    .where(PostChannel.post_id == bindparam("post_id"))
+)
+_undelivered_channels = _post_channels.where(PostChannel.message_ids.is_(None), Channel.is_active.is_(True))
+_post_deliveries = (
+    select(Channel, PostChannel.message_ids)
+    .join(PostChannel, Channel.id == PostChannel.channel_id)
+    .where(PostChannel.post_id == bindparam("post_id"), PostChannel.message_ids.is_not(None))
+)
+_code_by_id = select(RegistrationCode).where(RegistrationCode.id == bindparam("code"))
+_code_by_code = select(RegistrationCode).where(RegistrationCode.code == bindparam("code"))
+
+# per schema and month ``{scheduled_at: posts}`` for the calendar, dropped
+# whenever posts are created, moved or removed
+_month_schedule: TTLCache[tuple[str | None, int, int], dict[datetime, int]] = TTLCache(
+    settings.CALENDAR_CACHE_TTL, maxsize=24
 )
 
 
 # Users
 async def get_user_by_tg_id(tg_id: int) -> User | None:
-    stmt = select(User).where(User.tg_id == tg_id)
     async with async_session_factory() as session:
-        return await session.scalar(stmt)
+        return await session.scalar(_user_by_tg_id, {"tg_id": tg_id})
 
 
 async def get_user(user_id: int) -> User | None:
-    stmt = select(User).where(User.id == user_id)
     async with async_session_factory() as session:
-        return await session.scalar(stmt)
+        return await session.scalar(_user_by_id, {"user_id": user_id})
 
 
 async def create_user(
@@ -50,9 +90,8 @@ async def get_users() -> list[User]:
 
 
 async def modify_user(user_id: int, role: str | UserRole) -> None:
-    stmt = select(User).where(User.id == user_id)
     async with async_session_factory() as session:
-        user = await session.scalar(stmt)
+        user = await session.scalar(_user_by_id, {"user_id": user_id})
         if user:
             if isinstance(role, str):
                 role = UserRole[role]
@@ -62,9 +101,8 @@ async def modify_user(user_id: int, role: str | UserRole) -> None:
 
 # Channels
 async def get_channel_by_chat_id(chat_id: int) -> Channel | None:
-    stmt = select(Channel).where(Channel.channel_id == chat_id)
     async with async_session_factory() as session:
-        return await session.scalar(stmt)
+        return await session.scalar(_channel_by_chat_id, {"chat_id": chat_id})
 
 
 async def create_channel(
@@ -85,10 +123,33 @@ async def get_channels() -> list[Channel]:
         return list(result)
 
 
+async def set_channel_status(chat_id: int, status: ChannelStatus) -> tuple[Channel, ChannelStatus] | None:
+    """Store the bot's status in a channel; returns the channel and its previous status.
+
+    A channel turning dead is deactivated and one recovering is activated
+    again; otherwise ``is_active`` stays as an admin left it.
+    """
+    async with async_session_factory() as session:
+        channel = await session.scalar(_channel_by_chat_id, {"chat_id": chat_id})
+        if channel is None:
+            return None
+        previous = channel.status
+        if status != previous:
+            channel.status = status
+            channel.is_active = status == ChannelStatus.OK
+            await session.commit()
+        return channel, previous
+
+
+async def set_channel_active(chat_id: int, is_active: bool) -> None:
+    async with async_session_factory() as session:
+        await session.execute(update(Channel).where(Channel.channel_id == chat_id).values(is_active=is_active))
+        await session.commit()
+
+
 async def delete_channel(chat_id: int) -> None:
-    stmt = select(Channel).where(Channel.channel_id == chat_id)
     async with async_session_factory() as session:
-        channel = await session.scalar(stmt)
+        channel = await session.scalar(_channel_by_chat_id, {"chat_id": chat_id})
         if channel:
             await session.delete(channel)
             await session.commit()
@@ -96,9 +157,8 @@ async def delete_channel(chat_id: int) -> None:
 
 # Templates
 async def get_template(template_id: int) -> Template | None:
-    stmt = select(Template).where(Template.id == template_id)
     async with async_session_factory() as session:
-        return await session.scalar(stmt)
+        return await session.scalar(_template_by_id, {"template_id": template_id})
 
 
 async def create_template(
@@ -114,11 +174,35 @@ async def create_template(
     return template
 
 
+async def get_templates() -> list[Template]:
+    async with async_session_factory() as session:
+        result = await session.scalars(select(Template).order_by(Template.name))
+        return list(result)
+
+
+async def update_template(template_id: int, **values) -> None:
+    """Update template columns and drop its compiled renderer."""
+    async with async_session_factory() as session:
+        await session.execute(update(Template).where(Template.id == template_id).values(**values))
+        await session.commit()
+    template_cache.invalidate(template_id)
+
+
+async def delete_template(template_id: int) -> None:
+    async with async_session_factory() as session:
+        await session.execute(delete(Template).where(Template.id == template_id))
+        await session.commit()
+    template_cache.invalidate(template_id)
+
+
 # Posts
-async def get_post(post_id: int) -> Post | None:
-    stmt = select(Post).where(Post.id == post_id)
+async def get_post(post_id: int, include_archive: bool = False) -> Post | ArchivedPost | None:
+    """Return a post, looking into the archive only when ``include_archive`` is set."""
     async with async_session_factory() as session:
-        return await session.scalar(stmt)
+        post = await session.scalar(_post_by_id, {"post_id": post_id})
+        if post is None and include_archive:
+            post = await session.get(ArchivedPost, post_id)
+        return post
 
 
 async def create_post(
@@ -131,7 +215,10 @@ async def create_post(
     caption_above: bool = False,
     use_default_buttons: bool = True,
     buttons: list[dict] | None = None,
+    chat_ids: list[int] | None = None,
+    is_draft: bool = False,
 ) -> Post:
+    """Create a post and link it to the channels with the given chat ids in one transaction."""
     post = Post(
         user_id=user_id,
         text=text,
@@ -142,13 +229,59 @@ async def create_post(
         caption_above=caption_above,
         use_default_buttons=use_default_buttons,
         buttons=buttons,
+        is_draft=is_draft,
     )
     async with async_session_factory() as session:
         session.add(post)
+        await session.flush()
+        if chat_ids:
+            channel_ids = await session.scalars(
+                select(Channel.id).where(Channel.channel_id.in_(chat_ids))
+            )
+            session.add_all(PostChannel(post_id=post.id, channel_id=cid) for cid in channel_ids)
+        await _index_post_text(session, post.id, post.text)
         await session.commit()
+    _month_schedule.clear()
     return post
 
 
+async def bulk_create_posts(user_id: int, rows: list[dict], chunk_size: int = 200) -> list[tuple[int, datetime | None]]:
+    """Insert many posts with their channel links, one transaction per chunk.
+
+    Each row holds ``Post`` column values plus ``channel_ids`` with internal
+    channel ids. Returns ``(post_id, scheduled_at)`` in the order of ``rows``.
+    """
+    created: list[tuple[int, datetime | None]] = []
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        values = [
+            {key: value for key, value in row.items() if key != "channel_ids"} | {"user_id": user_id}
+            for row in chunk
+        ]
+        async with async_session_factory() as session:
+            result = await session.execute(
+                insert(Post).returning(Post.id, Post.scheduled_at, sort_by_parameter_order=True),
+                values,
+            )
+            inserted = result.all()
+            links = [
+                {"post_id": post_id, "channel_id": channel_id}
+                for (post_id, _), row in zip(inserted, chunk)
+                for channel_id in row.get("channel_ids", [])
+            ]
+            if links:
+                await session.execute(insert(PostChannel), links)
+            if engine.dialect.name == "sqlite":
+                await session.execute(
+                    sql_text("INSERT INTO posts_fts(rowid, text) VALUES (:id, :text)"),
+                    [{"id": post_id, "text": strip_html(row["text"])} for (post_id, _), row in zip(inserted, chunk)],
+                )
+            await session.commit()
+        created.extend((post_id, scheduled_at) for post_id, scheduled_at in inserted)
+    _month_schedule.clear()
+    return created
+
+
 async def link_post_channel(post_id: int, channel_id: int) -> None:
     link = PostChannel(post_id=post_id, channel_id=channel_id)
     async with async_session_factory() as session:
@@ -156,28 +289,537 @@ async def link_post_channel(post_id: int, channel_id: int) -> None:
         await session.commit()
 
 
-async def mark_post_sent(post_id: int, tg_message_id: int) -> None:
-    stmt = select(Post).where(Post.id == post_id)
+async def mark_post_sent(
+    post_id: int,
+    tg_message_id: int,
+    channel_id: int | None = None,
+    message_ids: list[int] | None = None,
+) -> None:
+    """Mark the post sent and remember the messages delivered to ``channel_id``."""
     async with async_session_factory() as session:
-        post = await session.scalar(stmt)
+        post = await session.scalar(_post_by_id, {"post_id": post_id})
         if post:
             post.is_sent = True
             post.tg_message_id = tg_message_id
+            post.sent_at = datetime.now()
+            if channel_id is not None:
+                await session.execute(
+                    update(PostChannel)
+                    .where(PostChannel.post_id == post_id, PostChannel.channel_id == channel_id)
+                    .values(message_ids=message_ids or [tg_message_id])
+                )
             await session.commit()
 
 
+async def get_sent_posts(limit: int = 10) -> list[Post]:
+    """Most recently sent live posts."""
+    stmt = (
+        select(Post)
+        .where(Post.is_sent.is_(True))
+        .order_by(Post.sent_at.desc().nulls_last(), Post.id.desc())
+        .limit(limit)
+    )
+    async with async_session_factory() as session:
+        result = await session.scalars(stmt)
+        return list(result)
+
+
+async def get_drafts(limit: int = 10) -> list[Post]:
+    """Newest drafts that are waiting for channels and a send time."""
+    stmt = (
+        select(Post)
+        .where(Post.is_draft.is_(True), Post.is_sent.is_(False))
+        .order_by(Post.id.desc())
+        .limit(limit)
+    )
+    async with async_session_factory() as session:
+        result = await session.scalars(stmt)
+        return list(result)
+
+
+async def publish_draft(
+    post_id: int,
+    text: str,
+    steam_id: int | None = None,
+    scheduled_at: datetime | None = None,
+    tg_image_id: str | None = None,
+    caption_above: bool = False,
+    use_default_buttons: bool = True,
+    buttons: list[dict] | None = None,
+    chat_ids: list[int] | None = None,
+) -> Post | None:
+    """Turn a draft into a regular post linked to the channels with the given chat ids.
+
+    Returns ``None`` when the post is no longer a draft, e.g. it was already
+    published from another chat.
+    """
+    stmt = (
+        update(Post)
+        .where(Post.id == post_id, Post.is_draft.is_(True), Post.is_sent.is_(False))
+        .values(
+            text=text,
+            steam_id=steam_id,
+            scheduled_at=scheduled_at,
+            tg_image_id=tg_image_id,
+            caption_above=caption_above,
+            use_default_buttons=use_default_buttons,
+            buttons=buttons,
+            is_draft=False,
+        )
+        .returning(Post)
+    )
+    async with async_session_factory() as session:
+        post = await session.scalar(stmt)
+        if post is None:
+            return None
+        if chat_ids:
+            channel_ids = await session.scalars(
+                select(Channel.id).where(Channel.channel_id.in_(chat_ids))
+            )
+            session.add_all(PostChannel(post_id=post.id, channel_id=cid) for cid in channel_ids)
+        await _index_post_text(session, post.id, post.text)
+        await session.commit()
+    _month_schedule.clear()
+    return post
+
+
+async def get_undelivered_channels(post_id: int) -> list[Channel]:
+    """Active channels of the post that neither got it nor failed to."""
+    async with async_session_factory() as session:
+        result = await session.scalars(_undelivered_channels, {"post_id": post_id})
+        return list(result)
+
+
+async def mark_delivery_failed(post_id: int, channel_id: int) -> None:
+    """Record that sending to ``channel_id`` failed: no messages, no retry."""
+    async with async_session_factory() as session:
+        await session.execute(
+            update(PostChannel)
+            .where(PostChannel.post_id == post_id, PostChannel.channel_id == channel_id)
+            .values(message_ids=[])
+        )
+        await session.commit()
+
+
+async def set_delivery_interrupted(post_ids: list[int]) -> None:
+    if not post_ids:
+        return
+    async with async_session_factory() as session:
+        await session.execute(update(Post).where(Post.id.in_(post_ids)).values(delivery_interrupted=True))
+        await session.commit()
+
+
+async def claim_interrupted_posts() -> list[int]:
+    """Clear and return the interrupted posts in one ``UPDATE``, so only one process resumes each."""
+    stmt = (
+        update(Post)
+        .where(Post.delivery_interrupted.is_(True))
+        .values(delivery_interrupted=False)
+        .returning(Post.id)
+    )
+    async with async_session_factory() as session:
+        post_ids = list(await session.scalars(stmt))
+        await session.commit()
+    return post_ids
+
+
+async def get_post_deliveries(post_id: int) -> list[tuple[Channel, list[int]]]:
+    """Channels holding delivered copies of the post with their message ids."""
+    async with async_session_factory() as session:
+        result = await session.execute(_post_deliveries, {"post_id": post_id})
+        return [(channel, message_ids) for channel, message_ids in result if message_ids]
+
+
+async def set_post_messages(post_id: int, messages: dict[int, list[int] | None]) -> None:
+    """Replace delivered message ids per channel id, ``None`` forgets the copy."""
+    if not messages:
+        return
+    rows = [
+        {"post_id": post_id, "channel_id": channel_id, "message_ids": message_ids}
+        for channel_id, message_ids in messages.items()
+    ]
+    async with async_session_factory() as session:
+        await session.execute(update(PostChannel), rows)
+        await session.commit()
+
+
+async def update_post_text(post_id: int, text: str) -> None:
+    async with async_session_factory() as session:
+        await session.execute(update(Post).where(Post.id == post_id).values(text=text))
+        await _index_post_text(session, post_id, text)
+        await session.commit()
+
+
+async def delete_post(post_id: int) -> None:
+    async with async_session_factory() as session:
+        await session.execute(delete(PostChannel).where(PostChannel.post_id == post_id))
+        await session.execute(delete(Post).where(Post.id == post_id))
+        if engine.dialect.name == "sqlite":
+            await session.execute(sql_text("DELETE FROM posts_fts WHERE rowid = :id"), {"id": post_id})
+        await session.commit()
+    _month_schedule.clear()
+
+
+async def get_upcoming_steam_ids(until: datetime) -> list[int]:
+    """Steam app ids of unsent posts scheduled before ``until``."""
+    stmt = (
+        select(Post.steam_id)
+        .where(Post.is_sent.is_(False), Post.steam_id.is_not(None), Post.scheduled_at < until)
+        .distinct()
+    )
+    async with async_session_factory() as session:
+        result = await session.scalars(stmt)
+        return list(result)
+
+
+async def get_unsent_schedule(
+    start: datetime,
+    end: datetime | None = None,
+    channel_ids: list[int] | None = None,
+) -> list[tuple[int, datetime]]:
+    """``(post_id, scheduled_at)`` of unsent posts scheduled in ``[start, end)``.
+
+    With ``channel_ids`` only posts linked with any of those channels are returned.
+    """
+    stmt = select(Post.id, Post.scheduled_at).where(
+        Post.is_sent.is_(False), Post.is_draft.is_(False), Post.scheduled_at >= start
+    )
+    if end is not None:
+        stmt = stmt.where(Post.scheduled_at < end)
+    if channel_ids:
+        linked = select(PostChannel.post_id).where(PostChannel.channel_id.in_(channel_ids))
+        stmt = stmt.where(Post.id.in_(linked))
+    async with async_session_factory() as session:
+        result = await session.execute(stmt.order_by(Post.scheduled_at, Post.id))
+        return [(post_id, scheduled_at) for post_id, scheduled_at in result]
+
+
+async def set_post_schedule(items: list[tuple[int, datetime]]) -> None:
+    """Set ``scheduled_at`` of many posts with a single ``UPDATE ... CASE``."""
+    if not items:
+        return
+    schedule = dict(items)
+    stmt = (
+        update(Post)
+        .where(Post.id.in_(schedule))
+        .values(scheduled_at=case(schedule, value=Post.id))
+        .execution_options(synchronize_session=False)
+    )
+    async with async_session_factory() as session:
+        await session.execute(stmt)
+        await session.commit()
+    _month_schedule.clear()
+
+
+async def get_month_schedule(year: int, month: int) -> dict[datetime, int]:
+    """Number of posts per ``scheduled_at`` within a month, drafts excluded.
+
+    One ``GROUP BY`` per month, cached until posts change.
+    """
+    key = (current_schema(), year, month)
+    cached = _month_schedule.get(key)
+    if cached is not None:
+        return cached
+    start = datetime(year, month, 1)
+    end = datetime(year + month // 12, month % 12 + 1, 1)
+    stmt = (
+        select(Post.scheduled_at, func.count())
+        .where(Post.is_draft.is_(False), Post.scheduled_at >= start, Post.scheduled_at < end)
+        .group_by(Post.scheduled_at)
+    )
+    async with async_session_factory() as session:
+        result = await session.execute(stmt)
+        schedule = {as_local(scheduled_at): count for scheduled_at, count in result}
+    _month_schedule.set(key, schedule)
+    return schedule
+
+
 async def get_post_channels(post_id: int) -> list[Channel]:
     """Return channels linked with the post."""
+    async with async_session_factory() as session:
+        result = await session.scalars(_post_channels, {"post_id": post_id})
+        return list(result)
+
+
+# Archive
+async def archive_posts(before: datetime, batch_size: int = 500) -> int:
+    """Move one batch of sent posts older than ``before`` into ``posts_archive``.
+
+    The batch is copied and deleted in a single transaction, so a post is
+    always in exactly one of the tables. Returns the number of moved posts.
+    """
+    sent_at = func.coalesce(Post.sent_at, Post.scheduled_at)
+    ids_stmt = (
+        select(Post.id)
+        .where(Post.is_sent.is_(True), sent_at < before)
+        .order_by(Post.id)
+        .limit(batch_size)
+    )
+    async with async_session_factory() as session:
+        ids = list(await session.scalars(ids_stmt))
+        if not ids:
+            return 0
+
+        links = await session.execute(
+            select(PostChannel.post_id, PostChannel.channel_id).where(PostChannel.post_id.in_(ids))
+        )
+        channel_ids: dict[int, list[int]] = defaultdict(list)
+        for post_id, channel_id in links:
+            channel_ids[post_id].append(channel_id)
+
+        posts = await session.scalars(select(Post).where(Post.id.in_(ids)))
+        rows = [
+            {
+                "id": post.id,
+                "steam_id": post.steam_id,
+                "text": post.text,
+                "tg_message_id": post.tg_message_id,
+                "tg_image_id": post.tg_image_id,
+                "caption_above": post.caption_above,
+                "use_default_buttons": post.use_default_buttons,
+                "buttons": post.buttons,
+                "scheduled_at": post.scheduled_at,
+                "sent_at": post.sent_at,
+                "user_id": post.user_id,
+                "template_id": post.template_id,
+                "channel_ids": channel_ids.get(post.id, []),
+            }
+            for post in posts
+        ]
+        await session.execute(insert(ArchivedPost), rows)
+        await session.execute(delete(PostChannel).where(PostChannel.post_id.in_(ids)))
+        await session.execute(delete(Post).where(Post.id.in_(ids)))
+        await session.commit()
+    _month_schedule.clear()
+    return len(rows)
+
+
+async def get_archived_posts(
+    since: datetime | None = None,
+    until: datetime | None = None,
+    limit: int = 50,
+    offset: int = 0,
+) -> list[ArchivedPost]:
+    stmt = select(ArchivedPost).order_by(ArchivedPost.scheduled_at.desc()).limit(limit).offset(offset)
+    if since:
+        stmt = stmt.where(ArchivedPost.scheduled_at >= since)
+    if until:
+        stmt = stmt.where(ArchivedPost.scheduled_at < until)
+    async with async_session_factory() as session:
+        result = await session.scalars(stmt)
+        return list(result)
+
+
+# Search
+def _pg_document(column) -> ColumnElement:
+    """Postgres text search document, must match the GIN index expression."""
+    return func.to_tsvector(
+        literal_column("'simple'"),
+        func.regexp_replace(column, literal_column("'<[^>]+>'"), literal_column("' '"), literal_column("'g'")),
+    )
+
+
+def _fts5_query(query: str) -> str:
+    """Turn free user input into a safe FTS5 query, last word matched as a prefix."""
+    words = strip_html(query).split()
+    terms = ['"{}"'.format(word.replace('"', '""')) for word in words]
+    if terms:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+
+async def _index_post_text(session: AsyncSession, post_id: int, text: str) -> None:
+    """Keep the SQLite FTS5 table in sync; Postgres indexes ``posts.text`` itself."""
+    if engine.dialect.name != "sqlite":
+        return
+    await session.execute(sql_text("DELETE FROM posts_fts WHERE rowid = :id"), {"id": post_id})
+    await session.execute(
+        sql_text("INSERT INTO posts_fts(rowid, text) VALUES (:id, :text)"),
+        {"id": post_id, "text": strip_html(text)},
+    )
+
+
+async def search_posts(
+    query: str,
+    limit: int = 10,
+    offset: int = 0,
+    include_archive: bool = False,
+) -> list[Post | ArchivedPost]:
+    """Full-text search over post texts, best matches first."""
+    if not query.strip():
+        return []
+
+    async with async_session_factory() as session:
+        if engine.dialect.name == "postgresql":
+            tsquery = func.websearch_to_tsquery(literal_column("'simple'"), query)
+            parts = [
+                select(
+                    Post.id.label("id"),
+                    func.ts_rank(_pg_document(Post.text), tsquery).label("rank"),
+                    literal(False).label("archived"),
+                ).where(_pg_document(Post.text).bool_op("@@")(tsquery))
+            ]
+            if include_archive:
+                parts.append(
+                    select(
+                        ArchivedPost.id.label("id"),
+                        func.ts_rank(_pg_document(ArchivedPost.text), tsquery).label("rank"),
+                        literal(True).label("archived"),
+                    ).where(_pg_document(ArchivedPost.text).bool_op("@@")(tsquery))
+                )
+            ranked = union_all(*parts).subquery()
+            stmt = (
+                select(ranked.c.id, ranked.c.archived)
+                .order_by(ranked.c.rank.desc(), ranked.c.id.desc())
+                .limit(limit)
+                .offset(offset)
+            )
+            hits = [(row.id, row.archived) for row in await session.execute(stmt)]
+        else:
+            match = _fts5_query(query)
+            if not match:
+                return []
+            archived_flag = "p.id IS NULL" if include_archive else "0"
+            join = "LEFT JOIN" if include_archive else "JOIN"
+            stmt = sql_text(
+                f"SELECT f.rowid AS id, {archived_flag} AS archived FROM posts_fts f "
+                f"{join} posts p ON p.id = f.rowid "
+                "WHERE posts_fts MATCH :match ORDER BY bm25(posts_fts), f.rowid DESC "
+                "LIMIT :limit OFFSET :offset"
+            )
+            result = await session.execute(stmt, {"match": match, "limit": limit, "offset": offset})
+            hits = [(row.id, bool(row.archived)) for row in result]
+
+        live_ids = [post_id for post_id, archived in hits if not archived]
+        archived_ids = [post_id for post_id, archived in hits if archived]
+        found: dict[tuple[int, bool], Post | ArchivedPost] = {}
+        if live_ids:
+            for post in await session.scalars(select(Post).where(Post.id.in_(live_ids))):
+                found[(post.id, False)] = post
+        if archived_ids:
+            for post in await session.scalars(select(ArchivedPost).where(ArchivedPost.id.in_(archived_ids))):
+                found[(post.id, True)] = post
+        return [found[hit] for hit in hits if hit in found]
+
+
+# Watched games
+async def add_watched_game(
+    steam_id: int,
+    user_id: int,
+    min_discount: int,
+    template_id: int | None = None,
+) -> WatchedGame:
+    """Start watching a game, or update the threshold of an already watched one."""
+    stmt = select(WatchedGame).where(WatchedGame.steam_id == steam_id)
+    async with async_session_factory() as session:
+        game = await session.scalar(stmt)
+        if game is None:
+            game = WatchedGame(
+                steam_id=steam_id,
+                drafted_discount=0,
+                discount_percent=0,
+                poll_interval=settings.PRICE_WATCH_MIN_INTERVAL,
+                next_check_at=datetime.now(),
+            )
+            session.add(game)
+        game.user_id = user_id
+        game.min_discount = min_discount
+        game.template_id = template_id
+        game.is_active = True
+        await session.commit()
+    return game
+
+
+async def get_watched_games() -> list[WatchedGame]:
+    async with async_session_factory() as session:
+        result = await session.scalars(select(WatchedGame).order_by(WatchedGame.steam_id))
+        return list(result)
+
+
+async def delete_watched_game(watched_id: int) -> None:
+    async with async_session_factory() as session:
+        await session.execute(delete(WatchedGame).where(WatchedGame.id == watched_id))
+        await session.commit()
+
+
+async def get_due_watched_games(now: datetime, limit: int) -> list[WatchedGame]:
+    """Active watched games whose next check is due, most overdue first."""
     stmt = (
-        select(Channel)
-        .join(PostChannel, Channel.id == PostChannel.channel_id)
-        .where(PostChannel.post_id == post_id)
+        select(WatchedGame)
+        .where(WatchedGame.is_active.is_(True), WatchedGame.next_check_at <= now)
+        .order_by(WatchedGame.next_check_at)
+        .limit(limit)
+        .options(selectinload(WatchedGame.user), selectinload(WatchedGame.template))
+    )
+    async with async_session_factory() as session:
+        result = await session.scalars(stmt)
+        return list(result)
+
+
+async def update_watched_games(rows: list[dict]) -> None:
+    """Bulk update by primary key, every row must contain ``id``."""
+    if not rows:
+        return
+    async with async_session_factory() as session:
+        await session.execute(update(WatchedGame), rows)
+        await session.commit()
+
+
+# Recurring posts
+async def add_recurring_post(
+    template_id: int,
+    user_id: int,
+    chat_ids: list[int],
+    cron: str | None = None,
+    interval_minutes: int | None = None,
+    steam_id: int | None = None,
+) -> RecurringPost:
+    recurring = RecurringPost(
+        template_id=template_id,
+        user_id=user_id,
+        chat_ids=chat_ids,
+        cron=cron,
+        interval_minutes=interval_minutes,
+        steam_id=steam_id,
     )
+    async with async_session_factory() as session:
+        session.add(recurring)
+        await session.commit()
+    return recurring
+
+
+async def get_recurring_post(recurring_id: int) -> RecurringPost | None:
+    stmt = select(RecurringPost).where(RecurringPost.id == recurring_id).options(
+        selectinload(RecurringPost.template)
+    )
+    async with async_session_factory() as session:
+        return await session.scalar(stmt)
+
+
+async def get_recurring_posts(template_id: int | None = None) -> list[RecurringPost]:
+    """Active recurring posts, all of them or the ones of a template."""
+    stmt = select(RecurringPost).where(RecurringPost.is_active.is_(True)).order_by(RecurringPost.id)
+    if template_id is not None:
+        stmt = stmt.where(RecurringPost.template_id == template_id)
     async with async_session_factory() as session:
         result = await session.scalars(stmt)
         return list(result)
 
 
+async def mark_recurring_run(recurring_id: int, run_at: datetime) -> None:
+    async with async_session_factory() as session:
+        await session.execute(
+            update(RecurringPost).where(RecurringPost.id == recurring_id).values(last_run_at=run_at)
+        )
+        await session.commit()
+
+
+async def delete_recurring_post(recurring_id: int) -> None:
+    async with async_session_factory() as session:
+        await session.execute(delete(RecurringPost).where(RecurringPost.id == recurring_id))
+        await session.commit()
+
+
 # Registration codes
 async def add_code(
     code: str,
@@ -198,12 +840,9 @@ async def add_code(
 
 
 async def get_code(code: str | int) -> RegistrationCode | None:
-    if isinstance(code, int):
-        stmt = select(RegistrationCode).where(RegistrationCode.id == code)
-    else:
-        stmt = select(RegistrationCode).where(RegistrationCode.code == code)
+    stmt = _code_by_id if isinstance(code, int) else _code_by_code
     async with async_session_factory() as session:
-        return await session.scalar(stmt)
+        return await session.scalar(stmt, {"code": code})
 
 
 async def get_codes() -> list[RegistrationCode]:
@@ -216,4 +855,6 @@ async def update_object(obj: Base) -> None:
     async with async_session_factory() as session:
         session.add(obj)
         await session.commit()
+    if isinstance(obj, Post):
+        _month_schedule.clear()
 
@@ -8,6 +8,13 @@ from config.log import configure_logging
 
 parser = ArgumentParser()
 parser.add_argument("-e", "--env_file", default="")
+parser.add_argument(
+    "-m",
+    "--mode",
+    choices=("polling", "receiver", "worker"),
+    default="polling",
+    help="polling handles updates in this process; a receiver puts them into Redis streams for workers",
+)
 args = parser.parse_args()
 
 if args.env_file:
@@ -17,5 +24,12 @@ if args.env_file:
 if __name__ == "__main__":
     configure_logging()
 
-    from bot import start_bot
-    asyncio.run(start_bot(settings.BOT_COMMANDS))
+    if args.mode == "receiver":
+        from bot import start_receiver
+        asyncio.run(start_receiver(settings.BOT_COMMANDS))
+    elif args.mode == "worker":
+        from bot import start_worker
+        asyncio.run(start_worker())
+    else:
+        from bot import start_bot
+        asyncio.run(start_bot(settings.BOT_COMMANDS))
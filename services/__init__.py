@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+from config import settings
+from database import redis
+
+from .app_index import AppIndex, refresh_index
+from .compat import Compatibility, CompatibilityService, EMPTY_PLACEHOLDERS
+from .steam import PriceBatch, PriceState, SteamApp, SteamError, SteamStoreClient
+from .telegram import TelegramMetadata
+
+steam_client = SteamStoreClient(redis=redis)
+app_index = AppIndex(settings.STEAM_APP_INDEX_PATH)
+compat_service = CompatibilityService(redis=redis)
+telegram_metadata = TelegramMetadata(redis=redis)
+
+__all__ = [
+    "AppIndex",
+    "Compatibility",
+    "CompatibilityService",
+    "EMPTY_PLACEHOLDERS",
+    "PriceBatch",
+    "PriceState",
+    "SteamApp",
+    "SteamError",
+    "SteamStoreClient",
+    "TelegramMetadata",
+    "app_index",
+    "compat_service",
+    "refresh_index",
+    "steam_client",
+    "telegram_metadata",
+]
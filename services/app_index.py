@@ -0,0 +1,321 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import mmap
+import os
+import re
+import struct
+import time
+import zlib
+from array import array
+from bisect import bisect_left
+from logging import getLogger
+from pathlib import Path
+
+import aiohttp
+
+from config import settings
+
+
+logger = getLogger("services.app_index")
+
+# File layout, all integers are native uint32 unless noted:
+#   header  magic, version, count, trigrams, postings, names_len, norm_len, updated_at (uint64)
+#   app_ids[count]
+#   name_offsets[count + 1]      into the display names blob
+#   norm_offsets[count + 1]      into the normalized names blob, entries sorted by it
+#   trigram_keys[trigrams]       sorted crc32 of each trigram
+#   trigram_starts[trigrams + 1] into postings
+#   postings[postings]           entry numbers per trigram, shortest normalized name first
+#   names blob, normalized names blob (utf-8)
+MAGIC = b"SDAI"
+VERSION = 2
+HEADER = struct.Struct("<4sIIIIIIQ")
+
+_NON_WORD_RE = re.compile(r"[\W_]+")
+
+
+def normalize(name: str) -> str:
+    return _NON_WORD_RE.sub(" ", name.casefold()).strip()
+
+
+def trigrams(text: str) -> set[int]:
+    return {zlib.crc32(text[i:i + 3].encode()) for i in range(len(text) - 2)}
+
+
+def _uint32(values) -> bytes:
+    return array("I", values).tobytes()
+
+
+def build_index(apps: dict[int, str], path: str | Path, updated_at: int | None = None) -> int:
+    """Write an index file for ``{app_id: name}`` atomically; returns the entry count."""
+    entries = sorted(
+        ((normalize(name), name, app_id) for app_id, name in apps.items() if name and normalize(name)),
+        key=lambda entry: (entry[0].encode(), entry[2]),
+    )
+
+    names = bytearray()
+    norms = bytearray()
+    name_offsets = [0]
+    norm_offsets = [0]
+    postings_by_key: dict[int, list[int]] = {}
+    for number, (norm, name, _) in enumerate(entries):
+        names += name.encode()
+        norms += norm.encode()
+        name_offsets.append(len(names))
+        norm_offsets.append(len(norms))
+        for key in trigrams(norm):
+            postings_by_key.setdefault(key, []).append(number)
+
+    keys = sorted(postings_by_key)
+    starts = [0]
+    postings = array("I")
+    lengths = [norm_offsets[number + 1] - norm_offsets[number] for number in range(len(entries))]
+    for key in keys:
+        # lookups walk a list shortest name first and stop early, see AppIndex.search
+        postings.extend(sorted(postings_by_key[key], key=lambda number: (lengths[number], number)))
+        starts.append(len(postings))
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "wb") as file:
+        file.write(HEADER.pack(
+            MAGIC, VERSION, len(entries), len(keys), len(postings), len(names), len(norms),
+            updated_at if updated_at is not None else int(time.time()),
+        ))
+        file.write(_uint32(app_id for _, _, app_id in entries))
+        file.write(_uint32(name_offsets))
+        file.write(_uint32(norm_offsets))
+        file.write(_uint32(keys))
+        file.write(_uint32(starts))
+        file.write(postings.tobytes())
+        file.write(names)
+        file.write(norms)
+    os.replace(tmp_path, path)
+    return len(entries)
+
+
+class AppIndex:
+    """Memory-mapped Steam app-name index with prefix and trigram lookups.
+
+    Nothing is copied on load; lookups binary-search the sorted names and
+    walk trigram posting lists straight from the mapped file, looking at no
+    more than ``max_candidates`` names per query.
+    """
+
+    def __init__(self, path: str | Path, max_candidates: int = settings.STEAM_APP_INDEX_MAX_CANDIDATES) -> None:
+        self.path = Path(path)
+        self.max_candidates = max_candidates
+        self.count = 0
+        self.updated_at = 0
+        self._mmap: mmap.mmap | None = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._mmap is not None
+
+    def load(self) -> bool:
+        if not self.path.exists():
+            return False
+        with open(self.path, "rb") as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mapped)
+        magic, version, count, trigram_count, postings_len, names_len, norm_len, updated_at = (
+            HEADER.unpack_from(view)
+        )
+        if magic != MAGIC or version != VERSION:
+            view.release()
+            mapped.close()
+            logger.warning("Ignoring app index %s with unknown format", self.path)
+            return False
+
+        offset = HEADER.size
+
+        def section(length: int, fmt: str | None = "I") -> memoryview:
+            nonlocal offset
+            size = length * 4 if fmt else length
+            part = view[offset:offset + size]
+            offset += size
+            return part.cast(fmt) if fmt else part
+
+        self.close()
+        self._view = view
+        self._app_ids = section(count)
+        self._name_offsets = section(count + 1)
+        self._norm_offsets = section(count + 1)
+        self._trigram_keys = section(trigram_count)
+        self._trigram_starts = section(trigram_count + 1)
+        self._postings = section(postings_len)
+        self._names = section(names_len, None)
+        self._norms = section(norm_len, None)
+        self._mmap = mapped
+        self.count = count
+        self.updated_at = updated_at
+        return True
+
+    def close(self) -> None:
+        if self._mmap is None:
+            return
+        for name in (
+            "_app_ids", "_name_offsets", "_norm_offsets", "_trigram_keys",
+            "_trigram_starts", "_postings", "_names", "_norms", "_view",
+        ):
+            getattr(self, name).release()
+        self._mmap.close()
+        self._mmap = None
+
+    def _norm(self, number: int) -> bytes:
+        return bytes(self._norms[self._norm_offsets[number]:self._norm_offsets[number + 1]])
+
+    def name(self, number: int) -> str:
+        return bytes(self._names[self._name_offsets[number]:self._name_offsets[number + 1]]).decode()
+
+    def items(self):
+        """Iterate ``(app_id, name)`` pairs, used to merge incremental updates."""
+        for number in range(self.count):
+            yield self._app_ids[number], self.name(number)
+
+    def _prefix_range(self, prefix: bytes) -> range:
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._norm(mid) < prefix:
+                lo = mid + 1
+            else:
+                hi = mid
+        start = lo
+        hi = self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._norm(mid).startswith(prefix):
+                lo = mid + 1
+            else:
+                hi = mid
+        return range(start, lo)
+
+    def _posting(self, key: int) -> memoryview | None:
+        position = bisect_left(self._trigram_keys, key)
+        if position == len(self._trigram_keys) or self._trigram_keys[position] != key:
+            return None
+        return self._postings[self._trigram_starts[position]:self._trigram_starts[position + 1]]
+
+    def _rarest_posting(self, query: str) -> memoryview | None:
+        """Shortest posting list among the query's trigrams, ``None`` if one is missing."""
+        rarest = None
+        for key in trigrams(query):
+            posting = self._posting(key)
+            if posting is None:
+                return None
+            if rarest is None or len(posting) < len(rarest):
+                rarest = posting
+        return rarest
+
+    def search(self, query: str, limit: int = 10) -> list[tuple[int, str]]:
+        """Return up to ``limit`` ``(app_id, name)`` pairs, best matches first.
+
+        Exact names rank first, then prefixes, then word prefixes, then any
+        substring; shorter names win within a group.
+
+        Names starting with the query come from the sorted names, anything
+        else from the rarest trigram's posting list, walked shortest name
+        first: once ``limit`` matches of the prefix and word prefix groups are
+        found, nothing further down can rank higher. Each source looks at
+        ``max_candidates`` names at most, so a very common query may miss
+        long substring matches.
+        """
+        if self._mmap is None:
+            return []
+        norm = normalize(query)
+        if not norm:
+            return []
+        encoded = norm.encode()
+        word = b" " + encoded
+
+        ranked: dict[int, tuple[int, int, int]] = {}
+        # a prefix match is at least as good as anything the postings hold
+        for number in self._prefix_range(encoded)[:self.max_candidates]:
+            name = self._norm(number)
+            ranked[number] = (0 if name == encoded else 1, len(name), number)
+
+        posting = self._rarest_posting(norm) if len(norm) >= 3 else None
+        if posting is not None:
+            # matches no name further down the list can outrank
+            settled = len(ranked)
+            for number in posting[:self.max_candidates]:
+                if settled >= limit:
+                    break
+                if number in ranked:
+                    continue
+                name = self._norm(number)
+                if name.startswith(encoded):
+                    group = 1
+                elif word in name:
+                    group = 2
+                elif encoded in name:
+                    group = 3
+                else:
+                    continue
+                ranked[number] = (group, len(name), number)
+                if group <= 2:
+                    settled += 1
+
+        best = heapq.nsmallest(limit, ranked.values())
+        return [(self._app_ids[number], self.name(number)) for _, _, number in best]
+
+
+async def _fetch_full_list(session: aiohttp.ClientSession) -> dict[int, str]:
+    url = f"{settings.STEAM_API_URL}/ISteamApps/GetAppList/v2/"
+    async with session.get(url) as response:
+        payload = await response.json(content_type=None)
+    return {app["appid"]: app["name"] for app in payload["applist"]["apps"]}
+
+
+async def _fetch_changes(session: aiohttp.ClientSession, since: int) -> dict[int, str]:
+    url = f"{settings.STEAM_API_URL}/IStoreService/GetAppList/v1/"
+    changes: dict[int, str] = {}
+    last_appid = 0
+    while True:
+        params = {
+            "key": settings.STEAM_API_KEY,
+            "if_modified_since": since,
+            "last_appid": last_appid,
+            "max_results": 50000,
+            "include_games": "true",
+            "include_dlc": "true",
+        }
+        async with session.get(url, params=params) as response:
+            payload = (await response.json(content_type=None)).get("response", {})
+        changes.update((app["appid"], app["name"]) for app in payload.get("apps", []))
+        if not payload.get("have_more_results"):
+            return changes
+        last_appid = payload["last_appid"]
+
+
+async def refresh_index(index: AppIndex) -> int:
+    """Update the index file from Steam and remap it.
+
+    With ``STEAM_API_KEY`` set and an existing index only apps changed since
+    the last refresh are fetched and merged; otherwise the full app list is
+    downloaded. Building runs in a worker thread.
+    """
+    started = int(time.time())
+    timeout = aiohttp.ClientTimeout(total=settings.STEAM_APP_INDEX_TIMEOUT)
+    async with aiohttp.ClientSession(timeout=timeout, raise_for_status=True) as session:
+        if index.loaded and settings.STEAM_API_KEY:
+            changes = await _fetch_changes(session, index.updated_at)
+            if not changes:
+                return 0
+            apps = dict(index.items())
+            apps.update(changes)
+        else:
+            changes = apps = await _fetch_full_list(session)
+
+    count = await asyncio.to_thread(build_index, apps, index.path, started)
+    index.load()
+    logger.info("App index refreshed: %s changed, %s total", len(changes), count)
+    return len(changes)
+
+
+__all__ = ["AppIndex", "build_index", "normalize", "refresh_index"]
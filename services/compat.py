@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from dataclasses import asdict, dataclass
+from logging import getLogger
+from typing import Iterable
+
+import aiohttp
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from config import settings
+from utils.cache import Coalescer, TTLCache
+
+
+logger = getLogger("services.compat")
+
+DECK_CATEGORIES = {0: "unknown", 1: "unsupported", 2: "playable", 3: "verified"}
+DECK_BADGES = {"verified": "✅ Deck Verified", "playable": "🟡 Deck Playable", "unsupported": "⛔ Deck Unsupported"}
+PROTONDB_BADGES = {
+    "platinum": "💎 Platinum",
+    "gold": "🥇 Gold",
+    "silver": "🥈 Silver",
+    "bronze": "🥉 Bronze",
+    "borked": "💥 Borked",
+}
+
+
+@dataclass(frozen=True)
+class Compatibility:
+    app_id: int
+    protondb_tier: str | None = None
+    deck_status: str | None = None
+    fetched_at: float = 0
+
+    def placeholders(self) -> dict[str, str]:
+        """Values for button labels and template placeholders."""
+        return {
+            "protondb_tier": (self.protondb_tier or "").capitalize(),
+            "protondb_badge": PROTONDB_BADGES.get(self.protondb_tier or "", ""),
+            "deck_status": (self.deck_status or "").capitalize(),
+            "deck_badge": DECK_BADGES.get(self.deck_status or "", ""),
+        }
+
+
+EMPTY_PLACEHOLDERS = Compatibility(0).placeholders()
+
+
+class CompatibilityService:
+    """ProtonDB tier and Steam Deck status lookups with stale-while-revalidate.
+
+    :meth:`peek` never waits for the network: it answers from memory or
+    Redis, stale values included, and refreshes expired entries in the
+    background. :meth:`get_many` fetches missing apps in bounded batches
+    and is what the periodic warm-up job uses.
+    """
+
+    def __init__(
+        self,
+        redis: Redis | None = None,
+        ttl: int = settings.COMPAT_CACHE_TTL,
+        stale_ttl: int = settings.COMPAT_STALE_TTL,
+    ) -> None:
+        self.redis = redis
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._memory: TTLCache[int, Compatibility] = TTLCache(
+            ttl, maxsize=settings.COMPAT_MEMORY_CACHE_SIZE, stale_ttl=stale_ttl
+        )
+        self._coalescer: Coalescer[int, Compatibility] = Coalescer()
+        self._semaphore = asyncio.Semaphore(settings.COMPAT_CONCURRENCY)
+        self._background: set[asyncio.Task] = set()
+        self._session: aiohttp.ClientSession | None = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=settings.COMPAT_CONCURRENCY, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=settings.COMPAT_TIMEOUT),
+            )
+        return self._session
+
+    async def close(self) -> None:
+        for task in list(self._background):
+            task.cancel()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _redis_key(self, app_id: int) -> str:
+        return f"{settings.COMPAT_REDIS_PREFIX}:{app_id}"
+
+    def _is_stale(self, value: Compatibility) -> bool:
+        return time.time() - value.fetched_at >= self.ttl
+
+    async def _cached(self, app_id: int) -> Compatibility | None:
+        entry = self._memory.get_entry(app_id)
+        if entry is not None:
+            return entry.value
+        return await self._redis_get(app_id)
+
+    async def peek(self, app_id: int) -> Compatibility | None:
+        """Cached value, fresh or stale, without waiting for the network."""
+        value = await self._cached(app_id)
+        if value is None or self._is_stale(value):
+            self.refresh_later([app_id])
+        return value
+
+    async def get_many(self, app_ids: Iterable[int]) -> dict[int, Compatibility]:
+        """Return values for all ``app_ids``, fetching missing ones in batches."""
+        result: dict[int, Compatibility] = {}
+        missing: list[int] = []
+        stale: list[int] = []
+        for app_id in set(app_ids):
+            value = await self._cached(app_id)
+            if value is None:
+                missing.append(app_id)
+                continue
+            result[app_id] = value
+            if self._is_stale(value):
+                stale.append(app_id)
+
+        for start in range(0, len(missing), settings.COMPAT_BATCH_SIZE):
+            batch = missing[start:start + settings.COMPAT_BATCH_SIZE]
+            fetched = await asyncio.gather(*(self._refresh(app_id) for app_id in batch), return_exceptions=True)
+            for app_id, value in zip(batch, fetched):
+                if isinstance(value, Compatibility):
+                    result[app_id] = value
+                else:
+                    logger.warning("Compatibility fetch for %s failed: %s", app_id, value)
+        if stale:
+            self.refresh_later(stale)
+        return result
+
+    def refresh_later(self, app_ids: Iterable[int]) -> None:
+        """Refresh values in the background, skipping ones already in flight."""
+        for app_id in app_ids:
+            if app_id in self._coalescer:
+                continue
+            task = asyncio.create_task(self._refresh(app_id))
+            self._background.add(task)
+            task.add_done_callback(self._background_done)
+
+    def _background_done(self, task: asyncio.Task) -> None:
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Compatibility refresh failed: %s", task.exception())
+
+    async def _refresh(self, app_id: int) -> Compatibility:
+        return await self._coalescer.run(app_id, lambda: self._fetch_and_store(app_id))
+
+    async def _fetch_and_store(self, app_id: int) -> Compatibility:
+        async with self._semaphore:
+            tier, deck = await asyncio.gather(
+                self._fetch_protondb(app_id), self._fetch_deck(app_id)
+            )
+        value = Compatibility(app_id, tier, deck, time.time())
+        self._memory.set(app_id, value)
+        await self._redis_set(value)
+        return value
+
+    async def _get_json(self, url: str, params: dict | None = None) -> dict | None:
+        async with self.session.get(url, params=params) as response:
+            if response.status == 404:
+                return None
+            response.raise_for_status()
+            return await response.json(content_type=None)
+
+    async def _fetch_protondb(self, app_id: int) -> str | None:
+        payload = await self._get_json(f"{settings.PROTONDB_URL}/api/v1/reports/summaries/{app_id}.json")
+        return (payload or {}).get("tier")
+
+    async def _fetch_deck(self, app_id: int) -> str | None:
+        payload = await self._get_json(
+            f"{settings.STEAM_STORE_URL}/saleaction/ajaxgetdeckappcompatibilityreport",
+            params={"nAppID": str(app_id), "l": "english"},
+        )
+        results = (payload or {}).get("results") or {}
+        return DECK_CATEGORIES.get(results.get("resolved_category"))
+
+    async def _redis_get(self, app_id: int) -> Compatibility | None:
+        if self.redis is None:
+            return None
+        try:
+            raw = await self.redis.get(self._redis_key(app_id))
+        except RedisError as err:
+            logger.warning("Compatibility cache read failed: %s", err)
+            return None
+        if raw is None:
+            return None
+        value = Compatibility(**json.loads(raw))
+        # keep the original freshness when promoting to memory
+        remaining = self.ttl - (time.time() - value.fetched_at)
+        self._memory.set(app_id, value, ttl=max(remaining, 0))
+        return value
+
+    async def _redis_set(self, value: Compatibility) -> None:
+        if self.redis is None:
+            return
+        try:
+            await self.redis.set(
+                self._redis_key(value.app_id), json.dumps(asdict(value)), ex=self.ttl + self.stale_ttl
+            )
+        except RedisError as err:
+            logger.warning("Compatibility cache write failed: %s", err)
+
+
+__all__ = ["Compatibility", "CompatibilityService", "EMPTY_PLACEHOLDERS"]
@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import asyncio
+import datetime
+import json
+from dataclasses import asdict, dataclass
+from email.utils import format_datetime, parsedate_to_datetime
+from logging import getLogger
+
+import aiohttp
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from config import settings
+from utils.cache import Coalescer, TTLCache
+
+
+logger = getLogger("services.steam")
+
+# cached marker for app ids the store does not know
+_NOT_FOUND = "null"
+
+
+class SteamError(Exception):
+    """Steam Store could not be reached or answered with garbage."""
+
+
+@dataclass(frozen=True)
+class SteamApp:
+    app_id: int
+    name: str
+    header_image: str | None = None
+    is_free: bool = False
+    price: str | None = None
+    initial_price: str | None = None
+    discount_percent: int = 0
+    release_date: str | None = None
+    coming_soon: bool = False
+
+    @classmethod
+    def from_appdetails(cls, app_id: int, data: dict) -> SteamApp:
+        price = data.get("price_overview") or {}
+        release = data.get("release_date") or {}
+        return cls(
+            app_id=app_id,
+            name=data.get("name") or str(app_id),
+            header_image=data.get("header_image"),
+            is_free=bool(data.get("is_free")),
+            price=price.get("final_formatted"),
+            initial_price=price.get("initial_formatted"),
+            discount_percent=int(price.get("discount_percent") or 0),
+            release_date=release.get("date") or None,
+            coming_soon=bool(release.get("coming_soon")),
+        )
+
+
+@dataclass(frozen=True)
+class PriceState:
+    """Price in minor currency units, ``final`` is ``None`` for free or unpriced apps."""
+
+    initial: int | None = None
+    final: int | None = None
+    discount_percent: int = 0
+    currency: str | None = None
+
+
+@dataclass(frozen=True)
+class PriceBatch:
+    prices: dict[int, PriceState]
+    last_modified: datetime.datetime | None = None
+    not_modified: bool = False
+
+
+class SteamStoreClient:
+    """Async Steam Store ``appdetails`` client.
+
+    Lookups go through an in-memory cache, then Redis, then the store;
+    concurrent lookups of the same app share a single request. Unknown app
+    ids are cached too, for a shorter time.
+    """
+
+    def __init__(
+        self,
+        base_url: str = settings.STEAM_STORE_URL,
+        redis: Redis | None = None,
+        ttl: int = settings.STEAM_CACHE_TTL,
+        not_found_ttl: int = settings.STEAM_NOT_FOUND_TTL,
+    ) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.redis = redis
+        self.ttl = ttl
+        self.not_found_ttl = not_found_ttl
+        self._memory: TTLCache[int, SteamApp | None] = TTLCache(ttl, maxsize=settings.STEAM_MEMORY_CACHE_SIZE)
+        self._coalescer: Coalescer[int, SteamApp | None] = Coalescer()
+        self._session: aiohttp.ClientSession | None = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=settings.STEAM_POOL_SIZE, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=settings.STEAM_TIMEOUT),
+                raise_for_status=True,
+            )
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def cached(self, app_id: int) -> SteamApp | None:
+        """Return the in-memory value without any I/O."""
+        return self._memory.get(app_id)
+
+    async def get_app(self, app_id: int) -> SteamApp | None:
+        """Return app metadata or ``None`` if the store has no such app.
+
+        Raises :class:`SteamError` when the store cannot be queried.
+        """
+        entry = self._memory.get_entry(app_id)
+        if entry is not None and entry.is_fresh:
+            return entry.value
+        return await self._coalescer.run(app_id, lambda: self._load(app_id))
+
+    async def _load(self, app_id: int) -> SteamApp | None:
+        key = f"{settings.STEAM_REDIS_PREFIX}:app:{app_id}"
+        cached = await self._redis_get(key)
+        if cached is not None:
+            app = None if cached == _NOT_FOUND else SteamApp(**json.loads(cached))
+            self._memory.set(app_id, app, None if app else self.not_found_ttl)
+            return app
+
+        app = await self.fetch_app(app_id)
+        if app is None:
+            self._memory.set(app_id, None, self.not_found_ttl)
+            await self._redis_set(key, _NOT_FOUND, self.not_found_ttl)
+        else:
+            self._memory.set(app_id, app)
+            await self._redis_set(key, json.dumps(asdict(app)), self.ttl)
+        return app
+
+    async def fetch_app(self, app_id: int) -> SteamApp | None:
+        params = {"appids": str(app_id), "cc": settings.STEAM_COUNTRY, "l": settings.STEAM_LANGUAGE}
+        try:
+            async with self.session.get(f"{self.base_url}/api/appdetails", params=params) as response:
+                payload = await response.json(content_type=None)
+        except (aiohttp.ClientError, asyncio.TimeoutError, json.JSONDecodeError) as err:
+            raise SteamError(f"appdetails request for {app_id} failed: {err}") from err
+
+        if not isinstance(payload, dict):
+            raise SteamError(f"unexpected appdetails response for {app_id}")
+        result = payload.get(str(app_id)) or {}
+        if not result.get("success") or not isinstance(result.get("data"), dict):
+            return None
+        return SteamApp.from_appdetails(app_id, result["data"])
+
+    async def fetch_prices(
+        self,
+        app_ids: list[int],
+        if_modified_since: datetime.datetime | None = None,
+    ) -> PriceBatch:
+        """Fetch price state for many apps in one ``appdetails`` request.
+
+        Steam only accepts several app ids when the response is filtered to
+        ``price_overview``. With ``if_modified_since`` a ``304`` answer is
+        reported as ``not_modified`` without a body.
+        """
+        params = {
+            "appids": ",".join(map(str, app_ids)),
+            "filters": "price_overview",
+            "cc": settings.STEAM_COUNTRY,
+        }
+        headers = {}
+        if if_modified_since is not None:
+            since = if_modified_since.astimezone(datetime.timezone.utc)
+            headers["If-Modified-Since"] = format_datetime(since, usegmt=True)
+        try:
+            async with self.session.get(
+                f"{self.base_url}/api/appdetails", params=params, headers=headers, raise_for_status=False
+            ) as response:
+                last_modified = response.headers.get("Last-Modified")
+                last_modified = parsedate_to_datetime(last_modified) if last_modified else None
+                if response.status == 304:
+                    return PriceBatch({}, last_modified, not_modified=True)
+                response.raise_for_status()
+                payload = await response.json(content_type=None)
+        except (aiohttp.ClientError, asyncio.TimeoutError, json.JSONDecodeError, ValueError) as err:
+            raise SteamError(f"price request for {len(app_ids)} apps failed: {err}") from err
+
+        prices = {}
+        for app_id in app_ids:
+            result = (payload or {}).get(str(app_id)) or {}
+            if not result.get("success"):
+                continue
+            # free apps come back with an empty list instead of an object
+            data = result.get("data")
+            overview = data.get("price_overview") if isinstance(data, dict) else None
+            if overview:
+                prices[app_id] = PriceState(
+                    initial=overview.get("initial"),
+                    final=overview.get("final"),
+                    discount_percent=int(overview.get("discount_percent") or 0),
+                    currency=overview.get("currency"),
+                )
+            else:
+                prices[app_id] = PriceState()
+        return PriceBatch(prices, last_modified)
+
+    async def _redis_get(self, key: str) -> str | None:
+        if self.redis is None:
+            return None
+        try:
+            return await self.redis.get(key)
+        except RedisError as err:
+            logger.warning("Steam cache read failed: %s", err)
+            return None
+
+    async def _redis_set(self, key: str, value: str, ttl: int) -> None:
+        if self.redis is None:
+            return
+        try:
+            await self.redis.set(key, value, ex=ttl)
+        except RedisError as err:
+            logger.warning("Steam cache write failed: %s", err)
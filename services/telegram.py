@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+from logging import getLogger
+from typing import Any, Awaitable, Callable, Hashable
+
+from aiogram import Bot
+from aiogram.methods import GetChat, GetChatMember
+from aiogram.types import ChatFullInfo, User
+from pydantic import TypeAdapter
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from config import settings
+from utils.cache import Coalescer, TTLCache
+
+
+logger = getLogger("services.telegram")
+
+_ME = TypeAdapter(User)
+_CHAT = TypeAdapter(GetChat.__returning__)
+_MEMBER = TypeAdapter(GetChatMember.__returning__)
+
+
+def _chat_key(chat_id: int | str) -> int | str:
+    """``"-100…"`` typed by a user and ``-100…`` share an entry; usernames are case-insensitive."""
+    if isinstance(chat_id, str):
+        chat_id = chat_id.strip()
+        if chat_id.lstrip("-").isdigit():
+            return int(chat_id)
+        return chat_id.lower()
+    return chat_id
+
+
+class TelegramMetadata:
+    """Cached ``getMe``, ``getChat`` and ``getChatMember`` answers per bot.
+
+    Lookups go through an in-memory cache, then Redis, then the Bot API;
+    concurrent identical lookups share a single request. Errors are not
+    cached. Updates saying a chat or a membership changed drop the entries
+    through :meth:`invalidate_chat`; other processes keep their in-memory
+    copy for at most ``memory_ttl`` seconds.
+    """
+
+    def __init__(
+        self,
+        redis: Redis | None = None,
+        ttl: int = settings.TELEGRAM_CACHE_TTL,
+        member_ttl: int = settings.TELEGRAM_MEMBER_CACHE_TTL,
+        memory_ttl: int = settings.TELEGRAM_MEMORY_CACHE_TTL,
+    ) -> None:
+        self.redis = redis
+        self.ttl = ttl
+        self.member_ttl = member_ttl
+        self._memory: TTLCache[tuple[Hashable, ...], Any] = TTLCache(
+            memory_ttl, maxsize=settings.TELEGRAM_MEMORY_CACHE_SIZE
+        )
+        self._coalescer: Coalescer[tuple[Hashable, ...], Any] = Coalescer()
+
+    async def get_me(self, bot: Bot) -> User:
+        return await self._get(bot, ("me",), bot.get_me, _ME, self.ttl)
+
+    async def get_chat(self, bot: Bot, chat_id: int | str) -> ChatFullInfo:
+        chat_id = _chat_key(chat_id)
+        return await self._get(bot, ("chat", chat_id), lambda: bot.get_chat(chat_id), _CHAT, self.ttl)
+
+    async def get_chat_member(self, bot: Bot, chat_id: int, user_id: int):
+        return await self._get(
+            bot,
+            ("member", chat_id, user_id),
+            lambda: bot.get_chat_member(chat_id, user_id),
+            _MEMBER,
+            self.member_ttl,
+        )
+
+    async def invalidate_chat(self, bot_id: int, chat_id: int, *user_ids: int) -> None:
+        """Forget the chat and the memberships of ``user_ids`` in it."""
+        keys = [(bot_id, "chat", chat_id), *((bot_id, "member", chat_id, user_id) for user_id in user_ids)]
+        for key in keys:
+            self._memory.pop(key)
+        if self.redis is None:
+            return
+        try:
+            await self.redis.delete(*map(self._redis_key, keys))
+        except RedisError as err:
+            logger.warning("Telegram cache invalidation failed: %s", err)
+
+    async def _get(
+        self,
+        bot: Bot,
+        path: tuple[Hashable, ...],
+        fetch: Callable[[], Awaitable[Any]],
+        adapter: TypeAdapter,
+        ttl: int,
+    ) -> Any:
+        key = (bot.id, *path)
+        value = self._memory.get(key)
+        if value is not None:
+            return value
+        return await self._coalescer.run(key, lambda: self._load(bot, key, fetch, adapter, ttl))
+
+    async def _load(
+        self,
+        bot: Bot,
+        key: tuple[Hashable, ...],
+        fetch: Callable[[], Awaitable[Any]],
+        adapter: TypeAdapter,
+        ttl: int,
+    ) -> Any:
+        redis_key = self._redis_key(key)
+        cached = await self._redis_get(redis_key)
+        if cached is not None:
+            value = adapter.validate_json(cached, context={"bot": bot})
+        else:
+            value = await fetch()
+            await self._redis_set(redis_key, adapter.dump_json(value, by_alias=True, exclude_none=True).decode(), ttl)
+        self._memory.set(key, value)
+        return value
+
+    @staticmethod
+    def _redis_key(key: tuple[Hashable, ...]) -> str:
+        return f"{settings.TELEGRAM_REDIS_PREFIX}:" + ":".join(map(str, key))
+
+    async def _redis_get(self, key: str) -> str | None:
+        if self.redis is None:
+            return None
+        try:
+            return await self.redis.get(key)
+        except RedisError as err:
+            logger.warning("Telegram cache read failed: %s", err)
+            return None
+
+    async def _redis_set(self, key: str, value: str, ttl: int) -> None:
+        if self.redis is None:
+            return
+        try:
+            await self.redis.set(key, value, ex=ttl)
+        except RedisError as err:
+            logger.warning("Telegram cache write failed: %s", err)
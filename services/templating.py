@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Iterable
+
+from .compat import CompatibilityService, EMPTY_PLACEHOLDERS
+from .steam import SteamApp, SteamError, SteamStoreClient
+
+
+def app_values(app_id: int, app: SteamApp | None) -> dict[str, object]:
+    values: dict[str, object] = {"app_id": app_id}
+    if app is not None:
+        values.update(
+            title=app.name,
+            price=app.price,
+            initial_price=app.initial_price,
+            discount=app.discount_percent,
+            release_date=app.release_date,
+        )
+    return values
+
+
+async def collect_values(
+    app_ids: Iterable[int],
+    steam: SteamStoreClient,
+    compat: CompatibilityService,
+) -> dict[int, dict[str, object]]:
+    """Template values for many apps, fetched concurrently through the shared caches."""
+    app_ids = list(dict.fromkeys(app_ids))
+    apps = await asyncio.gather(*(steam.get_app(app_id) for app_id in app_ids), return_exceptions=True)
+    compat_values = await compat.get_many(app_ids)
+    values = {}
+    for app_id, app in zip(app_ids, apps):
+        if isinstance(app, SteamError):
+            app = None
+        elif isinstance(app, BaseException):
+            raise app
+        item = app_values(app_id, app)
+        compat_item = compat_values.get(app_id)
+        item.update(compat_item.placeholders() if compat_item else EMPTY_PLACEHOLDERS)
+        values[app_id] = item
+    return values
+
+
+__all__ = ["app_values", "collect_values"]
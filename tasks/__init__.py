@@ -1,91 +1,562 @@
 from __future__ import annotations
 
+import asyncio
 import datetime
-from typing import List
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Iterable, List
 from logging import getLogger
 
+from apscheduler.jobstores.memory import MemoryJobStore
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.date import DateTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from aiogram import Bot
-from aiogram.types import InlineKeyboardButton
-from aiogram.utils.keyboard import InlineKeyboardBuilder
-from aiogram.exceptions import TelegramBadRequest
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
+from redis.exceptions import RedisError, ResponseError
 
 from config import settings
 from config.log import configure_logging
+from database import bot_scope, redis
 from database import repository as repo
-from database.models import Post, Channel
+from database.models import Post, Channel, ChannelStatus, RecurringPost
+from services import app_index as steam_app_index
+from utils.schedule import as_local, plan_shift, plan_spread
+from utils.text import check_post
+from .app_index import refresh_app_index
+from .archive import archive_sent_posts
+from .channel_health import apply_channel_status, check_channels, member_status
+from .compat import warm_compat_cache
+from .keyboard import build_keyboard
+from .price_watch import poll_prices
+from .recurring import build_trigger, materialize, recurring_job_id
 
 
 scheduler = AsyncIOScheduler()
 logger = getLogger("tasks")
+# every bot gets its own job store so job ids only have to be unique per bot
+_bot_jobstores: set[str] = set()
+# running send_post calls by (bot id, post id), and the ones a shutdown
+# stopped or whose interruption could not be stored; drain_deliveries stores them
+_deliveries: dict[tuple[int, int], asyncio.Task] = {}
+_interrupted: set[tuple[int, int]] = set()
+# delivery records still being written
+_writes: set[asyncio.Task] = set()
+# set when the drain deadline passes: fan-outs stop before their next channel
+_draining = False
+# seconds a fan-out gets to finish its current channel once draining
+_CHANNEL_GRACE = 5
+# how much earlier than its scheduled time a post job may fire and still send
+_EARLY_RUN = datetime.timedelta(seconds=30)
+# set in worker processes: the jobs they schedule go to the receiver, whose
+# scheduler is the only one running post and recurring jobs
+_job_stream: str | None = None
+_JOB_GROUP = "scheduler"
 
 
-def start_scheduler() -> None:
-    """Start APScheduler with configured logging."""
+def bot_jobstore(bot: Bot) -> str:
+    """Alias of the job store holding ``bot``'s jobs, created on first use."""
+    alias = f"bot_{bot.id}"
+    if alias not in _bot_jobstores:
+        scheduler.add_jobstore(MemoryJobStore(), alias)
+        _bot_jobstores.add(alias)
+    return alias
+
+
+async def run_for_bot(bot_id: int, func: Callable[..., Awaitable[Any]], *args: Any) -> Any:
+    """Run a job inside the database scope of bot ``bot_id``."""
+    with bot_scope(bot_id):
+        return await func(*args)
+
+
+def _add_bot_job(bot: Bot | None, func: Callable[..., Awaitable[Any]], trigger, args: tuple = (), **kwargs: Any):
+    if bot is None:
+        return scheduler.add_job(func, trigger, args=args, **kwargs)
+    kwargs.setdefault("name", func.__name__)
+    return scheduler.add_job(
+        run_for_bot, trigger, args=(bot.id, func, *args), jobstore=bot_jobstore(bot), **kwargs
+    )
+
+
+def start_scheduler(bots: Iterable[Bot] = ()) -> None:
+    """Start APScheduler with configured logging.
+
+    Jobs working on bot data are registered once per bot, each in the bot's
+    job store; without bots they run once on the default schema and jobs
+    that talk to Telegram are skipped.
+    """
     configure_logging()
+    index_job_options = {}
+    if not steam_app_index.loaded and not steam_app_index.load():
+        # build the index right away on the first start
+        index_job_options["next_run_time"] = datetime.datetime.now()
+    scheduler.add_job(
+        refresh_app_index,
+        IntervalTrigger(hours=settings.STEAM_APP_INDEX_REFRESH_HOURS),
+        id="refresh_app_index",
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True,
+        **index_job_options,
+    )
+    for bot in list(bots) or [None]:
+        if settings.ARCHIVE_AFTER_DAYS > 0:
+            _add_bot_job(
+                bot,
+                archive_sent_posts,
+                IntervalTrigger(minutes=settings.ARCHIVE_INTERVAL_MINUTES),
+                id="archive_sent_posts",
+                replace_existing=True,
+                max_instances=1,
+                coalesce=True,
+            )
+        _add_bot_job(
+            bot,
+            warm_compat_cache,
+            IntervalTrigger(minutes=settings.COMPAT_WARMUP_INTERVAL_MINUTES),
+            id="warm_compat_cache",
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True,
+            next_run_time=datetime.datetime.now(),
+        )
+        if bot is not None:
+            _add_bot_job(
+                bot,
+                resume_deliveries,
+                IntervalTrigger(minutes=settings.DELIVERY_RESUME_MINUTES),
+                args=(bot,),
+                id="resume_deliveries",
+                replace_existing=True,
+                max_instances=1,
+                coalesce=True,
+            )
+            _add_bot_job(
+                bot,
+                poll_prices,
+                IntervalTrigger(minutes=settings.PRICE_WATCH_RUN_MINUTES),
+                args=(bot,),
+                id="poll_prices",
+                replace_existing=True,
+                max_instances=1,
+                coalesce=True,
+            )
+            if settings.CHANNEL_CHECK_INTERVAL_MINUTES > 0:
+                _add_bot_job(
+                    bot,
+                    check_channels,
+                    IntervalTrigger(minutes=settings.CHANNEL_CHECK_INTERVAL_MINUTES),
+                    args=(bot,),
+                    id="check_channels",
+                    replace_existing=True,
+                    max_instances=1,
+                    coalesce=True,
+                )
     if not scheduler.running:
         scheduler.start()
 
 
 async def send_post(post_id: int, bot: Bot) -> None:
-    """Send post text to selected channels."""
+    """Send post text to the channels it has not reached yet.
+
+    Every channel is recorded as soon as it is done. A fan-out cut short by
+    a shutdown, a flood wait or an error is marked interrupted right away,
+    and the periodic :func:`resume_deliveries` sends the channels left.
+    """
+    key = (bot.id, post_id)
+    _deliveries[key] = asyncio.current_task()
+    try:
+        finished = await _deliver(post_id, bot)
+    except BaseException:
+        await _interrupt(key)
+        raise
+    else:
+        if not finished:
+            await _interrupt(key)
+    finally:
+        _deliveries.pop(key, None)
+
+
+async def _interrupt(key: tuple[int, int]) -> None:
+    if _draining:
+        _interrupted.add(key)
+    try:
+        await _record(repo.set_delivery_interrupted([key[1]]))
+    except Exception as err:
+        logger.warning("Marking post %s interrupted failed, retried on shutdown: %s", key[1], err)
+        _interrupted.add(key)
+
+
+async def _retrying(request: Callable[[], Awaitable[Any]]) -> Any:
+    """Run a Bot API call, sitting out up to ``DELIVERY_RETRIES`` flood waits."""
+    for attempt in range(settings.DELIVERY_RETRIES + 1):
+        try:
+            return await request()
+        except TelegramRetryAfter as err:
+            if attempt == settings.DELIVERY_RETRIES:
+                raise
+            logger.warning("Flood wait of %ss while sending a post", err.retry_after)
+            await asyncio.sleep(err.retry_after)
+
+
+async def _deliver(post_id: int, bot: Bot) -> bool:
     post: Post = await repo.get_post(post_id)
     if not post:
-        return
-
-    markup = []
-    if post.use_default_buttons and post.steam_id:
-        markup.extend(
-            InlineKeyboardButton(
-                text=text,
-                url=url.format(app_id=post.steam_id),
-                callback_data=f"link_{text.lower()}:{post.steam_id}",
-            )
-            for text, url in settings.POST_BUTTONS.items()
-        )
-    if post.buttons:
-        markup.extend(
-            InlineKeyboardButton(text=b["text"], url=b["url"]) for b in post.buttons
-        )
+        return True
+    if post.scheduled_at and as_local(post.scheduled_at) > datetime.datetime.now() + _EARLY_RUN:
+        # moved later after this job was set up; the job of the new time sends it
+        logger.info("Post %s is scheduled for %s, not sending it yet", post.id, post.scheduled_at)
+        return True
 
-    channels: List[Channel] = await repo.get_post_channels(post_id)
+    keyboard = await build_keyboard(post)
+    # the same split the dialog showed at confirm time
+    first, *rest = check_post(post.text, with_media=bool(post.tg_image_id)).parts
+    channels: List[Channel] = await repo.get_undelivered_channels(post_id)
     for channel in channels:
-        keyboard = InlineKeyboardBuilder(markup=[markup])
-        keyboard.adjust(3)
+        if _draining:
+            return False
         try:
             if post.tg_image_id:
-                msg = await bot.send_photo(
+                msg = await _retrying(lambda: bot.send_photo(
                     channel.channel_id,
                     post.tg_image_id,
-                    caption=post.text,
+                    caption=first,
                     parse_mode="HTML",
                     show_caption_above_media=post.caption_above,
-                    reply_markup=keyboard.as_markup(),
-                )
+                    reply_markup=keyboard,
+                ))
             else:
-                msg = await bot.send_message(
+                msg = await _retrying(lambda: bot.send_message(
                     channel.channel_id,
-                    post.text,
+                    first,
                     parse_mode="HTML",
-                    reply_markup=keyboard.as_markup(),
-                )
-        except TelegramBadRequest as e:
-            logger.error(e, exc_info=True)
-            await bot.send_message(
-                post.author.tg_id,
-                f"Ошибка отправки поста в канал {channel.channel_name}:\n{e}",
-            )
-            return
-        
-        if msg:
-            await repo.mark_post_sent(post.id, msg.message_id)
+                    reply_markup=keyboard,
+                ))
+        except (TelegramForbiddenError, TelegramBadRequest) as e:
+            await _record(repo.mark_delivery_failed(post.id, channel.id))
+            await _report_failure(bot, post, channel, e)
+            continue
+        # recorded before the follow-ups, so the copy is never sent twice and
+        # edits reach it whatever happens to the rest
+        message_ids = [msg.message_id]
+        await _record(repo.mark_post_sent(post.id, msg.message_id, channel.id, message_ids))
+        for part in rest:
+            try:
+                follow_up = await _retrying(lambda: bot.send_message(channel.channel_id, part, parse_mode="HTML"))
+            except (TelegramForbiddenError, TelegramBadRequest) as e:
+                # the channel keeps the parts it got
+                await _report_failure(bot, post, channel, e)
+                break
+            message_ids.append(follow_up.message_id)
+            await _record(repo.set_post_messages(post.id, {channel.id: list(message_ids)}))
+    return True
 
 
-def schedule_post(send_time: datetime.datetime, post_id: int, bot: Bot) -> None:
-    """Schedule post sending at a specific datetime."""
+async def _report_failure(
+    bot: Bot, post: Post, channel: Channel, error: TelegramBadRequest | TelegramForbiddenError
+) -> None:
+    if isinstance(error, TelegramForbiddenError):
+        # removed from the channel: the next sends would fail the same way
+        logger.warning("Channel %s is gone: %s", channel.channel_id, error)
+        await apply_channel_status(bot, channel.channel_id, ChannelStatus.REMOVED)
+        return
+    logger.error(error, exc_info=True)
+    author = await repo.get_user(post.user_id)
+    if author:
+        await bot.send_message(
+            author.tg_id,
+            f"Ошибка отправки поста в канал {channel.title or channel.channel_id}:\n{error}",
+        )
+
+
+async def _record(write: Awaitable[None]) -> None:
+    """Run a delivery record to the end even if the send is cancelled, so the
+    channel is not sent twice on resume and no transaction is left open."""
+    task = asyncio.ensure_future(write)
+    _writes.add(task)
+    task.add_done_callback(_writes.discard)
+    await asyncio.shield(task)
+
+
+async def drain_deliveries(timeout: float) -> int:
+    """Give running ``send_post`` calls up to ``timeout`` seconds to finish.
+
+    Fan-outs still running then stop before their next channel, or are
+    cancelled after another ``_CHANNEL_GRACE`` seconds, and are marked for
+    :func:`resume_deliveries`. Returns the number of interrupted posts.
+    """
+    global _draining
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    # handlers still running may start new ones while we wait
+    while _deliveries and deadline > loop.time():
+        await asyncio.wait(set(_deliveries.values()), timeout=deadline - loop.time())
+    if _deliveries:
+        _draining = True
+        running = set(_deliveries.values())
+        _, pending = await asyncio.wait(running, timeout=_CHANNEL_GRACE)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+    await asyncio.gather(*_writes, return_exceptions=True)
+
+    by_bot: dict[int, list[int]] = defaultdict(list)
+    for bot_id, post_id in _interrupted:
+        by_bot[bot_id].append(post_id)
+    for bot_id, post_ids in by_bot.items():
+        with bot_scope(bot_id):
+            await repo.set_delivery_interrupted(post_ids)
+    interrupted = len(_interrupted)
+    _interrupted.clear()
+    return interrupted
+
+
+async def resume_deliveries(bot: Bot) -> int:
+    """Send interrupted posts to their remaining channels, called at startup and periodically."""
+    post_ids = await repo.claim_interrupted_posts()
+    for post_id in post_ids:
+        _add_bot_job(
+            bot,
+            send_post,
+            DateTrigger(run_date=datetime.datetime.now()),
+            args=(post_id, bot),
+            id=post_job_id(post_id),
+            replace_existing=True,
+            misfire_grace_time=None,
+        )
+    return len(post_ids)
+
+
+def post_job_id(post_id: int) -> str:
+    return f"post_{post_id}"
+
+
+def _schedule_post_job(send_time: datetime.datetime, post_id: int, bot: Bot) -> None:
     trigger = DateTrigger(run_date=send_time)
-    scheduler.add_job(send_post, trigger, args=(post_id, bot))
+    _add_bot_job(
+        bot,
+        send_post,
+        trigger,
+        args=(post_id, bot),
+        id=post_job_id(post_id),
+        replace_existing=True,
+    )
+
+
+async def schedule_post(send_time: datetime.datetime, post_id: int, bot: Bot) -> None:
+    """Schedule post sending at a specific datetime."""
+    await schedule_posts([(post_id, send_time)], bot)
+
+
+async def schedule_posts(items: Iterable[tuple[int, datetime.datetime]], bot: Bot) -> int:
+    """Schedule many ``(post_id, send_time)`` pairs at once.
+
+    The scheduler is paused while jobs are added so it recalculates its
+    wakeup time once for the whole batch instead of once per job.
+    """
+    items = list(items)
+    if _job_stream:
+        await _forward(bot, [{"job": "post", "post": str(post_id), "at": at.isoformat()} for post_id, at in items])
+        return len(items)
+    paused = scheduler.running
+    if paused:
+        scheduler.pause()
+    try:
+        for post_id, send_time in items:
+            _schedule_post_job(send_time, post_id, bot)
+    finally:
+        if paused:
+            scheduler.resume()
+    return len(items)
+
+
+async def run_recurring(recurring_id: int, bot: Bot) -> None:
+    """Turn the current occurrence of a recurring post into a post and send it."""
+    recurring = await repo.get_recurring_post(recurring_id)
+    if recurring is None or not recurring.is_active:
+        _unschedule_recurring_job(recurring_id, bot)
+        return
+    post = await materialize(recurring, datetime.datetime.now())
+    if post is not None:
+        await send_post(post.id, bot)
+
+
+def _schedule_recurring_job(recurring: RecurringPost, bot: Bot) -> None:
+    # one job per recurrence; the trigger computes each next run on the fly
+    _add_bot_job(
+        bot,
+        run_recurring,
+        build_trigger(recurring),
+        args=(recurring.id, bot),
+        id=recurring_job_id(recurring.id),
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True,
+    )
+
+
+def _unschedule_recurring_job(recurring_id: int, bot: Bot) -> None:
+    job = scheduler.get_job(recurring_job_id(recurring_id), bot_jobstore(bot))
+    if job is not None:
+        job.remove()
+
+
+async def schedule_recurring(recurring: RecurringPost, bot: Bot) -> None:
+    """Register the job of a recurring post."""
+    if _job_stream:
+        await _forward(bot, [{"job": "recurring", "recurring": str(recurring.id)}])
+    else:
+        _schedule_recurring_job(recurring, bot)
+
+
+async def unschedule_recurring(recurring_id: int, bot: Bot) -> None:
+    if _job_stream:
+        await _forward(bot, [{"job": "unschedule_recurring", "recurring": str(recurring_id)}])
+    else:
+        _unschedule_recurring_job(recurring_id, bot)
+
+
+async def restore_recurring_posts(bot: Bot) -> int:
+    """Re-register jobs of all active recurring posts, called at startup."""
+    recurring_posts = await repo.get_recurring_posts()
+    for recurring in recurring_posts:
+        _schedule_recurring_job(recurring, bot)
+    return len(recurring_posts)
+
+
+def forward_jobs(stream: str) -> None:
+    """Hand the jobs scheduled in this process to the receiver through ``stream``.
+
+    Used by workers: a job living in the worker that scheduled it would be
+    lost with the worker and could not be replaced from another one.
+    """
+    global _job_stream
+    _job_stream = stream
+
+
+async def _forward(bot: Bot, commands: list[dict[str, str]]) -> None:
+    async with redis.pipeline(transaction=False) as pipe:
+        for command in commands:
+            pipe.xadd(_job_stream, {"bot": str(bot.id), **command})
+        await pipe.execute()
+
+
+async def _apply_forwarded(bot: Bot, fields: dict[str, str]) -> None:
+    job = fields["job"]
+    if job == "post":
+        _schedule_post_job(datetime.datetime.fromisoformat(fields["at"]), int(fields["post"]), bot)
+    elif job == "recurring":
+        recurring = await repo.get_recurring_post(int(fields["recurring"]))
+        if recurring is not None and recurring.is_active:
+            _schedule_recurring_job(recurring, bot)
+    elif job == "unschedule_recurring":
+        _unschedule_recurring_job(int(fields["recurring"]), bot)
+    else:
+        logger.warning("Unknown forwarded job %s", job)
+
+
+async def run_forwarded_jobs(bots: Iterable[Bot], stream: str) -> None:
+    """Schedule the jobs workers forward, in the receiver until cancelled.
+
+    Entries are acknowledged and deleted once applied; the ones a stopped
+    receiver left behind are applied first on its next start.
+    """
+    by_id = {bot.id: bot for bot in bots}
+    try:
+        await redis.xgroup_create(stream, _JOB_GROUP, id="0", mkstream=True)
+    except ResponseError as err:
+        if "BUSYGROUP" not in str(err):
+            raise
+    last_id = "0"
+    while True:
+        try:
+            response = await redis.xreadgroup(_JOB_GROUP, "receiver", {stream: last_id}, count=100, block=5000)
+        except RedisError as err:
+            logger.warning("Reading forwarded jobs failed: %s", err)
+            await asyncio.sleep(5)
+            continue
+        entries = response[0][1] if response else []
+        if not entries:
+            last_id = ">"
+            continue
+        paused = scheduler.running
+        if paused:
+            scheduler.pause()
+        try:
+            for entry_id, fields in entries:
+                bot = by_id.get(int(fields.get("bot", 0)))
+                try:
+                    if bot is None:
+                        raise LookupError("unknown bot")
+                    with bot_scope(bot.id):
+                        await _apply_forwarded(bot, fields)
+                except Exception as err:
+                    logger.exception("Forwarded job %s %s failed: %s", entry_id, fields, err)
+        finally:
+            if paused:
+                scheduler.resume()
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.xack(stream, _JOB_GROUP, *(entry_id for entry_id, _ in entries))
+            pipe.xdel(stream, *(entry_id for entry_id, _ in entries))
+            await pipe.execute()
+
+
+async def reschedule_posts(
+    bot: Bot,
+    start: datetime.datetime,
+    end: datetime.datetime,
+    shift: datetime.timedelta | None = None,
+    spread_from: datetime.datetime | None = None,
+    channel_ids: list[int] | None = None,
+) -> list[tuple[int, datetime.datetime]]:
+    """Move unsent posts scheduled in ``[start, end)`` in one go.
+
+    Posts are either shifted by ``shift`` or spread over consecutive slots
+    from ``spread_from``; both land on free ``POST_TIME_OPTIONS`` slots.
+    The new times are written with one ``UPDATE`` and the jobs replaced in
+    one scheduler batch.
+    """
+    items = [(post_id, as_local(at)) for post_id, at in await repo.get_unsent_schedule(start, end, channel_ids)]
+    if not items:
+        return []
+    moved = {post_id for post_id, _ in items}
+    now = datetime.datetime.now()
+    earliest = max(spread_from if spread_from is not None else start + shift, now)
+    occupied = {
+        as_local(at) for post_id, at in await repo.get_unsent_schedule(earliest) if post_id not in moved
+    }
+    if spread_from is not None:
+        planned = plan_spread(items, earliest, occupied)
+    else:
+        planned = plan_shift(items, shift, occupied, now)
+
+    await repo.set_post_schedule(planned)
+    await schedule_posts(planned, bot)
+    return planned
 
 
-__all__ = ["scheduler", "start_scheduler", "schedule_post", "send_post"]
+__all__ = [
+    "scheduler",
+    "start_scheduler",
+    "bot_jobstore",
+    "run_for_bot",
+    "schedule_post",
+    "schedule_posts",
+    "reschedule_posts",
+    "restore_recurring_posts",
+    "run_recurring",
+    "schedule_recurring",
+    "unschedule_recurring",
+    "post_job_id",
+    "send_post",
+    "drain_deliveries",
+    "resume_deliveries",
+    "forward_jobs",
+    "run_forwarded_jobs",
+    "archive_sent_posts",
+    "refresh_app_index",
+    "warm_compat_cache",
+    "poll_prices",
+    "check_channels",
+    "apply_channel_status",
+    "member_status",
+]
@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+from logging import getLogger
+
+import aiohttp
+
+from services import app_index, refresh_index
+
+
+logger = getLogger("tasks")
+
+
+async def refresh_app_index() -> None:
+    """Scheduled refresh of the local Steam app-name index."""
+    try:
+        await refresh_index(app_index)
+    except (aiohttp.ClientError, TimeoutError, KeyError, ValueError) as err:
+        logger.warning("App index refresh failed: %s", err)
+
+
+__all__ = ["refresh_app_index"]
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import asyncio
+import datetime
+from logging import getLogger
+
+from config import settings
+from database import repository as repo
+
+
+logger = getLogger("tasks")
+
+
+async def archive_sent_posts() -> int:
+    """Move old sent posts to the archive in bounded chunks.
+
+    At most ``ARCHIVE_MAX_BATCHES`` batches are moved per run, the rest is
+    left for the next run so a large backlog never holds the loop or the
+    database for long.
+    """
+    cutoff = datetime.datetime.now() - datetime.timedelta(days=settings.ARCHIVE_AFTER_DAYS)
+    total = 0
+    for _ in range(settings.ARCHIVE_MAX_BATCHES):
+        moved = await repo.archive_posts(cutoff, settings.ARCHIVE_BATCH_SIZE)
+        total += moved
+        if moved < settings.ARCHIVE_BATCH_SIZE:
+            break
+        await asyncio.sleep(0)
+    if total:
+        logger.info("Archived %s posts sent before %s", total, cutoff)
+    return total
+
+
+__all__ = ["archive_sent_posts"]
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import asyncio
+from html import escape
+from logging import getLogger
+
+from aiogram import Bot
+from aiogram.enums import ChatMemberStatus
+from aiogram.exceptions import TelegramAPIError, TelegramBadRequest, TelegramForbiddenError
+
+from config import settings
+from database import repository as repo
+from database.models import Channel, ChannelStatus, ChannelType, UserRole
+from services import telegram_metadata
+
+
+logger = getLogger("tasks")
+
+_REASONS = {
+    ChannelStatus.NO_RIGHTS: "у бота нет прав на публикацию",
+    ChannelStatus.REMOVED: "бот удалён из канала",
+}
+
+
+def member_status(member, is_channel: bool) -> ChannelStatus:
+    """What a ``ChatMember`` of the bot means for posting to the chat."""
+    if member.status in {ChatMemberStatus.LEFT, ChatMemberStatus.KICKED}:
+        return ChannelStatus.REMOVED
+    if member.status == ChatMemberStatus.RESTRICTED:
+        if not member.is_member:
+            return ChannelStatus.REMOVED
+        return ChannelStatus.OK if member.can_send_messages else ChannelStatus.NO_RIGHTS
+    if is_channel:
+        # only admins allowed to post can post in a channel
+        if member.status == ChatMemberStatus.ADMINISTRATOR and not member.can_post_messages:
+            return ChannelStatus.NO_RIGHTS
+        if member.status == ChatMemberStatus.MEMBER:
+            return ChannelStatus.NO_RIGHTS
+    return ChannelStatus.OK
+
+
+async def apply_channel_status(bot: Bot, chat_id: int, status: ChannelStatus) -> None:
+    """Store ``status`` and tell the admins when the channel dies or recovers."""
+    result = await repo.set_channel_status(chat_id, status)
+    if result is None:
+        return
+    channel, previous = result
+    if previous == status:
+        return
+    await telegram_metadata.invalidate_chat(bot.id, chat_id, bot.id)
+    name = escape(channel.title or str(chat_id))
+    if status == ChannelStatus.OK:
+        logger.info("Channel %s is available again", chat_id)
+        text = f"Канал {name} ({chat_id}) снова доступен и включён"
+    else:
+        logger.warning("Channel %s deactivated: %s", chat_id, status.value)
+        text = f"Канал {name} ({chat_id}) отключён: {_REASONS[status]}"
+    for user in await repo.get_users():
+        if user.role != UserRole.ADMIN or not user.tg_id:
+            continue
+        try:
+            await bot.send_message(user.tg_id, text)
+        except TelegramAPIError as err:
+            logger.warning("Channel status notification failed: %s", err)
+
+
+async def _check(bot: Bot, channel: Channel) -> ChannelStatus | None:
+    try:
+        member = await bot.get_chat_member(channel.channel_id, bot.id)
+    except TelegramForbiddenError:
+        return ChannelStatus.REMOVED
+    except TelegramBadRequest as err:
+        if "chat not found" in err.message.lower():
+            return ChannelStatus.REMOVED
+        logger.warning("Checking channel %s failed: %s", channel.channel_id, err)
+        return None
+    except TelegramAPIError as err:
+        logger.warning("Checking channel %s failed: %s", channel.channel_id, err)
+        return None
+    return member_status(member, channel.channel_type == ChannelType.CHANNEL)
+
+
+async def check_channels(bot: Bot) -> None:
+    """Ask Telegram about the bot's rights in every channel, a batch at a time.
+
+    Catches what ``my_chat_member`` updates missed, e.g. while the bot was
+    down; channels that cannot be checked right now keep their status.
+    """
+    channels = await repo.get_channels()
+    size = max(settings.CHANNEL_CHECK_BATCH_SIZE, 1)
+    changed = 0
+    for start in range(0, len(channels), size):
+        batch = channels[start:start + size]
+        statuses = await asyncio.gather(*(_check(bot, channel) for channel in batch))
+        for channel, status in zip(batch, statuses):
+            if status is not None and status != channel.status:
+                await apply_channel_status(bot, channel.channel_id, status)
+                changed += 1
+    logger.info("Checked %s channels, %s changed status", len(channels), changed)
+
+
+__all__ = ["member_status", "apply_channel_status", "check_channels"]
@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+import datetime
+from logging import getLogger
+
+from config import settings
+from database import repository as repo
+from services import compat_service
+
+
+logger = getLogger("tasks")
+
+
+async def warm_compat_cache() -> None:
+    """Prefetch compatibility data for posts going out soon.
+
+    Keeps ``send_post`` on cached values only, so enrichment never adds a
+    network round trip at delivery time.
+    """
+    until = datetime.datetime.now() + datetime.timedelta(hours=settings.COMPAT_WARMUP_HOURS)
+    app_ids = await repo.get_upcoming_steam_ids(until)
+    if app_ids:
+        values = await compat_service.get_many(app_ids)
+        logger.debug("Compatibility cache warm: %s of %s apps", len(values), len(app_ids))
+
+
+__all__ = ["warm_compat_cache"]
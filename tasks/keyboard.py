@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+
+from config import settings
+from database.models import Post
+from services import EMPTY_PLACEHOLDERS, compat_service
+
+
+class _Placeholders(dict):
+    def __missing__(self, key: str) -> str:
+        return ""
+
+
+def format_label(label: str, values: dict[str, str]) -> str:
+    """Fill label placeholders, dropping unknown ones and the spaces they leave."""
+    return " ".join(label.format_map(_Placeholders(values)).split())
+
+
+async def build_keyboard(post: Post) -> InlineKeyboardMarkup:
+    """Default Steam buttons followed by the post's own buttons."""
+    markup = []
+    if post.use_default_buttons and post.steam_id:
+        # cached only, a cold or stale entry is refreshed in the background
+        compat = await compat_service.peek(post.steam_id)
+        values = compat.placeholders() if compat else EMPTY_PLACEHOLDERS
+        markup.extend(
+            InlineKeyboardButton(
+                text=format_label(text, values),
+                url=url.format(app_id=post.steam_id),
+                callback_data=f"link_{text.split()[0].lower()}:{post.steam_id}",
+            )
+            for text, url in settings.POST_BUTTONS.items()
+        )
+    if post.buttons:
+        markup.extend(
+            InlineKeyboardButton(text=b["text"], url=b["url"]) for b in post.buttons
+        )
+    keyboard = InlineKeyboardBuilder(markup=[markup])
+    keyboard.adjust(3)
+    return keyboard.as_markup()
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import datetime
+from html import escape
+from logging import getLogger
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError
+
+from config import settings
+from database import repository as repo
+from database.models import WatchedGame
+from services import PriceState, SteamError, steam_client
+from services.templating import app_values
+from utils.templates import TemplateError, compile_template, template_cache
+
+
+logger = getLogger("tasks")
+
+render_default_draft = compile_template(
+    "<b>{title}</b>\nСкидка {discount}%: <s>{initial_price}</s> → {price}"
+)
+
+
+def format_price(amount: int | None, currency: str | None) -> str:
+    if amount is None:
+        return ""
+    return f"{amount / 100:.2f} {currency or ''}".strip()
+
+
+def next_interval(current: int, changed: bool) -> int:
+    """Poll again soon after a change, back off while the price stays put."""
+    if changed:
+        return settings.PRICE_WATCH_MIN_INTERVAL
+    return min(max(current, settings.PRICE_WATCH_MIN_INTERVAL) * 2, settings.PRICE_WATCH_MAX_INTERVAL)
+
+
+async def poll_prices(bot: Bot) -> None:
+    """Check due watched games within the per-run request budget."""
+    now = datetime.datetime.now()
+    size = settings.PRICE_WATCH_BATCH_SIZE
+    games = await repo.get_due_watched_games(now, settings.PRICE_WATCH_REQUESTS_PER_RUN * size)
+    for start in range(0, len(games), size):
+        await check_batch(games[start:start + size], now, bot)
+
+
+async def check_batch(games: list[WatchedGame], now: datetime.datetime, bot: Bot) -> None:
+    since = None
+    if all(game.last_modified for game in games):
+        since = min(game.last_modified for game in games)
+    try:
+        batch = await steam_client.fetch_prices([game.steam_id for game in games], since)
+    except SteamError as err:
+        logger.warning("Price check failed: %s", err)
+        return
+
+    updates = []
+    drafts = []
+    for game in games:
+        state = None if batch.not_modified else batch.prices.get(game.steam_id)
+        changed = state is not None and (
+            state.final != game.price_final or state.discount_percent != game.discount_percent
+        )
+        interval = next_interval(game.poll_interval, changed)
+        row = {
+            "id": game.id,
+            "poll_interval": interval,
+            "next_check_at": now + datetime.timedelta(seconds=interval),
+            "last_checked_at": now,
+            "last_modified": batch.last_modified or game.last_modified,
+        }
+        if changed:
+            row.update(
+                price_initial=state.initial,
+                price_final=state.final,
+                discount_percent=state.discount_percent,
+                currency=state.currency,
+            )
+            if state.discount_percent < game.min_discount:
+                # the sale is over, the next one gets its own draft
+                row["drafted_discount"] = 0
+            elif state.discount_percent > game.drafted_discount:
+                row["drafted_discount"] = state.discount_percent
+                drafts.append((game, state))
+        updates.append(row)
+
+    await repo.update_watched_games(updates)
+    for game, state in drafts:
+        await create_draft(game, state, bot)
+
+
+async def create_draft(game: WatchedGame, state: PriceState, bot: Bot) -> None:
+    try:
+        app = await steam_client.get_app(game.steam_id)
+    except SteamError:
+        app = None
+    title = app.name if app else str(game.steam_id)
+    values = app_values(game.steam_id, app) | {
+        "title": title,
+        "price": format_price(state.final, state.currency),
+        "initial_price": format_price(state.initial, state.currency),
+        "discount": state.discount_percent,
+    }
+    text = None
+    buttons = None
+    if game.template:
+        try:
+            text = template_cache.render(game.template.id, game.template.text, values)
+            buttons = game.template.buttons
+        except TemplateError as err:
+            logger.warning("Template %s is broken, using the default draft: %s", game.template.id, err)
+    if text is None:
+        text = render_default_draft(values)
+
+    post = await repo.create_post(
+        user_id=game.user_id,
+        text=text,
+        steam_id=game.steam_id,
+        template_id=game.template_id,
+        tg_image_id=app.header_image if app else None,
+        buttons=buttons,
+        is_draft=True,
+    )
+    logger.info("Draft post %s for %s at -%s%%", post.id, game.steam_id, state.discount_percent)
+    try:
+        await bot.send_message(
+            game.user.tg_id,
+            f"Скидка {state.discount_percent}% на {escape(title)}: создан черновик поста #{post.id}\n"
+            "Опубликовать: Посты → Черновики",
+        )
+    except TelegramAPIError as err:
+        logger.warning("Draft notification failed: %s", err)
+
+
+__all__ = ["poll_prices", "check_batch", "create_draft", "next_interval"]
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass
+from html import escape
+from logging import getLogger
+from typing import Awaitable, Callable
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError, TelegramBadRequest, TelegramRetryAfter
+
+from config import settings
+from database import repository as repo
+from database.models import Channel, Post
+from utils.text import check_post
+from .keyboard import build_keyboard
+
+
+logger = getLogger("tasks")
+
+
+@dataclass
+class ChannelResult:
+    channel: str
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class _Throttle:
+    """Space calls at least ``1 / rate`` seconds apart."""
+
+    def __init__(self, rate: float) -> None:
+        self.interval = 1 / rate if rate > 0 else 0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        async with self._lock:
+            delay = self._next - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next = max(self._next, time.monotonic()) + self.interval
+
+
+class _Propagation:
+    """Concurrency and rate limits shared by every propagation of one bot."""
+
+    def __init__(self) -> None:
+        self._semaphore = asyncio.Semaphore(settings.PROPAGATION_CONCURRENCY)
+        self._throttle = _Throttle(settings.PROPAGATION_RATE)
+
+    async def call(self, request: Callable[[], Awaitable]) -> None:
+        for attempt in range(settings.PROPAGATION_RETRIES + 1):
+            await self._throttle.wait()
+            try:
+                await request()
+                return
+            except TelegramRetryAfter as err:
+                if attempt == settings.PROPAGATION_RETRIES:
+                    raise
+                await asyncio.sleep(err.retry_after)
+            except TelegramBadRequest as err:
+                # the copy already looks the way we want or is already gone
+                if "message is not modified" in err.message or "message to delete not found" in err.message:
+                    return
+                raise
+
+    async def run(
+        self,
+        deliveries: list[tuple[Channel, list[int]]],
+        apply: Callable[[Channel, list[int]], Awaitable[list[int] | None]],
+    ) -> tuple[list[ChannelResult], dict[int, list[int] | None]]:
+        """Apply a change to every channel concurrently.
+
+        Returns per-channel results and the new message ids of the channels
+        where the change went through.
+        """
+        messages: dict[int, list[int] | None] = {}
+
+        async def one(channel: Channel, message_ids: list[int]) -> ChannelResult:
+            name = channel.title or str(channel.channel_id)
+            async with self._semaphore:
+                try:
+                    messages[channel.id] = await apply(channel, message_ids)
+                except TelegramAPIError as err:
+                    logger.warning("Post propagation to %s failed: %s", channel.channel_id, err)
+                    return ChannelResult(name, err.message)
+            return ChannelResult(name)
+
+        results = await asyncio.gather(*(one(channel, ids) for channel, ids in deliveries))
+        return list(results), messages
+
+
+_propagations: dict[int, _Propagation] = {}
+
+
+def _propagation(bot: Bot) -> _Propagation:
+    """The limiter of ``bot``, created on first use.
+
+    Edits started from different chats share it, so together they stay
+    within the bot's limits.
+    """
+    if bot.id not in _propagations:
+        _propagations[bot.id] = _Propagation()
+    return _propagations[bot.id]
+
+
+async def edit_post_copies(bot: Bot, post: Post, text: str) -> list[ChannelResult]:
+    """Replace the text of every delivered copy and store it in the post.
+
+    The new text is split the way :func:`tasks.send_post` splits it; parts
+    that are no longer needed are deleted, a text that needs more messages
+    than were delivered is refused by the caller. The post keeps its old
+    text when no copy could be edited.
+    """
+    first, *rest = check_post(text, with_media=bool(post.tg_image_id)).parts
+    keyboard = await build_keyboard(post)
+    propagation = _propagation(bot)
+
+    async def apply(channel: Channel, message_ids: list[int]) -> list[int]:
+        head, *tail = message_ids
+        if post.tg_image_id:
+            await propagation.call(lambda: bot.edit_message_caption(
+                chat_id=channel.channel_id, message_id=head, caption=first,
+                parse_mode="HTML", show_caption_above_media=post.caption_above, reply_markup=keyboard,
+            ))
+        else:
+            await propagation.call(lambda: bot.edit_message_text(
+                text=first, chat_id=channel.channel_id, message_id=head,
+                parse_mode="HTML", reply_markup=keyboard,
+            ))
+        for message_id, part in zip(tail, rest):
+            await propagation.call(lambda: bot.edit_message_text(
+                text=part, chat_id=channel.channel_id, message_id=message_id, parse_mode="HTML",
+            ))
+        for message_id in tail[len(rest):]:
+            await propagation.call(lambda: bot.delete_message(channel.channel_id, message_id))
+        return message_ids[:len(rest) + 1]
+
+    deliveries = await repo.get_post_deliveries(post.id)
+    results, messages = await propagation.run(deliveries, apply)
+    if messages or not deliveries:
+        await repo.update_post_text(post.id, text)
+        await repo.set_post_messages(post.id, messages)
+    return results
+
+
+async def refresh_post_markup(bot: Bot, post: Post) -> list[ChannelResult]:
+    """Rebuild the keyboard of every delivered copy, e.g. with fresh ProtonDB labels."""
+    keyboard = await build_keyboard(post)
+    propagation = _propagation(bot)
+
+    async def apply(channel: Channel, message_ids: list[int]) -> list[int]:
+        await propagation.call(lambda: bot.edit_message_reply_markup(
+            chat_id=channel.channel_id, message_id=message_ids[0], reply_markup=keyboard,
+        ))
+        return message_ids
+
+    results, _ = await propagation.run(await repo.get_post_deliveries(post.id), apply)
+    return results
+
+
+async def delete_post_copies(bot: Bot, post: Post) -> list[ChannelResult]:
+    """Delete every delivered copy; the post itself goes once no copy is left."""
+    deliveries = await repo.get_post_deliveries(post.id)
+    propagation = _propagation(bot)
+
+    async def apply(channel: Channel, message_ids: list[int]) -> None:
+        for message_id in message_ids:
+            await propagation.call(lambda: bot.delete_message(channel.channel_id, message_id))
+        return None
+
+    results, messages = await propagation.run(deliveries, apply)
+    if len(messages) == len(deliveries):
+        await repo.delete_post(post.id)
+    else:
+        await repo.set_post_messages(post.id, messages)
+    return results
+
+
+def format_results(results: list[ChannelResult]) -> str:
+    if not results:
+        return "Нет отправленных копий поста"
+    lines = [
+        f"✅ {escape(result.channel)}" if result.ok else f"❌ {escape(result.channel)}: {escape(result.error)}"
+        for result in results
+    ]
+    done = sum(result.ok for result in results)
+    return f"Готово: {done} из {len(results)}\n" + "\n".join(lines)
+
+
+__all__ = [
+    "ChannelResult",
+    "delete_post_copies",
+    "edit_post_copies",
+    "format_results",
+    "refresh_post_markup",
+]
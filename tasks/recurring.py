@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import datetime
+import re
+from logging import getLogger
+
+from apscheduler.triggers.base import BaseTrigger
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+
+from database import repository as repo
+from database.models import Post, RecurringPost
+from services import compat_service, steam_client
+from services.templating import collect_values
+from utils.templates import TemplateError, template_cache
+from utils.text import check_post
+
+
+logger = getLogger("tasks")
+
+_INTERVAL_RE = re.compile(r"^(\d+)([mhdмчд])$")
+_INTERVAL_MINUTES = {"m": 1, "м": 1, "h": 60, "ч": 60, "d": 24 * 60, "д": 24 * 60}
+
+
+def recurring_job_id(recurring_id: int) -> str:
+    return f"recurring_{recurring_id}"
+
+
+def parse_schedule(value: str) -> tuple[str | None, int | None]:
+    """Parse ``30m``/``12h``/``1d`` into an interval or a 5-field crontab.
+
+    Returns ``(cron, interval_minutes)``; raises ``ValueError`` on garbage.
+    """
+    value = " ".join(value.split())
+    match = _INTERVAL_RE.match(value.lower())
+    if match:
+        minutes = int(match.group(1)) * _INTERVAL_MINUTES[match.group(2)]
+        if minutes <= 0:
+            raise ValueError(value)
+        return None, minutes
+    CronTrigger.from_crontab(value)
+    return value, None
+
+
+def build_trigger(recurring: RecurringPost) -> BaseTrigger:
+    if recurring.cron:
+        return CronTrigger.from_crontab(recurring.cron)
+    return IntervalTrigger(minutes=recurring.interval_minutes)
+
+
+def describe_schedule(recurring: RecurringPost) -> str:
+    if recurring.cron:
+        return f"cron {recurring.cron}"
+    return f"каждые {recurring.interval_minutes} мин"
+
+
+async def materialize(recurring: RecurringPost, now: datetime.datetime) -> Post | None:
+    """Render the template for this occurrence and store it as a post."""
+    template = recurring.template
+    values: dict[str, object] = {}
+    if recurring.steam_id:
+        values = (await collect_values([recurring.steam_id], steam_client, compat_service))[recurring.steam_id]
+    try:
+        text = template_cache.render(template.id, template.text, values)
+    except TemplateError as err:
+        logger.warning("Recurring post %s skipped, template %s is broken: %s", recurring.id, template.id, err)
+        return None
+    error = check_post(text).error
+    if error:
+        logger.warning("Recurring post %s skipped: %s", recurring.id, error)
+        return None
+
+    post = await repo.create_post(
+        user_id=recurring.user_id,
+        text=text,
+        steam_id=recurring.steam_id,
+        template_id=template.id,
+        scheduled_at=now,
+        use_default_buttons=bool(recurring.steam_id),
+        buttons=template.buttons,
+        chat_ids=recurring.chat_ids,
+    )
+    await repo.mark_recurring_run(recurring.id, now)
+    return post
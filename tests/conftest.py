@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import os
+import tempfile
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+# settings are read on import; keep the database and Redis of the host out of it
+os.environ.setdefault("DB_DSN", f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/test.sqlite3")
+os.environ.setdefault("REDIS_URL", "redis://127.0.0.1:1")
+os.environ.setdefault("BOT_TOKEN", "0:test")
+
+Handler = Callable[[web.Request], Awaitable[web.StreamResponse]]
+
+
+@dataclass
+class StandIn:
+    """Local HTTP server standing in for an external service."""
+
+    url: str
+    requests: list[web.Request] = field(default_factory=list)
+
+    def count(self, path: str) -> int:
+        return sum(1 for request in self.requests if request.path == path)
+
+
+@pytest.fixture
+async def stand_in():
+    """Start a server from ``{path: handler}``; every request is recorded."""
+    servers: list[TestServer] = []
+
+    async def start(routes: dict[str, Handler]) -> StandIn:
+        app = web.Application()
+        server = StandIn("")
+
+        def recorded(handler: Handler) -> Handler:
+            async def handle(request: web.Request) -> web.StreamResponse:
+                server.requests.append(request)
+                return await handler(request)
+
+            return handle
+
+        for path, handler in routes.items():
+            app.router.add_get(path, recorded(handler))
+        test_server = TestServer(app)
+        await test_server.start_server()
+        servers.append(test_server)
+        server.url = str(test_server.make_url("")).rstrip("/")
+        return server
+
+    yield start
+    for test_server in servers:
+        await test_server.close()
+
+
+@pytest.fixture
+async def fake_redis():
+    from fakeredis import FakeAsyncRedis
+
+    redis = FakeAsyncRedis(decode_responses=True)
+    yield redis
+    await redis.aclose()
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import asyncio
+
+from aiohttp import web
+import pytest
+
+from config import settings
+from services.compat import Compatibility, CompatibilityService
+
+
+class Upstream:
+    """ProtonDB summaries and Deck reports by app id, switchable mid-test."""
+
+    def __init__(self) -> None:
+        self.tiers: dict[int, str] = {}
+        self.deck: dict[int, int] = {}
+        self.failing = False
+
+    async def protondb(self, request: web.Request) -> web.Response:
+        if self.failing:
+            return web.Response(status=500)
+        app_id = int(request.match_info["app_id"])
+        if app_id not in self.tiers:
+            return web.Response(status=404)
+        return web.json_response({"tier": self.tiers[app_id], "score": 0.9, "total": 100})
+
+    async def deck_report(self, request: web.Request) -> web.Response:
+        if self.failing:
+            return web.Response(status=500)
+        app_id = int(request.query["nAppID"])
+        if app_id not in self.deck:
+            return web.json_response({"success": 1, "results": {}})
+        return web.json_response({"success": 1, "results": {"appid": app_id, "resolved_category": self.deck[app_id]}})
+
+
+@pytest.fixture
+async def upstream(stand_in, monkeypatch):
+    upstream = Upstream()
+    server = await stand_in({
+        "/api/v1/reports/summaries/{app_id}.json": upstream.protondb,
+        "/saleaction/ajaxgetdeckappcompatibilityreport": upstream.deck_report,
+    })
+    monkeypatch.setattr(settings, "PROTONDB_URL", server.url)
+    monkeypatch.setattr(settings, "STEAM_STORE_URL", server.url)
+    upstream.server = server
+    return upstream
+
+
+@pytest.fixture
+async def service_factory():
+    services: list[CompatibilityService] = []
+
+    def make(**kwargs) -> CompatibilityService:
+        service = CompatibilityService(**kwargs)
+        services.append(service)
+        return service
+
+    yield make
+    for service in services:
+        await service.close()
+
+
+async def settle(service: CompatibilityService) -> None:
+    """Wait for background refreshes."""
+    while service._background:
+        await asyncio.gather(*service._background, return_exceptions=True)
+
+
+@pytest.mark.parametrize(
+    "category, status, badge",
+    [(3, "verified", "✅ Deck Verified"), (2, "playable", "🟡 Deck Playable"),
+     (1, "unsupported", "⛔ Deck Unsupported"), (0, "unknown", "")],
+)
+async def test_deck_category_is_mapped(upstream, service_factory, category, status, badge):
+    upstream.tiers[620] = "platinum"
+    upstream.deck[620] = category
+    service = service_factory()
+
+    value = (await service.get_many([620]))[620]
+    assert value.deck_status == status
+    placeholders = value.placeholders()
+    assert placeholders["deck_badge"] == badge
+    assert placeholders["deck_status"] == status.capitalize()
+    assert placeholders["protondb_tier"] == "Platinum"
+    assert placeholders["protondb_badge"] == "💎 Platinum"
+
+
+async def test_unknown_app_has_empty_placeholders(upstream, service_factory):
+    service = service_factory()
+
+    value = (await service.get_many([1]))[1]
+    assert value.protondb_tier is None and value.deck_status is None
+    assert set(value.placeholders().values()) == {""}
+
+
+async def test_get_many_fetches_each_app_once(upstream, service_factory):
+    upstream.tiers.update({1: "gold", 2: "silver"})
+    service = service_factory()
+
+    first = await service.get_many([1, 2, 2])
+    second = await service.get_many([1, 2])
+    assert {app_id: value.protondb_tier for app_id, value in second.items()} == {1: "gold", 2: "silver"}
+    assert first == second
+    assert upstream.server.count("/saleaction/ajaxgetdeckappcompatibilityreport") == 2
+
+
+async def test_peek_serves_stale_value_and_revalidates(upstream, service_factory):
+    upstream.tiers[620] = "gold"
+    service = service_factory(ttl=0.1, stale_ttl=60)
+
+    # nothing cached: no waiting, the value is fetched in the background
+    assert await service.peek(620) is None
+    await settle(service)
+    assert (await service.peek(620)).protondb_tier == "gold"
+
+    upstream.tiers[620] = "platinum"
+    await asyncio.sleep(0.15)
+    stale = await service.peek(620)
+    assert stale.protondb_tier == "gold"
+    await settle(service)
+    assert (await service.peek(620)).protondb_tier == "platinum"
+
+
+async def test_failed_refresh_keeps_stale_value(upstream, service_factory):
+    upstream.tiers[620] = "gold"
+    service = service_factory(ttl=0.1, stale_ttl=60)
+    await service.get_many([620])
+
+    upstream.failing = True
+    await asyncio.sleep(0.15)
+    assert (await service.peek(620)).protondb_tier == "gold"
+    await settle(service)
+    assert (await service.peek(620)).protondb_tier == "gold"
+    assert (await service.get_many([620]))[620].protondb_tier == "gold"
+
+
+async def test_failed_fetch_is_left_out(upstream, service_factory):
+    upstream.failing = True
+    service = service_factory()
+
+    assert await service.get_many([620]) == {}
+
+
+async def test_redis_tier_keeps_freshness(upstream, service_factory, fake_redis):
+    upstream.tiers[620] = "gold"
+    await service_factory(redis=fake_redis).get_many([620])
+
+    other = service_factory(redis=fake_redis)
+    value = await other.peek(620)
+    assert isinstance(value, Compatibility) and value.protondb_tier == "gold"
+    await settle(other)
+    # fresh in Redis, so the second service did not ask upstream again
+    assert upstream.server.count("/saleaction/ajaxgetdeckappcompatibilityreport") == 1
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import asyncio
+import datetime
+from contextlib import suppress
+from types import SimpleNamespace
+
+import tasks
+from tasks import bot_jobstore, post_job_id, run_forwarded_jobs, schedule_post, scheduler, unschedule_recurring
+
+STREAM = "test:jobs"
+
+
+async def test_worker_jobs_are_scheduled_by_the_receiver(fake_redis, monkeypatch):
+    bot = SimpleNamespace(id=1)
+    send_time = datetime.datetime.now() + datetime.timedelta(days=1)
+    monkeypatch.setattr(tasks, "redis", fake_redis)
+    monkeypatch.setattr(tasks, "_job_stream", STREAM)
+
+    await schedule_post(send_time, 7, bot)
+    await unschedule_recurring(3, bot)
+    # nothing is scheduled in the worker itself
+    assert scheduler.get_job(post_job_id(7), bot_jobstore(bot)) is None
+
+    receiver = asyncio.create_task(run_forwarded_jobs([bot], STREAM))
+    try:
+        async with asyncio.timeout(2):
+            while await fake_redis.xlen(STREAM):
+                await asyncio.sleep(0.01)
+    finally:
+        receiver.cancel()
+        with suppress(asyncio.CancelledError):
+            await receiver
+    job = scheduler.get_job(post_job_id(7), bot_jobstore(bot))
+    try:
+        assert job is not None
+        assert job.trigger.run_date.replace(tzinfo=None) == send_time
+    finally:
+        scheduler.remove_job(post_job_id(7), bot_jobstore(bot))
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import io
+import json
+
+import pytest
+
+from utils.post_import import iter_import_rows
+
+VALID = {"text": "Скидка", "scheduled_at": "21-06-2099 17:30", "channels": "-100"}
+
+
+def import_json(records: list[dict]) -> list[tuple[int, object, str | None]]:
+    stream = io.BytesIO(json.dumps(records).encode())
+    return list(iter_import_rows(stream, "posts.json", {-100, -200}))
+
+
+def test_valid_record_is_parsed() -> None:
+    [(line, row, error)] = import_json([
+        VALID | {
+            "channels": [-100, "-200"],
+            "app_id": "620",
+            "image": "AgAC",
+            "buttons": [{"text": "Купить", "url": "https://example.com"}],
+        }
+    ])
+    assert error is None
+    assert row.channels == [-100, -200]
+    assert row.steam_id == 620
+    assert row.tg_image_id == "AgAC"
+    assert row.buttons == [{"text": "Купить", "url": "https://example.com"}]
+
+
+@pytest.mark.parametrize(
+    "fields",
+    [
+        {"text": 5},
+        {"text": ["Скидка"]},
+        {"channels": [{"id": -100}]},
+        {"channels": [True]},
+        {"buttons": [5]},
+        {"buttons": {"text": "Купить"}},
+        {"buttons": [{"text": 1, "url": "https://example.com"}]},
+        {"image": 5},
+        {"app_id": 1.5},
+        {"app_id": [620]},
+        {"scheduled_at": 20990621},
+        {"caption_above": {}},
+    ],
+)
+def test_wrongly_typed_field_is_reported_for_its_row(fields: dict) -> None:
+    results = import_json([VALID | fields, VALID])
+    assert [(line, error is None) for line, _, error in results] == [(1, False), (2, True)]
@@ -0,0 +1,8 @@
+from __future__ import annotations
+
+from benchmarks.repository import measure
+
+
+async def test_repository_functions_stay_within_statement_budgets() -> None:
+    # the throwaway SQLite database of the test run, recreated from the models
+    assert await measure(check=True) == []
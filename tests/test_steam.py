@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import asyncio
+import datetime
+from email.utils import format_datetime
+
+from aiohttp import web
+import pytest
+
+from services.steam import PriceState, SteamError, SteamStoreClient
+
+APP = {"name": "Portal 2", "is_free": False, "price_overview": {"final_formatted": "199 руб."}}
+
+
+def appdetails(apps: dict[int, dict], delay: float = 0.0):
+    async def handle(request: web.Request) -> web.Response:
+        if delay:
+            await asyncio.sleep(delay)
+        app_id = request.query["appids"]
+        data = apps.get(int(app_id))
+        if data is None:
+            return web.json_response({app_id: {"success": False}})
+        return web.json_response({app_id: {"success": True, "data": data}})
+
+    return handle
+
+
+@pytest.fixture
+async def client_factory():
+    clients: list[SteamStoreClient] = []
+
+    def make(url: str, **kwargs) -> SteamStoreClient:
+        client = SteamStoreClient(base_url=url, **kwargs)
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        await client.close()
+
+
+async def test_app_is_cached_until_ttl(stand_in, client_factory):
+    server = await stand_in({"/api/appdetails": appdetails({620: APP})})
+    client = client_factory(server.url, ttl=0.2)
+
+    first = await client.get_app(620)
+    second = await client.get_app(620)
+    assert first.name == "Portal 2" and first.price == "199 руб."
+    assert second is first
+    assert server.count("/api/appdetails") == 1
+
+    await asyncio.sleep(0.25)
+    await client.get_app(620)
+    assert server.count("/api/appdetails") == 2
+
+
+async def test_unknown_app_is_cached_for_not_found_ttl(stand_in, client_factory):
+    server = await stand_in({"/api/appdetails": appdetails({})})
+    client = client_factory(server.url, ttl=60, not_found_ttl=0.2)
+
+    assert await client.get_app(1) is None
+    assert await client.get_app(1) is None
+    assert server.count("/api/appdetails") == 1
+
+    await asyncio.sleep(0.25)
+    assert await client.get_app(1) is None
+    assert server.count("/api/appdetails") == 2
+
+
+async def test_concurrent_lookups_share_one_request(stand_in, client_factory):
+    server = await stand_in({"/api/appdetails": appdetails({620: APP}, delay=0.1)})
+    client = client_factory(server.url)
+
+    apps = await asyncio.gather(*(client.get_app(620) for _ in range(20)))
+    assert {app.name for app in apps} == {"Portal 2"}
+    assert server.count("/api/appdetails") == 1
+
+
+async def test_redis_tier_is_shared_between_clients(stand_in, client_factory, fake_redis):
+    server = await stand_in({"/api/appdetails": appdetails({620: APP})})
+    first = client_factory(server.url, redis=fake_redis)
+    second = client_factory(server.url, redis=fake_redis)
+
+    await first.get_app(620)
+    assert await fake_redis.ttl("sdtg:steam:app:620") > 0
+    app = await second.get_app(620)
+    assert app.name == "Portal 2"
+    assert server.count("/api/appdetails") == 1
+
+
+async def test_unreachable_store_raises_steam_error(stand_in, client_factory):
+    async def broken(request: web.Request) -> web.Response:
+        return web.Response(status=502)
+
+    server = await stand_in({"/api/appdetails": broken})
+    client = client_factory(server.url)
+
+    with pytest.raises(SteamError):
+        await client.get_app(620)
+    # errors are not cached
+    with pytest.raises(SteamError):
+        await client.get_app(620)
+    assert server.count("/api/appdetails") == 2
+
+
+async def test_fetch_prices_sends_if_modified_since(stand_in, client_factory):
+    modified = datetime.datetime(2026, 10, 1, 12, 0, tzinfo=datetime.timezone.utc)
+    stamp = format_datetime(modified, usegmt=True)
+
+    async def prices(request: web.Request) -> web.Response:
+        assert request.query["filters"] == "price_overview"
+        if request.headers.get("If-Modified-Since") == stamp:
+            return web.Response(status=304, headers={"Last-Modified": stamp})
+        overview = {"initial": 49900, "final": 24950, "discount_percent": 50, "currency": "RUB"}
+        payload = {
+            "620": {"success": True, "data": {"price_overview": overview}},
+            "440": {"success": True, "data": []},
+            "1": {"success": False},
+        }
+        return web.json_response(payload, headers={"Last-Modified": stamp})
+
+    server = await stand_in({"/api/appdetails": prices})
+    client = client_factory(server.url)
+
+    batch = await client.fetch_prices([620, 440, 1])
+    assert not batch.not_modified
+    assert batch.last_modified == modified
+    assert batch.prices == {
+        620: PriceState(initial=49900, final=24950, discount_percent=50, currency="RUB"),
+        440: PriceState(),
+    }
+    assert server.requests[0].query["appids"] == "620,440,1"
+
+    again = await client.fetch_prices([620, 440, 1], if_modified_since=batch.last_modified)
+    assert again.not_modified and again.prices == {}
+    assert server.requests[1].headers["If-Modified-Since"] == stamp
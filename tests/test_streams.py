@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+
+from bot.streams import StreamWorker, ensure_group, stream_name
+
+GROUP = "workers"
+STREAM = stream_name("test", 1, 0)
+
+
+def make_worker(redis, consumer: str, lease_ms: int = 30000) -> tuple[StreamWorker, list[str]]:
+    worker = StreamWorker(
+        None,
+        [SimpleNamespace(id=1)],
+        redis,
+        prefix="test",
+        group=GROUP,
+        partitions=1,
+        batch=2,
+        block_ms=50,
+        lease_ms=lease_ms,
+        claim_idle_ms=60000,
+        consumer=consumer,
+    )
+    handled: list[str] = []
+
+    async def handle(bot, entry_id: str, fields: dict[str, str]) -> None:
+        handled.append(fields["update"])
+
+    worker._handle = handle
+    return worker, handled
+
+
+async def wait_for(condition, timeout: float = 2) -> None:
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+
+async def test_new_holder_handles_entries_of_a_dead_holder_first(fake_redis) -> None:
+    await ensure_group(fake_redis, STREAM, GROUP)
+    for update in ("1", "2", "3"):
+        await fake_redis.xadd(STREAM, {"update": update})
+    # read just now by a holder that died before acknowledging them
+    await fake_redis.xreadgroup(GROUP, "dead", {STREAM: ">"}, count=3)
+    await fake_redis.xadd(STREAM, {"update": "4"})
+
+    worker, handled = make_worker(fake_redis, "new")
+    consuming = asyncio.create_task(worker._consume(STREAM))
+    worker._tasks[STREAM] = consuming
+    try:
+        await wait_for(lambda: len(handled) == 4)
+    finally:
+        worker._leaving.add(STREAM)
+        await consuming
+
+    assert handled == ["1", "2", "3", "4"]
+    assert (await fake_redis.xpending(STREAM, GROUP))["pending"] == 0
+
+
+async def test_leaving_partition_keeps_its_lease_until_the_batch_is_acknowledged(fake_redis) -> None:
+    worker, handled = make_worker(fake_redis, "slow", lease_ms=300)
+    handling = asyncio.Event()
+
+    async def slow_handle(bot, entry_id: str, fields: dict[str, str]) -> None:
+        handling.set()
+        # longer than the lease
+        await asyncio.sleep(0.8)
+        handled.append(fields["update"])
+
+    worker._handle = slow_handle
+    await ensure_group(fake_redis, STREAM, GROUP)
+    await fake_redis.xadd(STREAM, {"update": "1"})
+    running = asyncio.create_task(worker.run())
+    await asyncio.wait_for(handling.wait(), 2)
+    worker.stop()
+
+    await asyncio.sleep(0.5)
+    assert await fake_redis.get(f"{STREAM}:lease") == "slow"
+    await running
+    assert handled == ["1"]
+    assert (await fake_redis.xpending(STREAM, GROUP))["pending"] == 0
+    assert await fake_redis.get(f"{STREAM}:lease") is None
@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+import pytest
+
+from utils.text import strip_html
+
+
+@pytest.mark.parametrize(
+    ("html", "visible"),
+    [
+        ("<b>Скидка</b>  на\nигру", "Скидка на игру"),
+        ("Tom &amp; Jerry", "Tom & Jerry"),
+        ("строка<br>строка", "строка строка"),
+        # an escaped entity is shown by Telegram as the entity text
+        ("&amp;lt;b&amp;gt; код", "&lt;b&gt; код"),
+        ("&lt;i&gt;", "<i>"),
+    ],
+)
+def test_strip_html_returns_text_as_telegram_shows_it(html: str, visible: str) -> None:
+    assert strip_html(html) == visible
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Generic, Hashable, TypeVar
+
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+T = TypeVar("T")
+
+
+@dataclass(slots=True)
+class CacheEntry(Generic[V]):
+    value: V
+    fresh_until: float
+    stale_until: float
+
+    @property
+    def is_fresh(self) -> bool:
+        return time.monotonic() < self.fresh_until
+
+
+class TTLCache(Generic[K, V]):
+    """In-memory LRU cache with per-entry TTL.
+
+    Entries stay readable through :meth:`get_entry` for ``stale_ttl`` seconds
+    after they expire, which lets callers serve a stale value while they
+    refresh it in the background.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 1024, stale_ttl: float = 0) -> None:
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.stale_ttl = stale_ttl
+        self._data: OrderedDict[K, CacheEntry[V]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get_entry(self, key: K) -> CacheEntry[V] | None:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() >= entry.stale_until:
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return entry
+
+    def get(self, key: K, default: V | None = None) -> V | None:
+        entry = self.get_entry(key)
+        if entry is None or not entry.is_fresh:
+            return default
+        return entry.value
+
+    def set(self, key: K, value: V, ttl: float | None = None) -> None:
+        now = time.monotonic()
+        fresh_until = now + (self.ttl if ttl is None else ttl)
+        self._data[key] = CacheEntry(value, fresh_until, fresh_until + self.stale_ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: K) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+class Coalescer(Generic[K, T]):
+    """Share one in-flight call between concurrent callers asking for the same key."""
+
+    def __init__(self) -> None:
+        self._pending: dict[K, asyncio.Future[T]] = {}
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._pending
+
+    async def run(self, key: K, factory: Callable[[], Awaitable[T]]) -> T:
+        future = self._pending.get(key)
+        if future is None:
+            future = asyncio.ensure_future(factory())
+            self._pending[key] = future
+            future.add_done_callback(lambda _: self._pending.pop(key, None))
+        # a cancelled caller must not cancel the call for everyone else
+        return await asyncio.shield(future)
@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import time
+from bisect import bisect_left
+from logging import getLogger
+from typing import Any, Callable, Iterable
+
+from aiohttp import web
+from redis.asyncio import Redis
+
+from utils.tracing import tracer
+
+
+logger = getLogger("utils.metrics")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+
+    def _key(self, labels: dict[str, Any]) -> tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def expose(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()) -> None:
+        super().__init__(name, documentation, labels)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> Iterable[str]:
+        for key, value in self._values.items():
+            yield f"{self.name}{_labels(self.label_names, key)} {value}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: bucket counts (the last one is +Inf), sum
+        self._values: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        entry = self._values.get(key)
+        if entry is None:
+            entry = self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+        counts, total = entry
+        counts[bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def count(self, **labels: Any) -> int:
+        entry = self._values.get(self._key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def total(self) -> int:
+        """Observations across all label sets."""
+        return sum(sum(counts) for counts, _ in self._values.values())
+
+    def samples(self) -> Iterable[str]:
+        for key, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                yield f"{self.name}_bucket{_labels(self.label_names, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.label_names, key)} {total[0]}"
+            yield f"{self.name}_count{_labels(self.label_names, key)} {cumulative}"
+
+
+class Gauge(_Metric):
+    """Gauge read from a callback at scrape time, so it costs nothing in between."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, read: Callable[[], float]) -> None:
+        super().__init__(name, documentation)
+        self.read = read
+
+    def samples(self) -> Iterable[str]:
+        try:
+            value = self.read()
+        except Exception as err:
+            logger.warning("Gauge %s failed: %s", self.name, err)
+            return
+        yield f"{self.name} {value}"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels: Iterable[str] = (), **kwargs) -> Histogram:
+        return self.register(Histogram(name, documentation, labels, **kwargs))
+
+    def gauge(self, name: str, documentation: str, read: Callable[[], float]) -> Gauge:
+        return self.register(Gauge(name, documentation, read))
+
+    def render(self) -> str:
+        """Prometheus text exposition format."""
+        return "\n".join(metric.expose() for metric in self._metrics.values()) + "\n"
+
+
+registry = Registry()
+
+updates_total = registry.counter(
+    "sdtg_updates_total", "Handled updates by handler and dialog state", ("event", "handler", "state")
+)
+handler_seconds = registry.histogram(
+    "sdtg_handler_seconds", "Handler latency by handler and dialog state", ("event", "handler", "state")
+)
+handler_errors_total = registry.counter(
+    "sdtg_handler_errors_total", "Handlers that raised", ("event", "handler", "state")
+)
+bot_api_seconds = registry.histogram("sdtg_bot_api_seconds", "Bot API call latency by method", ("method",))
+bot_api_errors_total = registry.counter("sdtg_bot_api_errors_total", "Failed Bot API calls", ("method", "error"))
+retry_after_total = registry.counter(
+    "sdtg_bot_api_retry_after_total", "TelegramRetryAfter answers by method", ("method",)
+)
+redis_seconds = registry.histogram(
+    "sdtg_redis_seconds", "Redis command latency", ("command",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+)
+
+stream_updates_total = registry.counter(
+    "sdtg_stream_updates_total", "Updates passed through the update streams by stage", ("stage",)
+)
+
+
+class InstrumentedRedis(Redis):
+    """``Redis`` client timing and tracing every command; pipelines are not split up."""
+
+    async def execute_command(self, *args, **options):
+        command = str(args[0]).upper()
+        started = time.perf_counter()
+        try:
+            with tracer.span(command, "redis"):
+                return await super().execute_command(*args, **options)
+        finally:
+            redis_seconds.observe(time.perf_counter() - started, command=command)
+
+
+async def _handle_metrics(_request: web.Request) -> web.Response:
+    return web.Response(text=registry.render(), content_type="text/plain", charset="utf-8")
+
+
+async def start_metrics_server(host: str, port: int) -> web.AppRunner:
+    """Serve ``GET /metrics`` from the running event loop."""
+    app = web.Application()
+    app.router.add_get("/metrics", _handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info("Metrics served on http://%s:%s/metrics", host, port)
+    return runner
+
+
+__all__ = [
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "InstrumentedRedis",
+    "Registry",
+    "registry",
+    "start_metrics_server",
+]
@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import csv
+import datetime
+import io
+import json
+from dataclasses import dataclass, field
+from typing import IO, Iterator
+
+from utils.text import check_post
+
+DATETIME_FORMATS = ("%d-%m-%Y %H:%M", "%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M", "%Y-%m-%dT%H:%M:%S")
+TRUE_VALUES = {"1", "true", "yes", "y", "да", "+"}
+FALSE_VALUES = {"0", "false", "no", "n", "нет", "-"}
+
+
+class ImportRowError(ValueError):
+    pass
+
+
+@dataclass
+class ImportRow:
+    """Validated row of an import file, ready for ``repo.bulk_create_posts``."""
+
+    line: int
+    text: str
+    scheduled_at: datetime.datetime
+    channels: list[int]
+    steam_id: int | None = None
+    tg_image_id: str | None = None
+    caption_above: bool = False
+    use_default_buttons: bool = True
+    buttons: list[dict] | None = None
+
+
+@dataclass
+class ImportReport:
+    created: int = 0
+    errors: list[tuple[int, str]] = field(default_factory=list)
+
+    def errors_csv(self) -> bytes:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(["line", "error"])
+        writer.writerows(self.errors)
+        return buffer.getvalue().encode("utf-8-sig")
+
+
+def _parse_str(value, error: str) -> str:
+    """``value`` stripped; JSON may hold numbers, lists or objects where text is expected."""
+    if value is None:
+        return ""
+    if not isinstance(value, str):
+        raise ImportRowError(f"{error}: {value}")
+    return value.strip()
+
+
+def _parse_datetime(value) -> datetime.datetime:
+    value = _parse_str(value, "неверная дата")
+    if not value:
+        raise ImportRowError("не указана дата отправки")
+    for fmt in DATETIME_FORMATS:
+        try:
+            return datetime.datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    raise ImportRowError(f"неверная дата: {value}")
+
+
+def _parse_bool(value, default: bool) -> bool:
+    if value is None:
+        return default
+    if isinstance(value, bool):
+        return value
+    value = _parse_str(value, "неверное логическое значение").lower()
+    if not value:
+        return default
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ImportRowError(f"неверное логическое значение: {value}")
+
+
+def _parse_int(value, error: str) -> int:
+    # bools and floats are ints to Python but not ids
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ImportRowError(f"{error}: {value}")
+    try:
+        return int(value)
+    except ValueError:
+        raise ImportRowError(f"{error}: {value}") from None
+
+
+def _parse_channels(value) -> list[int]:
+    if isinstance(value, list):
+        items = value
+    elif isinstance(value, int) and not isinstance(value, bool):
+        items = [value]
+    else:
+        items = _parse_str(value, "неверный id канала").replace(",", " ").replace(";", " ").split()
+    channels = [_parse_int(item, "неверный id канала") for item in items]
+    if not channels:
+        raise ImportRowError("не указаны каналы")
+    return channels
+
+
+def _parse_buttons(value) -> list[dict] | None:
+    if not value:
+        return None
+    if isinstance(value, list):
+        lines = value
+    else:
+        lines = [line for line in _parse_str(value, "неверные кнопки").split("|") if line.strip()]
+    buttons = []
+    for line in lines:
+        if isinstance(line, dict):
+            text, url = line.get("text"), line.get("url")
+        elif isinstance(line, str) and "-" in line:
+            text, url = map(str.strip, line.split("-", 1))
+        else:
+            text = url = None
+        if not isinstance(text, str) or not isinstance(url, str) or not text.strip() or not url.strip():
+            raise ImportRowError(f"неверная кнопка: {line}")
+        buttons.append({"text": text.strip(), "url": url.strip()})
+    return buttons
+
+
+def validate_row(
+    line: int,
+    raw: dict,
+    known_channels: set[int],
+    now: datetime.datetime,
+) -> ImportRow:
+    """Validate one raw CSV/JSON record against the known channel chat ids."""
+    text = _parse_str(raw.get("text"), "текст должен быть строкой")
+    if not text:
+        raise ImportRowError("пустой текст")
+    image = _parse_str(raw.get("image"), "неверный id картинки") or None
+    error = check_post(text, with_media=bool(image)).error
+    if error:
+        raise ImportRowError(error)
+    scheduled_at = _parse_datetime(raw.get("scheduled_at"))
+    if scheduled_at <= now:
+        raise ImportRowError("дата уже прошла")
+    channels = _parse_channels(raw.get("channels"))
+    unknown = [c for c in channels if c not in known_channels]
+    if unknown:
+        raise ImportRowError(f"неизвестные каналы: {', '.join(map(str, unknown))}")
+    app_id = raw.get("app_id")
+    steam_id = _parse_int(app_id, "неверный app id") if app_id not in (None, "") else None
+    return ImportRow(
+        line=line,
+        text=text,
+        scheduled_at=scheduled_at,
+        channels=channels,
+        steam_id=steam_id,
+        tg_image_id=image,
+        caption_above=_parse_bool(raw.get("caption_above"), False),
+        use_default_buttons=_parse_bool(raw.get("default_buttons"), True),
+        buttons=_parse_buttons(raw.get("buttons")),
+    )
+
+
+def iter_records(stream: IO[bytes], file_name: str) -> Iterator[tuple[int, dict | None, str | None]]:
+    """Yield ``(line, record, error)`` from a CSV, JSON Lines or JSON array file.
+
+    CSV and JSON Lines are read lazily row by row; a JSON array has to be
+    decoded at once, which is fine for files within the Bot API download limit.
+    A malformed CSV row is reported and skipped; text that is not UTF-8
+    ends the file with an error, as decoding cannot resume after it.
+    """
+    text_stream = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    line = 0
+    try:
+        for line, record, error in _read_records(text_stream, file_name.lower()):
+            yield line, record, error
+    except UnicodeDecodeError:
+        yield line + 1, None, "файл не в кодировке UTF-8"
+
+
+def _read_records(text_stream: IO[str], name: str) -> Iterator[tuple[int, dict | None, str | None]]:
+    if name.endswith(".csv"):
+        reader = csv.DictReader(text_stream)
+        while True:
+            try:
+                record = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as err:
+                # the line that failed is not counted yet
+                yield reader.line_num + 1, None, f"неверный CSV: {err}"
+                continue
+            yield reader.line_num, record, None
+    elif name.endswith(".jsonl"):
+        for line, raw_line in enumerate(text_stream, start=1):
+            if not raw_line.strip():
+                continue
+            try:
+                record = json.loads(raw_line)
+            except json.JSONDecodeError as err:
+                yield line, None, f"неверный JSON: {err.msg}"
+                continue
+            if not isinstance(record, dict):
+                yield line, None, "ожидается объект"
+                continue
+            yield line, record, None
+    elif name.endswith(".json"):
+        try:
+            records = json.load(text_stream)
+        except json.JSONDecodeError as err:
+            yield err.lineno, None, f"неверный JSON: {err.msg}"
+            return
+        if not isinstance(records, list):
+            yield 1, None, "ожидается массив объектов"
+            return
+        for index, record in enumerate(records, start=1):
+            if not isinstance(record, dict):
+                yield index, None, "ожидается объект"
+                continue
+            yield index, record, None
+    else:
+        yield 0, None, "поддерживаются только файлы .csv, .json и .jsonl"
+
+
+def iter_import_rows(
+    stream: IO[bytes],
+    file_name: str,
+    known_channels: set[int],
+) -> Iterator[tuple[int, ImportRow | None, str | None]]:
+    """Stream validated rows, yielding an error message instead of a row for bad input."""
+    now = datetime.datetime.now()
+    for line, record, error in iter_records(stream, file_name):
+        if error:
+            yield line, None, error
+            continue
+        try:
+            yield line, validate_row(line, record, known_channels, now), None
+        except ImportRowError as err:
+            yield line, None, str(err)
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import sys
+import threading
+from collections import Counter
+
+
+class SamplingProfiler:
+    """Wall-clock sampling profiler for one thread, usually the event loop.
+
+    A background thread reads the target thread's current frame every
+    ``interval`` seconds via ``sys._current_frames`` and counts stacks; the
+    report is in the collapsed-stack format understood by flamegraph.pl
+    and speedscope.
+    """
+
+    def __init__(self, thread_id: int | None = None, interval: float = 0.005) -> None:
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+__all__ = ["SamplingProfiler"]
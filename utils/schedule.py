@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import datetime
+import re
+from typing import Iterable, Iterator
+
+from config import settings
+
+
+_SHIFT_RE = re.compile(r"^([+-])(\d+)([dhmдчм])$")
+_SHIFT_UNITS = {"d": "days", "д": "days", "h": "hours", "ч": "hours", "m": "minutes", "м": "minutes"}
+
+
+def as_local(value: datetime.datetime) -> datetime.datetime:
+    """Scheduled times are naive local datetimes, Postgres hands them back aware."""
+    return value.astimezone().replace(tzinfo=None) if value.tzinfo else value
+
+
+def slot_times() -> list[datetime.time]:
+    return sorted(datetime.datetime.strptime(value, "%H:%M").time() for value in settings.POST_TIME_OPTIONS)
+
+
+def iter_slots(start: datetime.datetime) -> Iterator[datetime.datetime]:
+    """Slot datetimes from ``POST_TIME_OPTIONS`` at or after ``start``, without end."""
+    times = slot_times()
+    day = start.date()
+    while True:
+        for time in times:
+            slot = datetime.datetime.combine(day, time)
+            if slot >= start:
+                yield slot
+        day += datetime.timedelta(days=1)
+
+
+def parse_shift(value: str) -> datetime.timedelta:
+    """Parse ``+2d``, ``-3h`` or ``+90m``; Russian unit letters work too."""
+    match = _SHIFT_RE.match(value.strip().lower())
+    if not match:
+        raise ValueError(value)
+    sign, amount, unit = match.groups()
+    delta = datetime.timedelta(**{_SHIFT_UNITS[unit]: int(amount)})
+    return -delta if sign == "-" else delta
+
+
+def _first_free(start: datetime.datetime, occupied: set[datetime.datetime]) -> datetime.datetime:
+    if not settings.POST_TIME_OPTIONS:
+        return start
+    return next(slot for slot in iter_slots(start) if slot not in occupied)
+
+
+def plan_shift(
+    items: Iterable[tuple[int, datetime.datetime]],
+    delta: datetime.timedelta,
+    occupied: set[datetime.datetime],
+    not_before: datetime.datetime,
+) -> list[tuple[int, datetime.datetime]]:
+    """Move every post by ``delta`` onto the first free slot at or after its new time.
+
+    ``occupied`` holds the times of posts that stay in place and is filled
+    with the planned times as well, so no two posts end up in one slot.
+    """
+    planned = []
+    for post_id, scheduled_at in sorted(items, key=lambda item: item[1]):
+        slot = _first_free(max(scheduled_at + delta, not_before), occupied)
+        occupied.add(slot)
+        planned.append((post_id, slot))
+    return planned
+
+
+def plan_spread(
+    items: Iterable[tuple[int, datetime.datetime]],
+    start: datetime.datetime,
+    occupied: set[datetime.datetime],
+) -> list[tuple[int, datetime.datetime]]:
+    """Put posts, in their current order, into consecutive free slots from ``start``."""
+    planned = []
+    slot = start
+    for post_id, _ in sorted(items, key=lambda item: item[1]):
+        slot = _first_free(slot, occupied)
+        occupied.add(slot)
+        planned.append((post_id, slot))
+    return planned
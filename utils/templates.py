@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+from html import escape
+from string import Formatter
+from typing import Callable, Iterable, Mapping
+
+
+PLACEHOLDERS = {
+    "app_id": "Steam app id",
+    "title": "название игры",
+    "price": "цена со скидкой",
+    "initial_price": "цена без скидки",
+    "discount": "скидка в процентах",
+    "release_date": "дата выхода",
+    "protondb_tier": "рейтинг ProtonDB",
+    "protondb_badge": "рейтинг ProtonDB со значком",
+    "deck_status": "статус Steam Deck",
+    "deck_badge": "статус Steam Deck со значком",
+}
+
+Renderer = Callable[[Mapping[str, object]], str]
+
+
+class TemplateError(ValueError):
+    pass
+
+
+def compile_template(text: str) -> Renderer:
+    """Compile template text into a render function.
+
+    The text is parsed once into a positional ``str.format`` pattern, so a
+    render is a single C-level ``format`` call over the HTML-escaped values.
+    Missing values render as empty strings.
+    """
+    pattern: list[str] = []
+    fields: list[str] = []
+    try:
+        parsed = list(Formatter().parse(text))
+    except ValueError as err:
+        raise TemplateError(f"Ошибка в шаблоне: {err}") from None
+    for literal, field, spec, conversion in parsed:
+        pattern.append(literal.replace("{", "{{").replace("}", "}}"))
+        if field is None:
+            continue
+        if field not in PLACEHOLDERS:
+            raise TemplateError(f"Неизвестная подстановка {{{field}}}")
+        if spec or conversion:
+            raise TemplateError(f"Форматирование не поддерживается: {{{field}}}")
+        pattern.append(f"{{{len(fields)}}}")
+        fields.append(field)
+
+    compiled = "".join(pattern)
+    names = tuple(fields)
+
+    def render(values: Mapping[str, object]) -> str:
+        return compiled.format(*(
+            escape(str(value)) if (value := values.get(name)) is not None else ""
+            for name in names
+        ))
+
+    return render
+
+
+class TemplateCache:
+    """Compiled renderers keyed by template id, recompiled when the text changes."""
+
+    def __init__(self) -> None:
+        self._renderers: dict[int, tuple[str, Renderer]] = {}
+
+    def get(self, template_id: int, text: str) -> Renderer:
+        cached = self._renderers.get(template_id)
+        if cached is not None and cached[0] == text:
+            return cached[1]
+        render = compile_template(text)
+        self._renderers[template_id] = (text, render)
+        return render
+
+    def invalidate(self, template_id: int) -> None:
+        self._renderers.pop(template_id, None)
+
+    def render(self, template_id: int, text: str, values: Mapping[str, object]) -> str:
+        return self.get(template_id, text)(values)
+
+    def render_many(self, template_id: int, text: str, values: Iterable[Mapping[str, object]]) -> list[str]:
+        render = self.get(template_id, text)
+        return [render(item) for item in values]
+
+
+template_cache = TemplateCache()
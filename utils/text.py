@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from html import escape
+from html.parser import HTMLParser
+
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.parts: list[str] = []
+
+    def handle_data(self, data: str) -> None:
+        self.parts.append(data)
+
+    def handle_starttag(self, tag: str, attrs) -> None:
+        if tag == "br":
+            self.parts.append(" ")
+
+
+def strip_html(text: str) -> str:
+    """Return visible text of Telegram HTML with tags removed and spaces collapsed."""
+    if "<" not in text and "&" not in text:
+        return _WHITESPACE_RE.sub(" ", text).strip()
+    parser = _TextExtractor()
+    parser.feed(text)
+    parser.close()
+    return _WHITESPACE_RE.sub(" ", "".join(parser.parts)).strip()
+
+
+def snippet(text: str, length: int = 60) -> str:
+    """Short single-line preview of a post text."""
+    plain = strip_html(text)
+    if len(plain) <= length:
+        return plain
+    return plain[: length - 1].rstrip() + "…"
+
+
+CAPTION_LIMIT = 1024
+MESSAGE_LIMIT = 4096
+ENTITY_LIMIT = 100
+
+# tags Telegram turns into message entities
+ENTITY_TAGS = {
+    "b", "strong", "i", "em", "u", "ins", "s", "strike", "del",
+    "span", "tg-spoiler", "a", "code", "pre", "blockquote", "tg-emoji",
+}
+# preferred split points, best first
+SPLIT_BOUNDARIES = ("\n\n", "\n", ". ", "! ", "? ", "; ", ", ", " ")
+
+
+def utf16_len(text: str) -> int:
+    """Length as Telegram counts it, in UTF-16 code units."""
+    return len(text.encode("utf-16-le")) // 2
+
+
+class _Tokenizer(HTMLParser):
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.tokens: list[tuple[str, str, str]] = []
+
+    def handle_data(self, data: str) -> None:
+        self.tokens.append(("text", data, ""))
+
+    def handle_starttag(self, tag: str, attrs) -> None:
+        self.tokens.append(("start", tag, self.get_starttag_text() or f"<{tag}>"))
+
+    def handle_endtag(self, tag: str) -> None:
+        self.tokens.append(("end", tag, f"</{tag}>"))
+
+
+@dataclass(frozen=True)
+class PostCheck:
+    """Visible length and entity count of Telegram HTML, plus its split into messages."""
+
+    length: int
+    entities: int
+    limit: int
+    parts: tuple[str, ...]
+
+    @property
+    def fits(self) -> bool:
+        return self.length <= self.limit and self.entities <= ENTITY_LIMIT
+
+    @property
+    def error(self) -> str | None:
+        for part in self.parts:
+            if _tokenize(part)[2] > ENTITY_LIMIT:
+                return f"Больше {ENTITY_LIMIT} элементов форматирования в одном сообщении"
+        return None
+
+
+@lru_cache(maxsize=256)
+def _tokenize(text: str) -> tuple[tuple[tuple[str, str, str], ...], int, int]:
+    parser = _Tokenizer()
+    parser.feed(text)
+    parser.close()
+    tokens = tuple(parser.tokens)
+    length = sum(utf16_len(value) for kind, value, _ in tokens if kind == "text")
+    entities = sum(1 for kind, value, _ in tokens if kind == "start" and value in ENTITY_TAGS)
+    return tokens, length, entities
+
+
+def _fit(text: str, capacity: int) -> int:
+    """Number of leading characters of ``text`` that fit into ``capacity`` UTF-16 units."""
+    units = 0
+    for index, char in enumerate(text):
+        units += 2 if ord(char) > 0xFFFF else 1
+        if units > capacity:
+            return index
+    return len(text)
+
+
+def _cut_position(text: str, capacity: int) -> tuple[int, int] | None:
+    """Where to cut ``text`` at the best boundary within ``capacity`` UTF-16 units.
+
+    Returns the end of the first part and the start of the rest.
+    """
+    head = text[:_fit(text, capacity)]
+    fallback = None
+    for boundary in SPLIT_BOUNDARIES:
+        index = head.rfind(boundary)
+        if index <= 0:
+            continue
+        # keep sentence punctuation in the first part, drop the whitespace
+        cut = index + len(boundary.rstrip()), index + len(boundary)
+        # a weaker boundary is better than a part left half empty
+        if index >= len(head) // 2:
+            return cut
+        fallback = fallback or cut
+    return fallback
+
+
+def _split(tokens, first_limit: int) -> list[str]:
+    parts: list[str] = []
+    current: list[str] = []
+    size = 0
+    limit = first_limit
+    stack: list[tuple[str, str]] = []
+
+    def flush() -> None:
+        nonlocal current, size, limit
+        current.extend(f"</{tag}>" for tag, _ in reversed(stack))
+        parts.append("".join(current).strip())
+        current = [raw for _, raw in stack]
+        size = 0
+        limit = MESSAGE_LIMIT
+
+    for kind, value, raw in tokens:
+        if kind == "start":
+            stack.append((value, raw))
+            current.append(raw)
+            continue
+        if kind == "end":
+            for index in range(len(stack) - 1, -1, -1):
+                if stack[index][0] == value:
+                    del stack[index]
+                    break
+            current.append(raw)
+            continue
+
+        text = value
+        while text:
+            length = utf16_len(text)
+            if size + length <= limit:
+                current.append(escape(text, quote=False))
+                size += length
+                break
+            cut = _cut_position(text, limit - size)
+            if cut is None and size:
+                # no boundary in this piece: break before it instead of mid-word
+                flush()
+                text = text.lstrip()
+                continue
+            if cut is None:
+                end = start = _fit(text, limit - size)
+            else:
+                end, start = cut
+            current.append(escape(text[:end], quote=False))
+            flush()
+            text = text[start:].lstrip()
+    if "".join(current).strip() and size:
+        current.extend(f"</{tag}>" for tag, _ in reversed(stack))
+        parts.append("".join(current).strip())
+    return parts
+
+
+def check_post(text: str, with_media: bool = False) -> PostCheck:
+    """Measure post HTML once and split it into Telegram-sized messages.
+
+    With media the first part is the caption (1024 visible characters),
+    the rest go out as follow-up text messages of up to 4096. Parts are
+    cut at paragraph, line, sentence or word boundaries and open tags are
+    closed and reopened around each cut.
+    """
+    tokens, length, entities = _tokenize(text)
+    limit = CAPTION_LIMIT if with_media else MESSAGE_LIMIT
+    if length <= limit:
+        parts = (text,)
+    else:
+        parts = tuple(_split(tokens, limit))
+    return PostCheck(length=length, entities=entities, limit=limit, parts=parts)
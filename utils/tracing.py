@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import functools
+import inspect
+import json
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Iterator
+
+from config import settings
+
+
+class _NoopSpan:
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *_exc) -> None:
+        return None
+
+
+_NOOP = _NoopSpan()
+
+
+@dataclass
+class _Trace:
+    tid: int
+    events: list[dict] = field(default_factory=list)
+
+
+_current: ContextVar[_Trace | None] = ContextVar("trace", default=None)
+
+
+class Tracer:
+    """Span trees per update in the Chrome trace event format.
+
+    A trace is started for a sampled share of updates; every span opened
+    while it is current becomes a complete (``"ph": "X"``) event on the
+    update's own track. Finished traces are appended to ``path`` by a
+    writer thread. The file is a JSON array without the closing bracket,
+    which chrome://tracing and Perfetto accept as is.
+    """
+
+    def __init__(self, path: str | Path, sample_rate: float = 0.0) -> None:
+        self.path = Path(path)
+        self.sample_rate = sample_rate
+        self._pid = os.getpid()
+        self._queue: queue.SimpleQueue[list[dict]] = queue.SimpleQueue()
+        self._writer: threading.Thread | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0
+
+    def start(self, tid: int, force: bool = False) -> Token | None:
+        """Start a trace for the current context if it is sampled."""
+        if not force and (self.sample_rate <= 0 or random.random() >= self.sample_rate):
+            return None
+        return _current.set(_Trace(tid))
+
+    def finish(self, token: Token | None) -> None:
+        if token is None:
+            return
+        trace = _current.get()
+        _current.reset(token)
+        if trace is not None and trace.events:
+            self._write(trace.events)
+
+    def span(self, name: str, category: str, **args: Any):
+        """Context manager timing a block; free when no trace is current."""
+        trace = _current.get()
+        if trace is None:
+            return _NOOP
+        return self._span(trace, name, category, args)
+
+    @contextmanager
+    def _span(self, trace: _Trace, name: str, category: str, args: dict[str, Any]) -> Iterator[None]:
+        started = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            event = {
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": started // 1000,
+                "dur": (time.perf_counter_ns() - started) // 1000,
+                "pid": self._pid,
+                "tid": trace.tid,
+            }
+            if args:
+                event["args"] = args
+            trace.events.append(event)
+
+    def instrument_module(self, module: ModuleType, category: str) -> int:
+        """Wrap public coroutine functions of ``module`` in spans; returns how many.
+
+        Callers must look functions up through the module (``repo.get_post``)
+        for the wrapper to be seen.
+        """
+        count = 0
+        for name, func in list(vars(module).items()):
+            if (
+                name.startswith("_")
+                or not inspect.iscoroutinefunction(func)
+                or func.__module__ != module.__name__
+                or getattr(func, "__traced__", False)
+            ):
+                continue
+            setattr(module, name, self._wrap(func, category))
+            count += 1
+        return count
+
+    def _wrap(self, func, category: str):
+        name = func.__name__
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with self.span(name, category):
+                return await func(*args, **kwargs)
+
+        wrapper.__traced__ = True
+        return wrapper
+
+    def _write(self, events: list[dict]) -> None:
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._write_loop, name="trace-writer", daemon=True)
+            self._writer.start()
+        self._queue.put(events)
+
+    def _write_loop(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as file:
+            if file.tell() == 0:
+                file.write("[\n")
+            while True:
+                events = self._queue.get()
+                file.writelines(json.dumps(event) + ",\n" for event in events)
+                file.flush()
+
+
+tracer = Tracer(settings.TRACE_FILE, settings.TRACE_SAMPLE_RATE)
+
+
+__all__ = ["Tracer", "tracer"]